@@ -0,0 +1,92 @@
+"""
+Benchmark: time-to-first-audio and stalls, fixed 500-char chunks vs adaptive chunking.
+
+Synthesis is simulated with a latency model (a fixed per-request overhead plus a
+per-character cost, roughly what a gTTS round trip plus the emotion chain costs)
+and played back through the same bounded producer/consumer pipeline speak()
+uses, so the numbers isolate the effect of the chunk plan. Set
+LILY_TTS_TIMINGS=1 to see the real figures from speak() itself.
+
+Usage:
+    python benchmarks/bench_chunking.py [--overhead 0.35] [--per-char 0.003] [--chars-per-second 14]
+"""
+import sys
+import argparse
+import statistics
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+if str(BASE_DIR) not in sys.path:
+    sys.path.insert(0, str(BASE_DIR))
+
+SENTENCES = [
+    "Sure, Aman!",
+    "Here's a quick overview of how that works.",
+    "Plants capture light energy using chlorophyll, which sits inside chloroplasts.",
+    "That energy splits water molecules, releasing oxygen as a by-product, and the rest is stored for later.",
+    "The Calvin cycle then fixes carbon dioxide into sugars the plant can use.",
+    "आज का मौसम बहुत अच्छा है।",
+    "If you want, I can go into more detail on any of these steps, or suggest a few videos that explain it visually.",
+    "Let me know what you think.",
+]
+
+
+def replies():
+    """Replies of increasing length built from the sentence pool"""
+    result = []
+    for n in (1, 2, 3, 5, 8, 12, 16, 24):
+        result.append(" ".join(SENTENCES[i % len(SENTENCES)] for i in range(n)))
+    return result
+
+
+def simulate(chunks, overhead, per_char, chars_per_second, depth):
+    """Return (time_to_first_audio, total_stall) for one reply"""
+    synth_done = []
+    play_start = []
+    play_end = []
+    producer_free = 0.0
+    for i, chunk in enumerate(chunks):
+        # The bounded queue: chunk i can't start until chunk i-depth began playing
+        start = producer_free
+        if i >= depth:
+            start = max(start, play_start[i - depth])
+        producer_free = start + overhead + per_char * len(chunk)
+        synth_done.append(producer_free)
+
+        begin = max(producer_free, play_end[-1] if play_end else 0.0)
+        play_start.append(begin)
+        play_end.append(begin + len(chunk) / chars_per_second)
+
+    stall = sum(max(0.0, play_start[i] - play_end[i - 1]) for i in range(1, len(chunks)))
+    return play_start[0], stall
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Chunk plan vs time-to-first-audio")
+    parser.add_argument("--overhead", type=float, default=0.35, help="seconds per synthesis request")
+    parser.add_argument("--per-char", type=float, default=0.003, help="synthesis seconds per character")
+    parser.add_argument("--chars-per-second", type=float, default=14.0, help="speaking rate")
+    args = parser.parse_args()
+
+    from modules.tts_output import split_long_text, plan_chunks, PIPELINE_DEPTH
+
+    print(f"Model: {args.overhead * 1000:.0f} ms/request + {args.per_char * 1000:.1f} ms/char, "
+          f"{args.chars_per_second:.0f} chars/s speech, pipeline depth {PIPELINE_DEPTH}")
+    print(f"  {'chars':>6}  {'fixed TTFA':>10} {'stall':>7}   {'adaptive TTFA':>13} {'stall':>7}  chunks")
+    fixed_ttfa, adaptive_ttfa = [], []
+    for text in replies():
+        fixed = split_long_text(text)
+        adaptive = plan_chunks(text)
+        f_ttfa, f_stall = simulate(fixed, args.overhead, args.per_char, args.chars_per_second, PIPELINE_DEPTH)
+        a_ttfa, a_stall = simulate(adaptive, args.overhead, args.per_char, args.chars_per_second, PIPELINE_DEPTH)
+        fixed_ttfa.append(f_ttfa)
+        adaptive_ttfa.append(a_ttfa)
+        sizes = "/".join(str(len(c)) for c in adaptive)
+        print(f"  {len(text):>6}  {f_ttfa * 1000:>8.0f}ms {f_stall * 1000:>5.0f}ms   "
+              f"{a_ttfa * 1000:>11.0f}ms {a_stall * 1000:>5.0f}ms  {sizes}")
+    print(f"  median TTFA: fixed {statistics.median(fixed_ttfa) * 1000:.0f} ms, "
+          f"adaptive {statistics.median(adaptive_ttfa) * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
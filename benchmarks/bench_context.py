@@ -0,0 +1,113 @@
+"""
+Micro-benchmark: context-build cost per turn.
+
+Compares the old main.update_context_history path (recall_context(5) +
+get_recent_chat_context(3), re-parsing the JSON history file three times a
+turn) with the incremental ConversationContext reading the segmented chat
+log, which the task worker syncs once a turn to build the chat prompt.
+
+Runs in a throwaway data directory, so real history is never touched.
+
+Usage:
+    python benchmarks/bench_context.py [--history 200] [--turns 200]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+from datetime import datetime
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+if str(BASE_DIR) not in sys.path:
+    sys.path.insert(0, str(BASE_DIR))
+
+
+def make_entry(i):
+    return {
+        "timestamp": datetime.now().isoformat(),
+        "user_message": f"question number {i} about something interesting",
+        "ai_response": f"answer number {i} with a reasonably long reply " * 3,
+        "mood": "neutral",
+    }
+
+
+def legacy_build(path):
+    """What main.update_context_history did before: parse the JSON file twice, rebuild strings"""
+    with open(path, "r") as f:
+        history = json.load(f)
+    recall = "\n".join(
+        f"[{h.get('timestamp')}] User: {h.get('user_message')} → Lily: {h.get('ai_response')} ({h.get('mood')})"
+        for h in history[-5:]
+    )
+    with open(path, "r") as f:
+        history = json.load(f)
+    lines = []
+    for chat in history[-3:]:
+        lines.append(f"User: {chat['user_message']}")
+        lines.append(f"Lily: {chat['ai_response']}")
+    recent = "\n".join(lines)
+    return f"{recall}\n\nRecent conversations:\n{recent}" if recent else recall
+
+
+def run(history_size, turns):
+    from modules.context_builder import ConversationContext
+    from modules.history_store import chat_log
+
+    legacy_path = "data/legacy_chat_history.json"
+    history = [make_entry(i) for i in range(history_size)]
+    with open(legacy_path, "w") as f:
+        json.dump(history, f, indent=2, ensure_ascii=False)
+
+    # Each turn: update before the task, after the task, and once more on the next loop
+    legacy_time = 0.0
+    for i in range(turns):
+        history.append(make_entry(history_size + i))
+        history = history[-200:]
+        with open(legacy_path, "w") as f:
+            json.dump(history, f, indent=2, ensure_ascii=False)
+        start = time.perf_counter()
+        for _ in range(3):
+            legacy_build(legacy_path)
+        legacy_time += time.perf_counter() - start
+
+    for i in range(history_size):
+        chat_log.append(make_entry(i))
+    ctx = ConversationContext()
+    ctx.sync()
+
+    # Turns are appended by another process, so every sync has real work to do
+    incremental_time = 0.0
+    for i in range(turns):
+        chat_log.append(make_entry(history_size + i))
+        start = time.perf_counter()
+        ctx.sync()
+        ctx.chat_context(f"question number {i}")
+        incremental_time += time.perf_counter() - start
+
+    legacy_per_turn = legacy_time / turns * 1000
+    incremental_per_turn = incremental_time / turns * 1000
+
+    print(f"History size: {history_size} entries, {turns} turns")
+    print(f"  legacy      : {legacy_per_turn:8.3f} ms/turn (3 builds)")
+    print(f"  incremental : {incremental_per_turn:8.3f} ms/turn (1 sync + chat context)")
+    if incremental_per_turn > 0:
+        print(f"  speedup     : {legacy_per_turn / incremental_per_turn:8.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Context-build cost per turn")
+    parser.add_argument("--history", type=int, default=200, help="initial history entries")
+    parser.add_argument("--turns", type=int, default=200, help="turns to simulate")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        os.makedirs("data", exist_ok=True)
+        run(args.history, args.turns)
+
+
+if __name__ == "__main__":
+    main()
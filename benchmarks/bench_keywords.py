@@ -0,0 +1,131 @@
+"""
+Benchmark: false-accept / false-reject rates of the offline keyword spotter.
+
+Replays recorded fixtures through KeywordSpotter and sweeps the threshold
+scale, so LILY_KWS_SCALE can be chosen from data. Fixtures are 16-bit wav
+files, one folder per label:
+
+    <fixtures>/hey_lily/*.wav       positives, named like the template folders
+    <fixtures>/wake_up_lily/*.wav
+    <fixtures>/stop/*.wav
+    <fixtures>/other/*.wav          anything else: speech, noise, TV (negatives)
+
+Record them with the same microphone as the templates but in separate takes
+(`python -m modules.keyword_spotter enroll` writes the templates to
+data/keywords/). A false accept is a negative spotted as any keyword; a false
+reject is a positive not spotted as its own keyword; a confusion is a positive
+spotted as another keyword.
+
+Usage:
+    python benchmarks/bench_keywords.py [--fixtures benchmarks/keyword_fixtures]
+        [--templates data/keywords] [--scales 1.0,1.2,1.4,1.6,1.8,2.0,2.4] [--json results.json]
+"""
+import sys
+import json
+import time
+import argparse
+import statistics
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+if str(BASE_DIR) not in sys.path:
+    sys.path.insert(0, str(BASE_DIR))
+
+DEFAULT_FIXTURES = BASE_DIR / "benchmarks" / "keyword_fixtures"
+
+
+def load_fixtures(root, keywords, keyword_dir_name):
+    """[(path, expected keyword or None)]"""
+    labels = {keyword_dir_name(k): k for k in keywords}
+    fixtures = []
+    for folder in sorted(p for p in Path(root).iterdir() if p.is_dir()):
+        for path in sorted(folder.glob("*.wav")):
+            fixtures.append((path, labels.get(folder.name)))
+    return fixtures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Keyword spotter false-accept / false-reject rates")
+    parser.add_argument("--fixtures", default=str(DEFAULT_FIXTURES))
+    parser.add_argument("--templates", default=None, help="template folder (default: data/keywords)")
+    parser.add_argument("--scales", default="1.0,1.2,1.4,1.6,1.8,2.0,2.4")
+    parser.add_argument("--json", help="also write the results here")
+    args = parser.parse_args()
+
+    from modules.keyword_spotter import (
+        KeywordSpotter, KEYWORDS, TEMPLATE_DIR, THRESHOLD_SCALE, keyword_dir_name, read_wav,
+    )
+
+    if not Path(args.fixtures).is_dir():
+        print(f"No fixtures at {args.fixtures} (see this file's docstring for the layout)")
+        return 1
+    spotter = KeywordSpotter(args.templates or BASE_DIR / TEMPLATE_DIR)
+    if not spotter.ready():
+        print(f"No templates in {spotter.template_dir}; run: python -m modules.keyword_spotter enroll 'hey lily'")
+        return 1
+
+    fixtures = load_fixtures(args.fixtures, KEYWORDS, keyword_dir_name)
+    positives = sum(1 for _, expected in fixtures if expected)
+    negatives = len(fixtures) - positives
+    print(f"{positives} positive / {negatives} negative fixtures, "
+          f"templates: " + ", ".join(f"{k} x{len(t)}" for k, t in spotter.templates.items()))
+
+    # Score every fixture once; thresholds are applied per scale afterwards
+    scored = []
+    latencies = []
+    for path, expected in fixtures:
+        samples, sr = read_wav(path)
+        started = time.perf_counter()
+        scores = spotter.score(samples, sr)
+        latencies.append((time.perf_counter() - started) * 1000)
+        scored.append((path, expected, scores))
+
+    def decide(scores, scale):
+        if scores and scores[0][0] <= spotter.threshold(scores[0][1], scale):
+            return scores[0][1]
+        return None
+
+    results = []
+    print(f"  {'scale':>5}  {'false accept':>12}  {'false reject':>12}  {'confusions':>10}")
+    for scale in [float(s) for s in args.scales.split(",")]:
+        fa = fr = confused = 0
+        for _, expected, scores in scored:
+            spotted = decide(scores, scale)
+            if expected is None:
+                fa += spotted is not None
+            elif spotted != expected:
+                fr += 1
+                confused += spotted is not None
+        fa_rate = fa / negatives * 100 if negatives else None
+        fr_rate = fr / positives * 100 if positives else None
+        results.append({"scale": scale, "false_accepts": fa, "false_rejects": fr, "confusions": confused,
+                        "false_accept_rate": fa_rate, "false_reject_rate": fr_rate})
+        marker = "  <- current" if abs(scale - THRESHOLD_SCALE) < 1e-9 else ""
+        print(f"  {scale:>5.2f}  {fa:>4} ({fa_rate if fa_rate is not None else 0:>5.1f}%)  "
+              f"{fr:>4} ({fr_rate if fr_rate is not None else 0:>5.1f}%)  {confused:>10}{marker}")
+
+    p95 = sorted(latencies)[int(0.95 * (len(latencies) - 1))] if latencies else 0.0
+    median = statistics.median(latencies) if latencies else 0.0
+    print(f"  scoring time: median {median:.1f} ms, p95 {p95:.1f} ms per utterance")
+
+    # Worst misses at the current scale, to see which recordings need attention
+    for path, expected, scores in scored:
+        spotted = decide(scores, THRESHOLD_SCALE)
+        if spotted != expected:
+            detail = ", ".join(f"{k} {d:.2f}" for d, k in scores) or "too long"
+            print(f"  miss: {path.relative_to(args.fixtures)} expected {expected or '-'}, got {spotted or '-'} ({detail})")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({
+                "fixtures": len(fixtures), "positives": positives, "negatives": negatives,
+                "thresholds": {k: spotter.threshold(k) for k in spotter.templates},
+                "scoring_ms": {"median": median, "p95": p95},
+                "sweep": results,
+            }, f, indent=2)
+        print(f"  wrote {args.json}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,77 @@
+"""
+Benchmark: cost of each pitch-shift mode (fast / wsola / librosa).
+
+Runs EmotionVoiceEngine.pitch_and_speed for every mode on the same synthetic
+voice-like clip and reports ms per second of audio, the output duration (the
+'fast' mode changes tempo) and the measured pitch of the result.
+
+Usage:
+    python benchmarks/bench_pitch.py [--seconds 4] [--emotion neutral] [--runs 3]
+"""
+import sys
+import time
+import argparse
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+if str(BASE_DIR) not in sys.path:
+    sys.path.insert(0, str(BASE_DIR))
+
+import numpy as np
+
+F0 = 180.0
+
+
+def synthetic_voice(seconds, sr=24000):
+    """Steady harmonic tone at F0 with a syllable-rate envelope"""
+    t = np.arange(int(seconds * sr)) / sr
+    phase = 2 * np.pi * F0 * t
+    voice = sum(np.sin(k * phase) / k for k in range(1, 8))
+    envelope = 0.3 + 0.7 * np.sin(2 * np.pi * 3 * t) ** 2
+    return (voice * envelope / 3).astype(np.float32), sr
+
+
+def dominant_pitch(samples, sr):
+    """Fundamental estimate from the autocorrelation peak in the 80-500 Hz range"""
+    x = samples[: sr] - np.mean(samples[: sr])
+    corr = np.fft.irfft(np.abs(np.fft.rfft(x, 2 * len(x))) ** 2)[: len(x)]
+    lo, hi = int(sr / 500), int(sr / 80)
+    return sr / (lo + int(np.argmax(corr[lo:hi])))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pitch-shift mode costs")
+    parser.add_argument("--seconds", type=float, default=4.0)
+    parser.add_argument("--emotion", default="neutral")
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    from modules.emotion_voice_engine import EmotionVoiceEngine, PITCH_MODES
+    engine = EmotionVoiceEngine()
+    profile = engine.EMOTION_PROFILES.get(args.emotion, engine.EMOTION_PROFILES["neutral"])
+    semitones, speed = profile["pitch_shift"], profile["speed"]
+
+    samples, sr = synthetic_voice(args.seconds)
+    target_pitch = F0 * 2 ** (semitones / 12) * speed
+
+    print(f"Clip: {args.seconds:.1f}s, emotion '{args.emotion}' "
+          f"({semitones:+d} semitones, speed {speed}), {args.runs} runs")
+    print(f"  expected: duration {args.seconds / speed:.2f}s, pitch {target_pitch:.0f} Hz")
+    print(f"  {'mode':<9}{'first ms':>10}{'ms/s audio':>12}{'duration':>10}{'pitch':>9}")
+    for mode in PITCH_MODES:
+        # The first call includes any one-off setup (librosa/numba JIT)
+        start = time.perf_counter()
+        out = engine.pitch_and_speed(samples, sr, semitones, speed, mode)
+        first = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for _ in range(args.runs):
+            out = engine.pitch_and_speed(samples, sr, semitones, speed, mode)
+        per_second = (time.perf_counter() - start) / args.runs / args.seconds
+
+        print(f"  {mode:<9}{first * 1000:>10.1f}{per_second * 1000:>12.1f}"
+              f"{len(out) / sr:>9.2f}s{dominant_pitch(out, sr):>7.0f}Hz")
+
+
+if __name__ == "__main__":
+    main()
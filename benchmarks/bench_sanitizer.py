@@ -0,0 +1,216 @@
+"""
+Micro-benchmark and golden-output check for the TTS text sanitizer.
+
+Every case in sanitizer_corpus.json is run through
+tts_output.sanitize_with_language and must match the recorded text and
+language exactly. The old multi-pass sanitizer (kept below, verbatim apart
+from the names) is timed on the same corpus for comparison. Cases marked
+"legacy_differs" document where the old output was a bug (HTML tags were
+read aloud because its citation pattern deleted every '>').
+
+Usage:
+    python benchmarks/bench_sanitizer.py [--runs 200]
+    python benchmarks/bench_sanitizer.py --update   # re-record expected outputs
+"""
+import re
+import sys
+import json
+import time
+import argparse
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+if str(BASE_DIR) not in sys.path:
+    sys.path.insert(0, str(BASE_DIR))
+
+CORPUS_FILE = Path(__file__).resolve().parent / "sanitizer_corpus.json"
+
+
+# ---------- the previous implementation ----------
+
+def legacy_remove_emojis(text):
+    """Remove all emojis from text"""
+    # Comprehensive emoji pattern covering most Unicode emoji ranges
+    emoji_pattern = re.compile(
+        "["
+        "\U0001F600-\U0001F64F"  # emoticons
+        "\U0001F300-\U0001F5FF"  # symbols & pictographs
+        "\U0001F680-\U0001F6FF"  # transport & map symbols
+        "\U0001F1E0-\U0001F1FF"  # flags (iOS)
+        "\U00002500-\U00002BEF"  # chinese char
+        "\U00002702-\U000027B0"  # dingbats
+        "\U000024C2-\U0001F251"  # enclosed characters
+        "\U0001F900-\U0001F9FF"  # supplemental symbols and pictographs
+        "\U0001FA00-\U0001FA6F"  # chess symbols
+        "\U0001FA70-\U0001FAFF"  # symbols and pictographs extended-a
+        "\U00002600-\U000026FF"  # miscellaneous symbols
+        "\U00002B50"              # star
+        "\U0001F004"              # mahjong tile
+        "\U0001F0CF"              # playing card
+        "\U0001F170-\U0001F251"  # enclosed characters supplement
+        "]+",
+        flags=re.UNICODE
+    )
+    return emoji_pattern.sub('', text)
+
+def legacy_remove_markdown_formatting(text):
+    """Remove markdown formatting like **bold**, *italic*, `code`, etc."""
+    # Remove bold (**text** or __text__)
+    text = re.sub(r'\*\*(.+?)\*\*', r'\1', text)
+    text = re.sub(r'__(.+?)__', r'\1', text)
+    
+    # Remove italic (*text* or _text_)
+    text = re.sub(r'\*(.+?)\*', r'\1', text)
+    text = re.sub(r'_(.+?)_', r'\1', text)
+    
+    # Remove code blocks (```code```)
+    text = re.sub(r'```.*?```', '', text, flags=re.DOTALL)
+    
+    # Remove inline code (`code`)
+    text = re.sub(r'`(.+?)`', r'\1', text)
+    
+    # Remove strikethrough (~~text~~)
+    text = re.sub(r'~~(.+?)~~', r'\1', text)
+    
+    return text
+
+def legacy_remove_special_symbols(text):
+    """Remove special symbols and emote actions like *blushes* or ~nervous~"""
+    # Remove action emotes like *action* or ~action~
+    text = re.sub(r'\*[^*]+\*', '', text)
+    text = re.sub(r'~[^~]+~', '', text)
+    
+    # Remove other special symbols but keep basic punctuation and Unicode characters (for Hindi)
+    # Modified to preserve Devanagari script (Hindi): \u0900-\u097F
+    text = re.sub(r'[^\u0900-\u097Fa-zA-Z0-9\s.,!?;:\'-]', '', text)
+    
+    return text
+
+def legacy_remove_urls(text):
+    """Remove URLs from text"""
+    # Remove http/https URLs
+    text = re.sub(r'https?://\S+', '', text)
+    # Remove www URLs
+    text = re.sub(r'www\.\S+', '', text)
+    return text
+
+def legacy_remove_citations(text):
+    """Remove citation tags and references"""
+    # Remove XML-style citation tags
+    text = re.sub(r']*>.*?', '', text, flags=re.DOTALL)
+    text = re.sub(r'<[^>]+>', '', text)  # Remove any remaining HTML/XML tags
+    
+    # Remove citation references like [1], [2], etc.
+    text = re.sub(r'\[\d+\]', '', text)
+    
+    return text
+
+def legacy_detect_language(text):
+    """Detect if text contains Hindi (Devanagari script)"""
+    # Check if text contains Devanagari characters
+    devanagari_pattern = re.compile(r'[\u0900-\u097F]')
+    has_hindi = bool(devanagari_pattern.search(text))
+    
+    # Count Hindi vs English characters
+    hindi_chars = len(devanagari_pattern.findall(text))
+    english_chars = len(re.findall(r'[a-zA-Z]', text))
+    
+    # If more than 30% Hindi characters, consider it Hindi
+    total_chars = hindi_chars + english_chars
+    if total_chars > 0 and (hindi_chars / total_chars) > 0.3:
+        return 'hi'  # Hindi
+    elif has_hindi:
+        return 'mixed'  # Mixed Hindi-English
+    else:
+        return 'en'  # English
+
+def legacy_sanitize_text(text):
+    """Comprehensive text sanitization for TTS"""
+    # First, remove citations and tags
+    text = legacy_remove_citations(text)
+    
+    # Remove URLs
+    text = legacy_remove_urls(text)
+    
+    # Remove emojis
+    text = legacy_remove_emojis(text)
+    
+    # Remove markdown formatting
+    text = legacy_remove_markdown_formatting(text)
+    
+    # Remove special symbols and emote actions (preserves Hindi)
+    text = legacy_remove_special_symbols(text)
+    
+    # Remove fancy quotes and replace with standard ones
+    text = text.replace('"', '"').replace('"', '"')
+    text = text.replace(''', "'").replace(''', "'")
+    
+    # Remove multiple spaces
+    text = re.sub(r'\s+', ' ', text)
+    
+    # Clean up multiple punctuation marks
+    text = re.sub(r'([.!?]){2,}', r'\1', text)
+    
+    return text.strip()
+
+
+def legacy_sanitize_with_language(text):
+    """What speak() used to do: sanitize, then detect the language in a separate scan"""
+    clean = legacy_sanitize_text(text)
+    return clean, legacy_detect_language(clean)
+
+
+# ---------- check and benchmark ----------
+
+def main():
+    parser = argparse.ArgumentParser(description="TTS sanitizer golden check and timing")
+    parser.add_argument("--runs", type=int, default=200, help="passes over the corpus")
+    parser.add_argument("--update", action="store_true", help="re-record expected outputs")
+    args = parser.parse_args()
+
+    from modules.tts_output import sanitize_with_language
+
+    with open(CORPUS_FILE, "r", encoding="utf-8") as f:
+        corpus = json.load(f)
+
+    if args.update:
+        for case in corpus:
+            case["expected"], case["language"] = sanitize_with_language(case["input"])
+            case["legacy_differs"] = legacy_sanitize_with_language(case["input"]) != (case["expected"], case["language"])
+        with open(CORPUS_FILE, "w", encoding="utf-8") as f:
+            json.dump(corpus, f, indent=2, ensure_ascii=False)
+            f.write("\n")
+        print(f"Re-recorded {len(corpus)} cases in {CORPUS_FILE.name}")
+        return
+
+    failures = 0
+    for i, case in enumerate(corpus):
+        got = sanitize_with_language(case["input"])
+        if got != (case["expected"], case["language"]):
+            failures += 1
+            print(f"  ✗ case {i}: {case['input']!r}")
+            print(f"      expected {case['expected']!r} ({case['language']})")
+            print(f"      got      {got[0]!r} ({got[1]})")
+        legacy = legacy_sanitize_with_language(case["input"])
+        if (legacy != got) != case.get("legacy_differs", False):
+            print(f"  ! case {i}: legacy agreement changed: legacy gives {legacy[0]!r} ({legacy[1]})")
+
+    texts = [case["input"] for case in corpus]
+    timings = {}
+    for name, fn in (("legacy", legacy_sanitize_with_language), ("compiled", sanitize_with_language)):
+        start = time.perf_counter()
+        for _ in range(args.runs):
+            for text in texts:
+                fn(text)
+        timings[name] = (time.perf_counter() - start) / (args.runs * len(texts))
+
+    print(f"Golden corpus: {len(corpus) - failures}/{len(corpus)} cases match")
+    print(f"  legacy   : {timings['legacy'] * 1e6:8.1f} µs/utterance")
+    print(f"  compiled : {timings['compiled'] * 1e6:8.1f} µs/utterance")
+    print(f"  speedup  : {timings['legacy'] / timings['compiled']:8.1f}x")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+"""
+Benchmark: accuracy and speed of the speech-to-text backends.
+
+Replays recorded utterances through an STTBackend (modules/stt_backends.py)
+the way the capture stream feeds it, and reports word error rate, real-time
+factor and the latency from end of speech to text. Fixtures are 16-bit wav
+files, each with its reference transcript next to it:
+
+    <fixtures>/what_time_is_it.wav
+    <fixtures>/what_time_is_it.txt      "what time is it"
+
+Audio is fed in FRAME_MS pieces. Streaming backends recognize while it is fed,
+so their latency is only what finish() still has to do; non-streaming ones do
+all the work after the end. With --realtime the pieces are fed at speaking
+pace, which is what a streaming backend sees live (slower to run). In the app
+the capture stream's END_SILENCE_MS is added on top of the latency here.
+
+--backend takes a registered name (google, vosk) or module:Class for any other
+STTBackend, e.g. a local stand-in for a cloud API. --json writes the results;
+--baseline compares with an earlier --json file and exits 1 if WER or p95
+latency got worse than the tolerances.
+
+Usage:
+    python benchmarks/bench_stt.py [--fixtures benchmarks/stt_fixtures] [--backend vosk]
+        [--realtime] [--json results.json] [--baseline previous.json]
+"""
+import re
+import sys
+import json
+import time
+import wave
+import argparse
+import importlib
+import statistics
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+if str(BASE_DIR) not in sys.path:
+    sys.path.insert(0, str(BASE_DIR))
+
+import numpy as np
+
+DEFAULT_FIXTURES = BASE_DIR / "benchmarks" / "stt_fixtures"
+
+
+def normalize(text):
+    """Lower-case words without punctuation, for scoring"""
+    return re.sub(r"[^\w\s']", " ", (text or "").lower()).split()
+
+
+def word_errors(reference, hypothesis):
+    """Word-level edit distance (substitutions + deletions + insertions)"""
+    previous = list(range(len(hypothesis) + 1))
+    for i, ref_word in enumerate(reference, 1):
+        current = [i]
+        for j, hyp_word in enumerate(hypothesis, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1,
+                               previous[j - 1] + (ref_word != hyp_word)))
+        previous = current
+    return previous[-1]
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[int(q * (len(values) - 1))] if values else None
+
+
+def read_pcm(path, sample_rate):
+    """16-bit mono PCM of a wav file at sample_rate"""
+    from modules import audio_dsp
+    with wave.open(str(path), "rb") as f:
+        channels, width, rate = f.getnchannels(), f.getsampwidth(), f.getframerate()
+        data = f.readframes(f.getnframes())
+    if width != 2:
+        raise ValueError(f"{path}: expected 16-bit audio")
+    samples = np.frombuffer(data, dtype=np.int16).astype(np.float32)
+    if channels > 1:
+        samples = samples.reshape(-1, channels).mean(axis=1)
+    if rate != sample_rate:
+        samples = audio_dsp.resample(samples, rate / sample_rate)
+    return np.clip(samples, -32768, 32767).astype(np.int16).tobytes()
+
+
+def load_backend(spec):
+    from modules.stt_backends import BACKENDS
+    if spec in BACKENDS:
+        backend = BACKENDS[spec]()
+    else:
+        module, _, name = spec.partition(":")
+        backend = getattr(importlib.import_module(module), name)()
+    if not backend.available():
+        raise SystemExit(f"STT backend {spec} is not available here")
+    return backend
+
+
+def run_fixture(backend, pcm, sample_rate, frame_bytes, realtime):
+    """(text, processing seconds, end-of-speech-to-text seconds)"""
+    busy = 0.0
+    started = time.perf_counter()
+    stream = backend.start_stream(sample_rate)
+    busy += time.perf_counter() - started
+    pace = frame_bytes / (sample_rate * 2)
+    for offset in range(0, len(pcm), frame_bytes):
+        started = time.perf_counter()
+        stream.accept(pcm[offset:offset + frame_bytes])
+        took = time.perf_counter() - started
+        busy += took
+        if realtime and took < pace:
+            time.sleep(pace - took)
+    ended = time.perf_counter()
+    text = stream.finish()
+    latency = time.perf_counter() - ended
+    return text, busy + latency, latency
+
+
+def compare(results, baseline, wer_tolerance, latency_tolerance):
+    """Print changes against an earlier run; True if nothing regressed"""
+    ok = True
+    old, new = baseline["summary"], results["summary"]
+    print(f"  vs baseline ({baseline.get('backend')}, {baseline.get('fixtures')} fixtures):")
+    for key, fmt in (("wer", "{:.3f}"), ("rtf", "{:.3f}"), ("latency_p50_ms", "{:.0f}"), ("latency_p95_ms", "{:.0f}")):
+        if old.get(key) is None or new.get(key) is None:
+            continue
+        print(f"    {key:<15} {fmt.format(old[key])} -> {fmt.format(new[key])}")
+    if new["wer"] > old["wer"] + wer_tolerance:
+        print(f"  REGRESSION: WER up {new['wer'] - old['wer']:.3f} (tolerance {wer_tolerance})")
+        ok = False
+    if old.get("latency_p95_ms") and new["latency_p95_ms"] > old["latency_p95_ms"] * (1 + latency_tolerance):
+        print(f"  REGRESSION: p95 latency up more than {latency_tolerance:.0%}")
+        ok = False
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="STT word error rate, real-time factor and latency")
+    parser.add_argument("--fixtures", default=str(DEFAULT_FIXTURES))
+    parser.add_argument("--backend", default=None, help="google, vosk or module:Class (default: as configured)")
+    parser.add_argument("--realtime", action="store_true", help="feed audio at speaking pace")
+    parser.add_argument("--json", help="also write the results here")
+    parser.add_argument("--baseline", help="earlier --json output to compare with")
+    parser.add_argument("--wer-tolerance", type=float, default=0.02)
+    parser.add_argument("--latency-tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    from modules.audio_capture import SAMPLE_RATE, FRAME_SAMPLES, SAMPLE_WIDTH
+    from modules.stt_backends import get_stt_backend
+
+    fixtures = sorted(p for p in Path(args.fixtures).glob("*.wav") if p.with_suffix(".txt").exists())
+    if not fixtures:
+        print(f"No fixtures at {args.fixtures} (see this file's docstring for the layout)")
+        return 1
+    backend = load_backend(args.backend) if args.backend else get_stt_backend()
+    started = time.perf_counter()
+    backend.warm()
+    warm_ms = (time.perf_counter() - started) * 1000
+    print(f"{len(fixtures)} fixtures, backend {backend.name} "
+          f"({'streaming' if backend.streaming else 'whole utterance'}, warm-up {warm_ms:.0f} ms)")
+
+    rows = []
+    errors = words = 0
+    audio_total = busy_total = 0.0
+    for path in fixtures:
+        reference = path.with_suffix(".txt").read_text(encoding="utf-8").strip()
+        pcm = read_pcm(path, SAMPLE_RATE)
+        duration = len(pcm) / (SAMPLE_RATE * SAMPLE_WIDTH)
+        text, busy, latency = run_fixture(backend, pcm, SAMPLE_RATE, FRAME_SAMPLES * SAMPLE_WIDTH, args.realtime)
+        ref_words = normalize(reference)
+        wrong = word_errors(ref_words, normalize(text))
+        errors += wrong
+        words += len(ref_words)
+        audio_total += duration
+        busy_total += busy
+        rows.append({"fixture": path.name, "reference": reference, "text": text,
+                     "errors": wrong, "words": len(ref_words), "seconds": round(duration, 3),
+                     "rtf": round(busy / duration, 4) if duration else None,
+                     "latency_ms": round(latency * 1000, 1)})
+        print(f"  {path.name:<32} {wrong:>2}/{len(ref_words):<3} errors  "
+              f"rtf {busy / duration if duration else 0:.2f}  {latency * 1000:>6.0f} ms  {text or '-'}")
+
+    latencies = [r["latency_ms"] for r in rows]
+    summary = {
+        "wer": errors / words if words else 0.0,
+        "rtf": busy_total / audio_total if audio_total else None,
+        "latency_p50_ms": percentile(latencies, 0.5),
+        "latency_p90_ms": percentile(latencies, 0.9),
+        "latency_p95_ms": percentile(latencies, 0.95),
+        "latency_mean_ms": statistics.mean(latencies),
+        "warm_ms": round(warm_ms, 1),
+    }
+    print(f"  WER {summary['wer'] * 100:.1f}% ({errors}/{words} words), RTF {summary['rtf']:.3f}")
+    print(f"  end of speech -> text: p50 {summary['latency_p50_ms']:.0f} ms, "
+          f"p90 {summary['latency_p90_ms']:.0f} ms, p95 {summary['latency_p95_ms']:.0f} ms")
+
+    results = {"backend": backend.name, "realtime": args.realtime, "fixtures": len(rows),
+               "summary": summary, "results": rows}
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"  wrote {args.json}")
+    if args.baseline:
+        with open(args.baseline) as f:
+            if not compare(results, json.load(f), args.wer_tolerance, args.latency_tolerance):
+                return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
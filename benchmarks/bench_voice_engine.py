@@ -0,0 +1,167 @@
+"""
+Benchmark: per-stage timings of EmotionVoiceEngine, file-based vs in-memory.
+
+"before" replays the old chain that went through temp files
+(mp3 -> temp file -> AudioSegment -> wav file, wav export -> librosa.load ->
+sf.write -> AudioSegment.from_wav, then an mp3 export for playback).
+"after" is the current in-memory float32 chain.
+
+By default a synthetic voice-like signal stands in for the gTTS download so the
+run needs no network; pass --text to fetch real gTTS audio once instead.
+The network fetch itself is not part of either column.
+
+Usage:
+    python benchmarks/bench_voice_engine.py [--seconds 4] [--emotion neutral] [--runs 3]
+    python benchmarks/bench_voice_engine.py --text "Hello there, this is Lily."
+"""
+import io
+import os
+import sys
+import time
+import argparse
+import tempfile
+from pathlib import Path
+from contextlib import contextmanager
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+if str(BASE_DIR) not in sys.path:
+    sys.path.insert(0, str(BASE_DIR))
+
+import numpy as np
+import librosa
+import soundfile as sf
+from pydub import AudioSegment
+from pydub.effects import normalize, compress_dynamic_range
+
+
+@contextmanager
+def stage(timings, name):
+    start = time.perf_counter()
+    yield
+    timings[name] = timings.get(name, 0.0) + (time.perf_counter() - start)
+
+
+def synthetic_mp3(seconds, sr=24000):
+    """A harmonic, syllable-modulated tone encoded as mp3 (stands in for gTTS output)"""
+    t = np.arange(int(seconds * sr)) / sr
+    f0 = 180 + 20 * np.sin(2 * np.pi * 0.5 * t)
+    phase = 2 * np.pi * np.cumsum(f0) / sr
+    voice = sum(np.sin(k * phase) / k for k in range(1, 8))
+    envelope = 0.5 + 0.5 * np.sin(2 * np.pi * 4 * t) ** 2
+    samples = (voice * envelope / 4).astype(np.float32)
+    pcm = (np.clip(samples, -1, 1) * 32767).astype(np.int16)
+    segment = AudioSegment(pcm.tobytes(), frame_rate=sr, sample_width=2, channels=1)
+    buf = io.BytesIO()
+    segment.export(buf, format="mp3")
+    return buf.getvalue()
+
+
+def gtts_mp3(text):
+    from gtts import gTTS
+    buf = io.BytesIO()
+    gTTS(text=text, lang="en", slow=False).write_to_fp(buf)
+    return buf.getvalue()
+
+
+def legacy_chain(mp3_bytes, profile, timings):
+    """The pre-refactor file-based chain, stage by stage"""
+    with stage(timings, "base decode"):
+        temp_mp3 = tempfile.NamedTemporaryFile(suffix=".mp3", delete=False)
+        temp_mp3.write(mp3_bytes)
+        temp_mp3.close()
+        sound = AudioSegment.from_mp3(temp_mp3.name)
+        wav_path = temp_mp3.name.replace(".mp3", ".wav")
+        sound.export(wav_path, format="wav")
+        os.unlink(temp_mp3.name)
+        audio = AudioSegment.from_wav(wav_path)
+        os.unlink(wav_path)
+
+    with stage(timings, "pitch shift"):
+        temp_wav = tempfile.NamedTemporaryFile(suffix=".wav", delete=False)
+        audio.export(temp_wav.name, format="wav")
+        y, sr = librosa.load(temp_wav.name, sr=None)
+        y_shifted = librosa.effects.pitch_shift(y, sr=sr, n_steps=profile["pitch_shift"])
+        shifted_wav = tempfile.NamedTemporaryFile(suffix=".wav", delete=False)
+        sf.write(shifted_wav.name, y_shifted, sr)
+        audio = AudioSegment.from_wav(shifted_wav.name)
+        os.unlink(temp_wav.name)
+        os.unlink(shifted_wav.name)
+
+    with stage(timings, "speed"):
+        altered = audio._spawn(audio.raw_data, overrides={"frame_rate": int(audio.frame_rate * profile["speed"])})
+        audio = altered.set_frame_rate(audio.frame_rate)
+
+    with stage(timings, "volume"):
+        audio += (profile["volume"] - 1.0) * 10
+
+    with stage(timings, "enhance"):
+        audio = normalize(audio)
+        audio = compress_dynamic_range(audio, threshold=-20.0, ratio=3.0)
+        audio = audio.high_pass_filter(100)
+
+    with stage(timings, "encode"):
+        out = tempfile.NamedTemporaryFile(suffix=".mp3", delete=False)
+        out.close()
+        audio.export(out.name, format="mp3", bitrate="192k")
+        os.unlink(out.name)
+
+
+def memory_chain(engine, mp3_bytes, profile, timings):
+    """The current in-memory chain, stage by stage"""
+    from modules.emotion_voice_engine import array_to_segment
+
+    with stage(timings, "base decode"):
+        samples, sr = engine.decode_audio(mp3_bytes)
+
+    with stage(timings, "pitch shift"):
+        samples = engine.pitch_shift(samples, sr, profile["pitch_shift"])
+
+    with stage(timings, "speed"):
+        samples = engine.change_speed(samples, sr, profile["speed"])
+
+    with stage(timings, "volume"):
+        samples = engine.change_volume(samples, (profile["volume"] - 1.0) * 10)
+
+    with stage(timings, "enhance"):
+        samples = engine.enhance_audio(samples, sr)
+
+    with stage(timings, "encode"):
+        array_to_segment(samples, sr).export(io.BytesIO(), format="mp3", bitrate="192k")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="EmotionVoiceEngine per-stage timings")
+    parser.add_argument("--seconds", type=float, default=4.0, help="length of the synthetic clip")
+    parser.add_argument("--text", help="fetch this text from gTTS instead of a synthetic clip")
+    parser.add_argument("--emotion", default="neutral")
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    from modules.emotion_voice_engine import EmotionVoiceEngine
+    engine = EmotionVoiceEngine()
+    profile = engine.EMOTION_PROFILES.get(args.emotion, engine.EMOTION_PROFILES["neutral"])
+
+    mp3_bytes = gtts_mp3(args.text) if args.text else synthetic_mp3(args.seconds)
+    duration = len(AudioSegment.from_file(io.BytesIO(mp3_bytes), format="mp3")) / 1000
+
+    # Warm up librosa / numba caches so neither column pays for JIT compilation
+    memory_chain(engine, mp3_bytes, profile, {})
+
+    before, after = {}, {}
+    for _ in range(args.runs):
+        legacy_chain(mp3_bytes, profile, before)
+        memory_chain(engine, mp3_bytes, profile, after)
+
+    print(f"Clip: {duration:.2f}s of audio, emotion '{args.emotion}', {args.runs} runs (mean ms)")
+    print(f"  {'stage':<14}{'before':>10}{'after':>10}")
+    for name in before:
+        b = before[name] / args.runs * 1000
+        a = after.get(name, 0.0) / args.runs * 1000
+        print(f"  {name:<14}{b:>10.1f}{a:>10.1f}")
+    total_b = sum(before.values()) / args.runs * 1000
+    total_a = sum(after.values()) / args.runs * 1000
+    print(f"  {'total':<14}{total_b:>10.1f}{total_a:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
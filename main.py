@@ -26,15 +26,22 @@ import speech_recognition as sr
 from threading import Thread
 import datetime
 import time
-import multiprocessing
 from modules.interrupt_handler import get_interrupt_flag, reset_interrupt_flag
 from modules.ai_agent import handle_user_input, show_history_stats, load_chat_history, load_command_history
 from modules.system_startup import startup_greet
 from modules.background_loops import start_background_threads
+from modules.history_compactor import (
+    history_compaction_loop, maybe_compact_in_background, clear_summaries, RECENT_WINDOW, COMPACT_BATCH
+)
+from modules.history_store import chat_log, command_log
+from modules.history_stats import ensure_stats
 from modules.emotion_analyser import get_sentiment
 from modules.history_manager import *
 from modules.emotion_voice_engine import *
 from modules.handle_command import *
+from modules.command_listener import command_listener
+from modules.barge_in import barge_in
+from modules.task_worker import task_pool
 
 # Import the enhanced CLI interface
 from modules.cli_interface import *
@@ -42,74 +49,82 @@ from modules.cli_interface import *
 # Restore stderr for actual errors we want to see
 sys.stderr = original_stderr
 
-# Initialize context history
-context_history = ""
+def announce_stopped():
+    """Confirm an interrupt; said aloud only if the user didn't just talk over Lily"""
+    print_lily_response("Command stopped.")
+    if not barge_in.recent():
+        speak("Command stopped.")
 
 
-def update_context_history():
-    """Update context history from both recall_context and new JSON history"""
-    global context_history
+def run_task_with_interrupt(query, user_mood):
+    """Run AI task on a warm worker with interrupt support (it syncs its own context)"""
+    # The worker may ask follow-up questions on its own microphone stream
+    command_listener.pause()
     try:
-        context_history = recall_context(5)
-        from modules.ai_agent import get_recent_chat_context
-        recent_context = get_recent_chat_context(last_n=3)
-        if recent_context:
-            context_history = f"{context_history}\n\nRecent conversations:\n{recent_context}"
-    except Exception as e:
-        log_error(e, context="Context Update", extra="Failed to update context history")
-        context_history = ""
+        task = task_pool.submit(query, user_mood)
 
+        while not task_pool.wait(task, timeout=0.1):
+            if get_interrupt_flag():
+                # Asks the worker to stop; kills and replaces it if it doesn't
+                task_pool.cancel(task)
+                # Its replies play here and were flushed by the interrupt; anything it played itself stopped with it
+                barge_in.cut_done()
+                announce_stopped()
+                reset_interrupt_flag()
+                return
 
-def run_task_with_interrupt(query, user_mood):
-    """Run AI task with interrupt support and context"""
-    update_context_history()
-    
-    process = multiprocessing.Process(target=handle_user_input, args=(query, user_mood, context_history))
-    process.start()
-
-    while process.is_alive():
-        if get_interrupt_flag():
-            process.terminate()
-            process.join()
-            print_lily_response("Command stopped.")
-            speak("Command stopped.")
-            reset_interrupt_flag()
-            return
-        time.sleep(0.1)
-    
-    process.join()
+        if task.status == "died":
+            print_status("The task worker stopped unexpectedly; started a new one", "error")
+    finally:
+        command_listener.resume()
+        # Chat turns are logged by the worker; compaction runs here, where it can't be killed mid-way
+        try:
+            maybe_compact_in_background(chat_log.tail(RECENT_WINDOW + COMPACT_BATCH))
+        except Exception as e:
+            log_error(e, context="History Compaction", extra="Turn-count trigger failed")
 
 
 def pre_adjust_microphone():
-    """Pre-adjust microphone for ambient noise silently"""
+    """Open the capture stream (it calibrates itself) and load the speech recognizer"""
     with suppress_stderr():
-
         try:
-            with sr.Microphone(device_index=1) as source:
-                recognizer = sr.Recognizer()
-                recognizer.adjust_for_ambient_noise(source, duration=0.2)
-        except:
+            audio_capture.start()
+            get_stt_backend().warm()
+        except Exception:
             pass
 
 
+def anticipate_command(partial):
+    """
+    Streaming recognition: match commands while the user is still speaking.
+    True once the partial transcript is a complete command, so listening can
+    stop on a short pause instead of waiting out the full end-of-speech silence.
+    """
+    return is_complete_command(partial)
+
+
 def preload_system_data():
     """Preload system resources with animation"""
     try:
         show_startup_sequence()
+        # Forked before the audio threads start; imports and warms up in the background
+        task_pool.start()
         pre_adjust_microphone()
         
         try:
-            chat_history = load_chat_history()
-            command_history = load_command_history()
+            ensure_stats(chat_log, command_log)
+            chat_count = chat_log.count()
+            command_count = command_log.count()
             
-            if chat_history:
-                print(f"  [OK] Loaded {len(chat_history)} previous conversations")
-            if command_history:
-                print(f"  [OK] Loaded {len(command_history)} command executions")
+            if chat_count:
+                print(f"  [OK] Loaded {chat_count} previous conversations")
+            if command_count:
+                print(f"  [OK] Loaded {command_count} command executions")
         except Exception as e:
             log_error(e, context="History Load", extra="Error loading history files")
         
-        update_context_history()
+        # Chat turns are logged in worker processes, so compaction runs from here
+        Thread(target=history_compaction_loop, daemon=True).start()
         
         print("-" * 53)
         print("  [+] All systems ready!")
@@ -154,14 +169,19 @@ def handle_special_commands(query):
             if response.lower() in ['yes', 'y']:
                 import shutil
                 from datetime import datetime
-                backup_file = f"data/chat_history_backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+                backup_dir = f"data/chat_log_backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
                 try:
-                    shutil.copy(HISTORY_FILE, backup_file)
-                    print(f"[+] Backup created: {backup_file}")
-                except:
-                    pass
+                    shutil.copytree(chat_log.directory, backup_dir)
+                except Exception as e:
+                    log_error(e, context="Clear History", extra=f"Backup to {backup_dir} failed")
+                    print_status("Couldn't back up chat history, so it was kept", "error")
+                    speak("I couldn't back up your chat history, so I kept it.")
+                    return True
+                print(f"[+] Backup created: {backup_dir}")
                 
                 save_chat_history([])
+                # Summaries of the deleted turns would keep reaching prompts otherwise
+                clear_summaries(backup_dir)
                 print_status("Chat history cleared. Backup saved.", "success")
                 speak("Chat history cleared. Backup saved.")
             else:
@@ -198,28 +218,33 @@ def main():
     print("-" * 53 + "\n")
 
     lily_sleeping = False
+    # Capture keeps running while the previous command is being recognized
+    listening_ahead = command_listener.start(on_partial=anticipate_command)
+    # Talking over Lily (or saying "stop") cuts her off
+    barge_in.start()
 
     while True:
         try:
             if get_interrupt_flag():
-                print_lily_response("Command stopped.")
-                speak("Command stopped.")
+                announce_stopped()
                 reset_interrupt_flag()
                 continue
 
             if lily_sleeping:
-                query = listen_for_command()
-                    
-                if query and any(kw in query.lower() for kw in ["wake up lily", "hey lily", "lily come back"]):
+                # Matched offline when wake word templates are enrolled
+                if wait_for_wake_word():
                     lily_sleeping = False
                     print_status("Waking up...", "success")
                     speak("I'm back! What do you need?")
                     print_lily_response("I'm back! What do you need?")
-                    update_context_history()
+                    command_listener.resume()
                 continue
 
             # Listen for command (this handles its own status display)
-            query = listen_for_command()
+            if listening_ahead:
+                query = command_listener.next_command(timeout=5, should_stop=get_interrupt_flag)
+            else:
+                query = listen_for_command(on_partial=anticipate_command)
                 
             if not query:
                 continue
@@ -232,6 +257,8 @@ def main():
             if "sleep now" in query:
                 speak("Okay, going quiet. Say 'wake up Lily' to wake me.")
                 lily_sleeping = True
+                # Asleep, only the wake word is listened for
+                command_listener.pause()
                 print("\n[i] Sleep Mode Active")
                 print("    Say 'wake up Lily' to resume...")
                 print("-" * 53 + "\n")
@@ -241,8 +268,8 @@ def main():
                 try:
                     print("\n[*] Session Summary")
                     print("-" * 53)
-                    print(f"  Commands: {len(load_command_history()) if load_command_history() else 0}")
-                    print(f"  Conversations: {len(load_chat_history()) if load_chat_history() else 0}")
+                    print(f"  Commands: {command_log.count()}")
+                    print(f"  Conversations: {chat_log.count()}")
                     print("-" * 53)
                 except:
                     pass
@@ -281,7 +308,6 @@ def main():
                 print_status("Processing...", "processing")
                 run_task_with_interrupt(query, user_mood)
 
-            update_context_history()
             print()  # Add spacing
 
         except KeyboardInterrupt:
@@ -308,11 +334,6 @@ def main():
             print_status(f"An error occurred: {e}", "error")
             log_error(e, context="Main Loop", extra=f"Query: {query if 'query' in locals() else 'N/A'}")
             speak("Sorry, I encountered an error. Let's try again.")
-            
-            try:
-                update_context_history()
-            except:
-                pass
 
 
 def safe_shutdown():
@@ -321,17 +342,12 @@ def safe_shutdown():
         print("\n[*] Shutdown Sequence")
         print("-" * 53)
         
-        try:
-            print("[i] Saving session data...")
-            update_context_history()
-        except:
-            pass
-        
         try:
             show_history_stats()
         except:
             pass
         
+        task_pool.shutdown()
         print("[+] Shutdown complete")
         print("-" * 53)
         
@@ -8,6 +8,10 @@ from modules.tts_output import speak
 from modules.voice_input import listen_for_command
 from modules.history_manager import *
 from modules.emotion_analyser import get_sentiment
+from modules.history_compactor import maybe_compact_in_background, RECENT_WINDOW, COMPACT_BATCH
+from modules.context_builder import conversation_context
+from modules.history_store import chat_log, command_log
+from modules.history_stats import history_stats, ensure_stats
 
 HISTORY_FILE = "data/chat_history.json"
 COMMAND_HISTORY_FILE = "data/command_history.json"
@@ -23,59 +27,44 @@ def load_persona():
     except FileNotFoundError:
         return None
 
-def load_chat_history():
-    """Load previous chat history from JSON file"""
+def load_chat_history(limit=None):
+    """Load previous chat history (the last `limit` entries, or everything)"""
     try:
-        if os.path.exists(HISTORY_FILE):
-            with open(HISTORY_FILE, "r") as f:
-                return json.load(f)
-        return []
-    except json.JSONDecodeError:
-        print("Warning: Chat history file is corrupted. Starting fresh.")
-        return []
+        return chat_log.tail(limit) if limit else chat_log.read_all()
     except Exception as e:
         print(f"Error loading chat history: {e}")
         return []
 
 def save_chat_history(history):
-    """Save chat history to JSON file"""
+    """Replace the stored chat history with `history`"""
     try:
-        with open(HISTORY_FILE, "w") as f:
-            json.dump(history, f, indent=2, ensure_ascii=False)
+        chat_log.replace(history)
+        history_stats.rebuild(chat_log.read_all(), command_log.read_all())
     except Exception as e:
         print(f"Error saving chat history: {e}")
 
-def load_command_history():
-    """Load previous command execution history from JSON file"""
+def load_command_history(limit=None):
+    """Load previous command execution history (the last `limit` entries, or everything)"""
     try:
-        if os.path.exists(COMMAND_HISTORY_FILE):
-            with open(COMMAND_HISTORY_FILE, "r") as f:
-                return json.load(f)
-        return []
-    except json.JSONDecodeError:
-        print("Warning: Command history file is corrupted. Starting fresh.")
-        return []
+        return command_log.tail(limit) if limit else command_log.read_all()
     except Exception as e:
         print(f"Error loading command history: {e}")
         return []
 
 def save_command_history(history):
-    """Save command execution history to JSON file"""
+    """Replace the stored command history with `history`"""
     try:
-        with open(COMMAND_HISTORY_FILE, "w") as f:
-            json.dump(history, f, indent=2, ensure_ascii=False)
+        command_log.replace(history)
+        history_stats.rebuild(chat_log.read_all(), command_log.read_all())
     except Exception as e:
         print(f"Error saving command history: {e}")
 
 
 
 def log_chat(user_message, ai_response):
-    """Log general chat conversations to JSON"""
+    """Log general chat conversations to the segmented chat log"""
     mood = get_sentiment(user_message)
     
-    # Load existing history
-    chat_history = load_chat_history()
-    
     # Create new chat entry
     chat_entry = {
         "timestamp": datetime.now().isoformat(),
@@ -84,13 +73,16 @@ def log_chat(user_message, ai_response):
         "mood": mood
     }
     
-    chat_history.append(chat_entry)
-    
-    # Keep only last 200 chat entries
-    if len(chat_history) > 200:
-        chat_history = chat_history[-200:]
+    # Append-only: older turns move to compressed segments instead of being dropped
+    chat_log.append(chat_entry)
+    conversation_context.append_turn(chat_entry)
+    history_stats.record_chat(chat_entry)
     
-    save_chat_history(chat_history)
+    # Condense turns that fell out of the recent window into day/topic summaries
+    try:
+        maybe_compact_in_background(chat_log.tail(RECENT_WINDOW + COMPACT_BATCH))
+    except Exception:
+        pass
     
     # Also save to history manager if it exists
     try:
@@ -100,11 +92,10 @@ def log_chat(user_message, ai_response):
 
 def get_recent_chat_context(last_n=5):
     """Get recent chat messages for context"""
-    chat_history = load_chat_history()
-    if not chat_history:
+    recent_chats = chat_log.tail(last_n)
+    if not recent_chats:
         return ""
     
-    recent_chats = chat_history[-last_n:]
     context_lines = []
     
     for chat in recent_chats:
@@ -116,11 +107,10 @@ def get_recent_chat_context(last_n=5):
 # REPLACE the old get_recent_command_context with this one
 def get_recent_command_context(last_n=5):
     """Get recent command executions from the new unified log format for context."""
-    command_history = load_command_history()
-    if not command_history:
+    recent_entries = command_log.tail(last_n)
+    if not recent_entries:
         return ""
     
-    recent_entries = command_history[-last_n:]
     context_lines = []
     
     for entry in recent_entries:
@@ -152,8 +142,7 @@ def get_system_info():
 
 # ADD THIS NEW UNIFIED FUNCTION
 def log_execution_attempt(user_query, attempt_num, explanation, command, analysis, output):
-    """Logs a single command execution attempt with full context to the JSON history."""
-    command_history = load_command_history()
+    """Logs a single command execution attempt with full context to the command log."""
 
     # Create a comprehensive log entry
     entry = {
@@ -168,13 +157,8 @@ def log_execution_attempt(user_query, attempt_num, explanation, command, analysi
         "output": output[:1000] if output else "No output." # Store more output
     }
     
-    command_history.append(entry)
-    
-    # Keep the history file from growing too large
-    if len(command_history) > 100:
-        command_history = command_history[-100:]
-    
-    save_command_history(command_history)
+    command_log.append(entry)
+    history_stats.record_command(entry)
 
 
 def is_system_task_request(user_query):
@@ -584,11 +568,10 @@ def execute_with_ai_retry(user_query):
 def get_execution_summary():
     """Provide a summary of recent command executions"""
     try:
-        command_history = load_command_history()
-        if not command_history:
+        recent_commands = command_log.tail(10)
+        if not recent_commands:
             return "No execution history available yet."
-        
-        recent_commands = command_history[-10:]
+
         
         summary_prompt = f"""
 Analyze these recent command execution logs and provide a brief summary:
@@ -629,14 +612,19 @@ def handle_system_task(user_query):
         print("2. Explain what went wrong") 
         print("3. Suggest alternative solutions")
 
-def handle_general_chat(user_query):
+def handle_general_chat(user_query, context=None):
     """Handle general conversation with context from previous chats"""
     
     # Load persona
     persona = load_persona()
     
-    # Get recent chat context
-    context = get_recent_chat_context(last_n=5)
+    # Reuse the caller's incrementally maintained context when given one
+    if context is None:
+        context = conversation_context
+        context.sync()
+    
+    # Recent chat turns plus relevant summaries of older turns
+    context = context.chat_context(user_query, last_n=5)
     
     # Build chat prompt with persona and context
     chat_prompt = f"""
@@ -656,7 +644,7 @@ Keep your response conversational and human-like.
     log_chat(user_query, response)
     return response
 
-def handle_user_input(user_query, user_mood=None, context=""):
+def handle_user_input(user_query, user_mood=None, context=None):
     """Main function to route user input intelligently"""
     if not user_query or user_query.strip() == "":
         speak("I didn't catch that. Could you repeat?")
@@ -666,31 +654,35 @@ def handle_user_input(user_query, user_mood=None, context=""):
     if is_system_task_request(user_query):
         handle_system_task(user_query)
     else:
-        handle_general_chat(user_query)
+        handle_general_chat(user_query, context=context)
 
 def show_history_stats():
-    """Display statistics about chat and command history"""
-    chat_history = load_chat_history()
-    command_history = load_command_history()
+    """Display statistics about chat and command history (no log scans)"""
+    ensure_stats(chat_log, command_log)
+    stats = history_stats.snapshot()
     
     print("\n" + "="*50)
     print("📊 HISTORY STATISTICS")
     print("="*50)
-    print(f"Total chats recorded: {len(chat_history)}")
-    print(f"Total commands executed: {len(command_history)}")
-    
-    if chat_history:
-        latest_chat = chat_history[-1]
-        print(f"Last chat: {latest_chat['timestamp']}")
-    
-    if command_history:
-        latest_command = command_history[-1]
-        print(f"Last command: {latest_command['timestamp']}")
-        
-        # Calculate success rate
-        successful = sum(1 for cmd in command_history if cmd.get('status') == 'SUCCESS')
-        if command_history:
-            success_rate = (successful / len(command_history)) * 100
-            print(f"Command success rate: {success_rate:.1f}%")
+    print(f"Total chats recorded: {stats['chats_total']}")
+    print(f"Chats today: {stats['turns_today']}")
+    print(f"Total commands executed: {stats['commands_total']}")
+    
+    if stats['chats_total']:
+        print(f"Last chat: {chat_log.last_timestamp()}")
+    
+    if stats['commands_total']:
+        print(f"Last command: {command_log.last_timestamp()}")
+        print(f"Command success rate: {stats['command_success_rate']:.1f}%")
+        if stats['command_success_rate_recent'] is not None:
+            print(f"Success rate (last {stats['command_window']}): {stats['command_success_rate_recent']:.1f}%")
+    
+    if stats['avg_llm_latency_ms'] is not None:
+        print(f"Average LLM latency: {stats['avg_llm_latency_ms']:.0f} ms over {stats['llm_calls']} calls")
+    
+    if stats['mood_distribution']:
+        moods = ", ".join(f"{mood} {pct:.0f}%" for mood, pct in
+                          sorted(stats['mood_distribution'].items(), key=lambda m: -m[1]))
+        print(f"Mood distribution: {moods}")
     
     print("="*50 + "\n")
\ No newline at end of file
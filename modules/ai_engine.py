@@ -4,6 +4,7 @@ import google.generativeai as genai
 import time
 import re 
 from pathlib import Path
+from modules.history_stats import history_stats
 
 
 genai.configure(api_key=GEMINI_API_KEY)
@@ -54,8 +55,43 @@ def parse_retry_after_seconds(error_message: str) -> int:
         return int(match.group(1))
     return 60  # Default fallback if no number found
 
+def _record_latency(started):
+    """Stats bookkeeping must never cost the user a reply"""
+    try:
+        history_stats.record_llm_latency(time.perf_counter() - started)
+    except Exception as e:
+        print(f"[Stats] LLM latency not recorded: {e}")
+
+# Models for one-off prompts that must stay out of the chat sessions
+_stateless_models = {}
+
+def ask_stateless(prompt: str) -> str:
+    """
+    One-off generation with no chat history: the prompt and reply are not added
+    to Lily's conversation (used for housekeeping such as history summaries).
+    Returns "" if both models fail.
+    """
+    prompt = prompt.strip()
+    if not prompt:
+        return ""
+    for model_name in (PRIMARY_MODEL, FALLBACK_MODEL):
+        try:
+            if model_name not in _stateless_models:
+                _stateless_models[model_name] = genai.GenerativeModel(model_name)
+            started = time.perf_counter()
+            reply = _stateless_models[model_name].generate_content(prompt).text.strip()
+        except Exception:
+            continue
+        _record_latency(started)
+        if reply:
+            return reply
+    return ""
+
 def ask_lily(prompt: str) -> str:
-    global last_failure_time
+    # last_model_used must be global: assigning it below made it local, so the
+    # primary branch raised UnboundLocalError reading it and every reply fell
+    # through to the fallback model
+    global last_failure_time, last_model_used, cooldown_until
     prompt = prompt.strip()
     if not prompt:
         return ""
@@ -66,34 +102,36 @@ def ask_lily(prompt: str) -> str:
     # Decide which model to use
     if not in_cooldown:
         try:
+            started = time.perf_counter()
             response = primary_chat.send_message(prompt)
             reply = response.text.strip()
-            if reply:
-
-                if last_model_used != "PRIMARY":
-                    print("✅ Primary model is back online.")
-                    last_model_used = "PRIMARY"
-                return reply
-            else:
+            if not reply:
                 raise Exception("Empty reply from primary model.")
+            if last_model_used != "PRIMARY":
+                print("✅ Primary model is back online.")
+                last_model_used = "PRIMARY"
         except Exception as e:
             error_message = str(e)
             retry_after = parse_retry_after_seconds(error_message)
             cooldown_until = time.time() + retry_after
             #print(f"⚠️ Primary model failed. Cooldown activated for {retry_after} seconds.")
             last_model_used = "FALLBACK"
+        else:
+            _record_latency(started)
+            return reply
 
     # Fallback execution
     try:
+        started = time.perf_counter()
         response = fallback_chat.send_message(prompt)
         reply = response.text.strip()
-        if reply:
-            if last_model_used != "FALLBACK":
-                print("🔁 Using fallback model.")
-                last_model_used = "FALLBACK"
-            return reply
-        else:
-            return "I'm having trouble answering right now. Please try again later."
     except Exception:
         print("❌ Fallback model also failed.")
         return "Sorry, I couldn't respond due to temporary issues."
+    _record_latency(started)
+    if reply:
+        if last_model_used != "FALLBACK":
+            print("🔁 Using fallback model.")
+            last_model_used = "FALLBACK"
+        return reply
+    return "I'm having trouble answering right now. Please try again later."
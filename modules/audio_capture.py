@@ -0,0 +1,297 @@
+# modules/audio_capture.py
+
+import os
+import time
+import threading
+from collections import deque
+from contextlib import contextmanager
+import numpy as np
+
+try:
+    import pyaudio
+except Exception:  # optional; voice_input falls back to sr.Microphone
+    pyaudio = None
+
+try:
+    import webrtcvad
+except Exception:  # optional; the energy detector works on its own
+    webrtcvad = None
+
+# Input device (env LILY_MIC_DEVICE; empty for the system default)
+_device = os.getenv("LILY_MIC_DEVICE", "1")
+DEVICE_INDEX = int(_device) if _device.strip() else None
+
+SAMPLE_RATE = 16000
+SAMPLE_WIDTH = 2  # signed 16-bit PCM
+# 30 ms frames: the VAD decision unit (also a frame size webrtcvad accepts)
+FRAME_MS = 30
+FRAME_SAMPLES = SAMPLE_RATE * FRAME_MS // 1000
+
+# How much recent audio is kept
+RING_SECONDS = 10
+# Audio kept from before the detected start so the first syllable isn't clipped
+PRE_ROLL_MS = 300
+# This much continuous speech starts an utterance, this much silence ends it
+START_MS = 90
+END_SILENCE_MS = 700
+# Shorter end silence once the transcript so far is a complete command
+QUICK_END_MS = 300
+
+# Energy detector: speech is SPEECH_RATIO times the ambient level, never below MIN_ENERGY
+MIN_ENERGY = 150.0          # int16 RMS
+SPEECH_RATIO = 3.0
+# How fast the ambient estimate follows quiet frames, and drifts during speech
+NOISE_ALPHA = 0.05
+NOISE_ALPHA_SPEECH = 0.002
+# The first frames after opening only calibrate the ambient level
+CALIBRATION_MS = 300
+
+# webrtcvad aggressiveness, 0 (lenient) to 3 (strict)
+WEBRTC_MODE = 2
+
+
+def _frames(ms):
+    return max(1, ms // FRAME_MS)
+
+
+class AudioCapture:
+    """
+    Microphone stream that stays open for the life of the process.
+
+    The stream's callback cuts audio into FRAME_MS frames, classifies each one
+    as speech or not and appends it to a ring buffer holding the last
+    RING_SECONDS. Quiet frames keep updating the ambient level, so the speech
+    threshold follows the room without a calibration pause before every
+    command. read_utterance() cuts the next utterance out of the ring,
+    including PRE_ROLL_MS from before speech was detected, so speech that
+    begins before anyone is waiting for it isn't lost.
+
+    webrtcvad is used for the speech decision when installed, with the energy
+    gate still rejecting near-silent frames.
+    """
+
+    def __init__(self, device_index=DEVICE_INDEX, sample_rate=SAMPLE_RATE):
+        self.device_index = device_index
+        self.sample_rate = sample_rate
+        self._cond = threading.Condition()
+        self._reset_state()
+
+    def _reset_state(self):
+        self._pid = os.getpid()
+        self._pa = None
+        self._stream = None
+        self._ring = deque(maxlen=RING_SECONDS * 1000 // FRAME_MS)
+        self._next_seq = 0
+        self._pending = b""
+        self._claims = 0
+        self.epoch = 0
+        self.noise_floor = None
+        self.energy = 0.0
+        self._vad = webrtcvad.Vad(WEBRTC_MODE) if webrtcvad is not None else None
+
+    # ---------- input device ----------
+
+    def start(self):
+        """Open the stream if it isn't open; returns False if capture is unavailable"""
+        # A forked task worker can't use the parent's stream
+        if self._pid != os.getpid():
+            self._reset_state()
+        if self._stream is not None:
+            return True
+        if pyaudio is None:
+            return False
+        from modules.voice_input import suppress_stderr
+        with suppress_stderr():
+            try:
+                self._pa = pyaudio.PyAudio()
+                self._stream = self._pa.open(
+                    format=pyaudio.paInt16, channels=1, rate=self.sample_rate, input=True,
+                    input_device_index=self.device_index, frames_per_buffer=FRAME_SAMPLES,
+                    stream_callback=self._on_audio,
+                )
+                self._stream.start_stream()
+            except Exception as e:
+                print(f"[Capture] Could not open microphone {self.device_index}: {e}")
+                self.stop()
+                return False
+        return True
+
+    def stop(self):
+        """Close the stream (start() reopens it)"""
+        try:
+            if self._stream is not None:
+                self._stream.stop_stream()
+                self._stream.close()
+        except Exception:
+            pass
+        try:
+            if self._pa is not None:
+                self._pa.terminate()
+        except Exception:
+            pass
+        self._stream = None
+        self._pa = None
+
+    def is_open(self):
+        return self._stream is not None and self._pid == os.getpid()
+
+    # ---------- capture thread ----------
+
+    def _on_audio(self, in_data, frame_count, time_info, status):
+        data = self._pending + in_data
+        frame_bytes = FRAME_SAMPLES * SAMPLE_WIDTH
+        usable = len(data) - len(data) % frame_bytes
+        self._pending = data[usable:]
+        for start in range(0, usable, frame_bytes):
+            self._add_frame(data[start:start + frame_bytes])
+        return (None, pyaudio.paContinue)
+
+    def _add_frame(self, pcm):
+        samples = np.frombuffer(pcm, dtype=np.int16).astype(np.float32)
+        energy = float(np.sqrt(np.mean(samples * samples)))
+        speech = self._classify(pcm, energy)
+        with self._cond:
+            self.energy = energy
+            self._ring.append((self._next_seq, time.monotonic(), pcm, speech))
+            self._next_seq += 1
+            self._cond.notify_all()
+
+    def _classify(self, pcm, energy):
+        """Speech or not for one frame; also updates the ambient level"""
+        if self.noise_floor is None or self._next_seq < _frames(CALIBRATION_MS):
+            # Calibrating: average the first frames, never speech
+            floor = self.noise_floor if self.noise_floor is not None else energy
+            self.noise_floor = floor + (energy - floor) / (self._next_seq + 1)
+            return False
+        if self._vad is not None:
+            try:
+                speech = energy > MIN_ENERGY and self._vad.is_speech(pcm, self.sample_rate)
+            except Exception:
+                speech = energy > self.threshold
+        else:
+            speech = energy > self.threshold
+        # Quiet frames track the room; speech frames only nudge it, so steady
+        # new noise is absorbed instead of counting as speech forever
+        alpha = NOISE_ALPHA_SPEECH if speech else NOISE_ALPHA
+        self.noise_floor += alpha * (energy - self.noise_floor)
+        return speech
+
+    @property
+    def threshold(self):
+        """Current speech threshold (int16 RMS)"""
+        return max(MIN_ENERGY, (self.noise_floor or 0.0) * SPEECH_RATIO)
+
+    # ---------- reading ----------
+
+    @contextmanager
+    def exclusive(self):
+        """
+        A foreground read (a command, an interactive question, the wake word)
+        takes the microphone: background readers see epoch change and drop
+        what they were cutting, and wait until claimed() is false again.
+        """
+        with self._cond:
+            self._claims += 1
+            self.epoch += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._claims -= 1
+                self.epoch += 1
+
+    def claimed(self):
+        return self._claims > 0
+
+    def read_frames(self, cursor=None, timeout=0.1):
+        """
+        Frames (seq, time, pcm, speech) captured from cursor on, waiting up to
+        timeout for the first one, and the cursor to pass next time. None starts
+        at the newest frame.
+        """
+        with self._cond:
+            if cursor is None:
+                cursor = self._next_seq
+            if self._next_seq <= cursor:
+                self._cond.wait(timeout)
+            frames = [f for f in self._ring if f[0] >= cursor]
+            return frames, self._next_seq
+
+    def read_utterance(self, timeout=5, phrase_time_limit=7, should_stop=None, on_audio=None, times=None):
+        """
+        Wait for the next utterance and return its 16-bit mono PCM (with
+        pre-roll), or None if nobody spoke within timeout seconds or
+        should_stop() became true. Speech that started up to PRE_ROLL_MS before
+        the call is still picked up.
+
+        on_audio(pcm) is called with each new piece of the utterance as it is
+        captured (for streaming recognition). If it returns True, what was said
+        so far is complete and the utterance ends after QUICK_END_MS of silence
+        instead of END_SILENCE_MS.
+
+        times, if given, is a dict that receives the time.monotonic() capture
+        times of the first and last speech frames as "start" and "end".
+        """
+        if not self.start():
+            return None
+        pre_roll = _frames(PRE_ROLL_MS)
+        start_frames = _frames(START_MS)
+        end_frames = _frames(END_SILENCE_MS)
+        max_frames = _frames(int(phrase_time_limit * 1000)) if phrase_time_limit else None
+        deadline = time.monotonic() + timeout if timeout else None
+
+        with self._cond:
+            cursor = max(self._next_seq - pre_roll, self._ring[0][0] if self._ring else 0)
+        utterance = None
+        speech_run = silence_run = 0
+        speech_end = None
+        fed = 0
+
+        def feed():
+            nonlocal fed, end_frames
+            if on_audio is not None and utterance and fed < len(utterance):
+                complete = on_audio(b"".join(utterance[fed:]))
+                end_frames = _frames(QUICK_END_MS if complete else END_SILENCE_MS)
+                fed = len(utterance)
+
+        while True:
+            with self._cond:
+                if self._next_seq <= cursor:
+                    self._cond.wait(0.1)
+                oldest = self._ring[0][0] if self._ring else self._next_seq
+                frames = [f for f in self._ring if f[0] >= max(cursor, oldest)]
+                ring = list(self._ring) if utterance is None else None
+            if should_stop is not None and should_stop():
+                return None
+            if not frames:
+                if utterance is None and deadline is not None and time.monotonic() > deadline:
+                    return None
+                continue
+            cursor = frames[-1][0] + 1
+
+            for seq, at, pcm, speech in frames:
+                if speech:
+                    speech_end = at
+                if utterance is None:
+                    speech_run = speech_run + 1 if speech else 0
+                    if speech_run == 1 and times is not None:
+                        times["start"] = at
+                    if speech_run >= start_frames:
+                        first = seq - speech_run + 1 - pre_roll
+                        utterance = [f[2] for f in ring if first <= f[0] <= seq]
+                    continue
+                utterance.append(pcm)
+                silence_run = 0 if speech else silence_run + 1
+                if silence_run >= end_frames or (max_frames and len(utterance) >= max_frames):
+                    feed()
+                    if times is not None:
+                        times["end"] = speech_end
+                    return b"".join(utterance)
+            feed()
+
+            if utterance is None and deadline is not None and time.monotonic() > deadline:
+                return None
+
+
+# Shared microphone for this process
+audio_capture = AudioCapture()
@@ -0,0 +1,246 @@
+# modules/audio_dsp.py
+
+import numpy as np
+from scipy.signal import lfilter, correlate
+from scipy.fft import dct
+
+# WSOLA analysis frame and how far each frame may slide to line up with the last one
+WSOLA_FRAME_MS = 20.0
+WSOLA_TOLERANCE_MS = 10.0
+
+# The compressor's gain is worked out once per control block and interpolated
+# between blocks; 1 ms is well below the 5 ms attack, so the envelope matches
+# pydub's per-sample loop closely.
+CONTROL_MS = 1.0
+
+
+def db_to_ratio(db):
+    return 10 ** (db / 20.0)
+
+
+def normalize(samples, headroom=0.1):
+    """
+    Peak normalization, same as pydub.effects.normalize: scale so the loudest
+    sample sits `headroom` dB below full scale. Silence is returned unchanged.
+    """
+    peak = float(np.max(np.abs(samples))) if len(samples) else 0.0
+    if peak == 0.0:
+        return samples
+    return (samples * np.float32(db_to_ratio(-headroom) / peak)).astype(np.float32)
+
+
+def normalize_rms(samples, target_dbfs=-20.0, headroom=0.1):
+    """RMS normalization to `target_dbfs`, limited so peaks stay `headroom` dB below full scale"""
+    if not len(samples):
+        return samples
+    rms = float(np.sqrt(np.mean(np.square(samples, dtype=np.float64))))
+    peak = float(np.max(np.abs(samples)))
+    if rms == 0.0:
+        return samples
+    gain = min(db_to_ratio(target_dbfs) / rms, db_to_ratio(-headroom) / peak)
+    return (samples * np.float32(gain)).astype(np.float32)
+
+
+def windowed_rms(samples, window):
+    """RMS of the `window` samples before each index (pydub's rms_at), via a running sum"""
+    squares = np.concatenate(([0.0], np.cumsum(np.square(samples, dtype=np.float64))))
+    idx = np.arange(len(samples))
+    start = np.maximum(idx - window, 0)
+    counts = idx - start
+    sums = squares[idx] - squares[start]
+    rms = np.zeros(len(samples))
+    nonzero = counts > 0
+    rms[nonzero] = np.sqrt(np.maximum(sums[nonzero], 0.0) / counts[nonzero])
+    return rms
+
+
+def compress(samples, sr, threshold=-20.0, ratio=4.0, attack=5.0, release=50.0):
+    """
+    Downward compressor with the same behaviour as pydub.effects.compress_dynamic_range.
+
+    The level detector (RMS over the attack window) is computed for every sample
+    at once; the attack/release envelope, which is inherently recursive, runs at
+    CONTROL_MS resolution and the resulting gain curve is interpolated back to
+    the sample rate.
+    """
+    n = len(samples)
+    if n == 0:
+        return samples
+
+    thresh = db_to_ratio(threshold)
+    attack_frames = sr * attack / 1000.0
+    release_frames = sr * release / 1000.0
+    rms = windowed_rms(samples, int(attack_frames))
+
+    # dB over threshold for every sample, scaled by the ratio
+    over_db = np.zeros(n)
+    loud = rms > thresh
+    over_db[loud] = 20 * np.log10(rms[loud] / thresh)
+    max_att = (1 - 1.0 / ratio) * over_db
+
+    block = max(1, int(sr * CONTROL_MS / 1000))
+    starts = np.arange(0, n, block)
+    block_max = np.maximum.reduceat(max_att, starts)
+    block_loud = np.logical_or.reduceat(loud, starts)
+    block_len = np.diff(np.append(starts, n))
+
+    envelope = np.empty(len(starts))
+    attenuation = 0.0
+    for i in range(len(starts)):
+        target = block_max[i]
+        steps = block_len[i]
+        if block_loud[i] and attenuation <= target:
+            attenuation = min(attenuation + steps * target / attack_frames, target)
+        else:
+            attenuation = max(attenuation - steps * target / release_frames, 0.0)
+        envelope[i] = attenuation
+
+    # Gain at each block end, interpolated per sample
+    ends = starts + block_len - 1
+    att = np.interp(np.arange(n), ends, envelope, left=0.0)
+    return (samples * db_to_ratio(-att)).astype(np.float32)
+
+
+def high_pass(samples, sr, cutoff):
+    """
+    First-order RC high-pass (6 dB/octave below `cutoff`), the same recurrence as
+    pydub's high_pass_filter, run as a single IIR filter call
+    """
+    if len(samples) == 0:
+        return samples
+    rc = 1.0 / (cutoff * 2 * np.pi)
+    dt = 1.0 / sr
+    alpha = rc / (rc + dt)
+    # y[0] = x[0], then y[i] = alpha * (y[i-1] + x[i] - x[i-1])
+    zi = [(1 - alpha) * samples[0]]
+    filtered, _ = lfilter([alpha, -alpha], [1.0, -alpha], samples, zi=zi)
+    return np.clip(filtered, -1.0, 1.0).astype(np.float32)
+
+
+def resample(samples, factor):
+    """
+    Play `samples` back `factor` times faster by linear interpolation:
+    duration scales by 1/factor and pitch by factor
+    """
+    if factor == 1.0 or len(samples) == 0:
+        return samples
+    new_length = max(1, int(round(len(samples) / factor)))
+    positions = np.linspace(0, len(samples) - 1, new_length)
+    return np.interp(positions, np.arange(len(samples)), samples).astype(np.float32)
+
+
+def wsola_stretch(samples, sr, rate, frame_ms=WSOLA_FRAME_MS, tolerance_ms=WSOLA_TOLERANCE_MS):
+    """
+    Time-stretch without changing pitch (WSOLA): output is len/rate samples long.
+
+    Hann-windowed frames are overlap-added at a fixed 50% output hop; each
+    analysis frame is taken near its nominal position, shifted by up to
+    `tolerance_ms` to the offset whose waveform best continues the previous
+    frame (cross-correlation), which keeps voiced sounds phase-coherent.
+    """
+    if rate == 1.0 or len(samples) == 0:
+        return samples
+    frame = int(sr * frame_ms / 1000) // 2 * 2
+    hop = frame // 2
+    tol = int(sr * tolerance_ms / 1000)
+    if len(samples) < frame:
+        return resample(samples, rate)
+
+    out_len = int(len(samples) / rate)
+    n_frames = out_len // hop + 1
+    # Periodic Hann: windows at a half-frame hop sum to exactly one
+    window = np.hanning(frame + 1)[:frame].astype(np.float32)
+    padded = np.pad(samples.astype(np.float32), (tol, frame + 2 * tol + int(hop * rate) + frame))
+    out = np.zeros(n_frames * hop + frame, dtype=np.float32)
+
+    prev = 0
+    for k in range(n_frames):
+        nominal = int(k * hop * rate)
+        if k == 0:
+            pos = nominal
+        else:
+            # Natural continuation of the previous frame, matched within +-tol of nominal
+            template = padded[tol + prev + hop:tol + prev + hop + frame]
+            region = padded[nominal:nominal + frame + 2 * tol]
+            pos = nominal + int(np.argmax(correlate(region, template, mode="valid"))) - tol
+        out[k * hop:k * hop + frame] += padded[tol + pos:tol + pos + frame] * window
+        prev = pos
+    return out[:out_len]
+
+
+def _hz_to_mel(hz):
+    return 2595.0 * np.log10(1.0 + np.asarray(hz) / 700.0)
+
+
+def _mel_to_hz(mel):
+    return 700.0 * (10 ** (np.asarray(mel) / 2595.0) - 1.0)
+
+
+_MEL_BANKS = {}
+
+
+def mel_filterbank(sr, n_fft, n_mels=26, fmin=60.0, fmax=None):
+    """Triangular mel filters as an (n_mels, n_fft // 2 + 1) matrix, cached per shape"""
+    key = (sr, n_fft, n_mels, fmin, fmax)
+    if key not in _MEL_BANKS:
+        fmax = fmax or sr / 2
+        edges = _mel_to_hz(np.linspace(_hz_to_mel(fmin), _hz_to_mel(fmax), n_mels + 2))
+        bins = np.fft.rfftfreq(n_fft, 1.0 / sr)
+        lower, center, upper = edges[:-2, None], edges[1:-1, None], edges[2:, None]
+        rising = (bins - lower) / (center - lower)
+        falling = (upper - bins) / (upper - center)
+        _MEL_BANKS[key] = np.maximum(0.0, np.minimum(rising, falling)).astype(np.float32)
+    return _MEL_BANKS[key]
+
+
+def mfcc(samples, sr, n_mfcc=13, frame_ms=25.0, hop_ms=10.0, n_mels=26):
+    """
+    MFCC features as (frames, n_mfcc), with per-utterance mean removal so a
+    different microphone or room shifts them less. Plain numpy: no JIT warm-up.
+    """
+    frame = int(sr * frame_ms / 1000)
+    hop = int(sr * hop_ms / 1000)
+    if len(samples) < frame:
+        samples = np.pad(samples, (0, frame - len(samples)))
+    # Pre-emphasis lifts the consonants the spectrum would otherwise bury
+    emphasized = np.append(samples[0], samples[1:] - 0.97 * samples[:-1]).astype(np.float32)
+    count = 1 + (len(emphasized) - frame) // hop
+    index = np.arange(frame)[None, :] + hop * np.arange(count)[:, None]
+    frames = emphasized[index] * np.hamming(frame).astype(np.float32)
+    n_fft = 1 << (frame - 1).bit_length()
+    power = np.abs(np.fft.rfft(frames, n_fft)) ** 2 / n_fft
+    energies = np.log(power @ mel_filterbank(sr, n_fft, n_mels).T + 1e-10)
+    features = dct(energies, type=2, axis=1, norm="ortho")[:, :n_mfcc]
+    return (features - features.mean(axis=0)).astype(np.float32)
+
+
+def dtw_distance(a, b, band=None):
+    """
+    Dynamic time warping distance between two feature sequences (frames, dims),
+    Euclidean per frame, normalized by the combined length. band limits how
+    far the path may stray from the diagonal (in frames); None is unlimited.
+    """
+    n, m = len(a), len(b)
+    if not n or not m:
+        return float("inf")
+    cost = np.sqrt(((a[:, None, :] - b[None, :, :]) ** 2).sum(axis=2)).tolist()
+    inf = float("inf")
+    previous = [inf] * (m + 1)
+    previous[0] = 0.0
+    for i in range(1, n + 1):
+        row = cost[i - 1]
+        current = [inf] * (m + 1)
+        if band is None:
+            lo, hi = 1, m
+        else:
+            center = i * m // n
+            lo, hi = max(1, center - band), min(m, center + band)
+        for j in range(lo, hi + 1):
+            best = previous[j - 1]
+            if previous[j] < best:
+                best = previous[j]
+            if current[j - 1] < best:
+                best = current[j - 1]
+            current[j] = row[j - 1] + best
+        previous = current
+    return previous[m] / (n + m)
@@ -0,0 +1,250 @@
+# modules/audio_player.py
+
+import os
+import time
+import queue
+import threading
+import subprocess
+import multiprocessing
+import numpy as np
+from modules.interrupt_handler import register_interrupt_callback
+
+try:
+    import sounddevice as sd
+except Exception:  # optional; falls back to a persistent ffplay pipe
+    sd = None
+
+SAMPLE_RATE = 24000
+CHANNELS = 1
+SAMPLE_WIDTH = 2  # signed 16-bit PCM
+
+# PCM is written in small blocks so a flush takes effect within one block
+BLOCK_MS = 40
+# How far ahead of real time we keep the output device fed
+LEAD_MS = 120
+
+# time.monotonic() at which the speaker goes quiet, the pid playing, and the RMS
+# of the block last written. Shared memory created before any task worker forks,
+# so audio played by a worker is visible here too (the command listener and
+# barge-in use them to tell Lily's own voice from the user's).
+_audible_until = multiprocessing.RawValue("d", 0.0)
+_audible_pid = multiprocessing.RawValue("i", 0)
+_output_level = multiprocessing.RawValue("d", 0.0)
+
+
+def audible_until():
+    """When the audio written so far (by this process or a task worker) stops playing"""
+    return _audible_until.value
+
+
+def audible_pid():
+    """Process whose audio is playing (or played last)"""
+    return _audible_pid.value
+
+
+def output_level():
+    """RMS (int16 scale) of the audio block most recently sent to the speaker"""
+    return _output_level.value
+
+
+def playback_state():
+    """The shared playback values, to hand to a worker started with spawn/forkserver"""
+    return _audible_until, _audible_pid, _output_level
+
+
+def use_playback_state(state):
+    """Publish into the given shared values (a worker's half of playback_state())"""
+    global _audible_until, _audible_pid, _output_level
+    _audible_until, _audible_pid, _output_level = state
+
+
+FFPLAY_CMD = [
+    "ffplay", "-nodisp", "-autoexit", "-loglevel", "quiet",
+    "-fflags", "nobuffer", "-flags", "low_delay",
+    "-probesize", "32", "-analyzeduration", "0",
+    # Raw demuxer options; the raw demuxer is mono by default
+    "-f", "s16le", "-sample_rate", str(SAMPLE_RATE), "-i", "pipe:0",
+]
+
+
+class PlaybackHandle:
+    """Completion handle for one queued clip"""
+
+    def __init__(self, duration):
+        self.duration = duration
+        self.done = threading.Event()
+        self.completed = False  # False if the clip was flushed before it finished
+
+    def wait(self, timeout=None):
+        self.done.wait(timeout)
+        return self.completed
+
+
+class AudioPlayer:
+    """
+    Long-lived audio output shared by every utterance.
+
+    One output stream (sounddevice if installed, otherwise a single ffplay
+    process reading raw PCM from a pipe) stays open for the life of the process.
+    Clips are queued and written back to back, so consecutive chunks play without
+    a gap, and flush() drops everything queued or buffered immediately.
+    """
+
+    def __init__(self, sample_rate=SAMPLE_RATE):
+        self.sample_rate = sample_rate
+        self.bytes_per_ms = sample_rate * CHANNELS * SAMPLE_WIDTH // 1000
+        self._lock = threading.Lock()
+        self._reset_state()
+
+    def _reset_state(self):
+        self._pid = os.getpid()
+        self._queue = queue.Queue()
+        self._generation = 0
+        self._proc = None
+        self._stream = None
+        self._thread = None
+        self._current = None
+
+    # ---------- output device ----------
+
+    def _open_output(self):
+        if sd is not None:
+            if self._stream is None:
+                self._stream = sd.RawOutputStream(samplerate=self.sample_rate, channels=CHANNELS,
+                                                  dtype="int16", latency="low")
+                self._stream.start()
+            return
+        if self._proc is None or self._proc.poll() is not None:
+            self._proc = subprocess.Popen(FFPLAY_CMD, stdin=subprocess.PIPE,
+                                          stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    def _write(self, block):
+        if self._stream is not None:
+            self._stream.write(block)
+        else:
+            self._proc.stdin.write(block)
+            self._proc.stdin.flush()
+
+    def _drop_output(self):
+        """Throw away whatever the device has buffered"""
+        if self._stream is not None:
+            try:
+                self._stream.abort()
+                self._stream.close()
+            except Exception:
+                pass
+            self._stream = None
+        if self._proc is not None:
+            try:
+                self._proc.kill()
+            except Exception:
+                pass
+            self._proc = None
+
+    # ---------- worker ----------
+
+    def _ensure_worker(self):
+        # A forked task worker must not reuse the parent's thread or pipe
+        if self._pid != os.getpid():
+            self._reset_state()
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        block_bytes = BLOCK_MS * self.bytes_per_ms
+        play_until = 0.0
+        while True:
+            generation, pcm, handle = self._queue.get()
+            if generation != self._generation:
+                handle.done.set()
+                continue
+
+            self._current = handle
+            try:
+                with self._lock:
+                    self._open_output()
+                now = time.perf_counter()
+                play_until = max(play_until, now)
+                for offset in range(0, len(pcm), block_bytes):
+                    if generation != self._generation:
+                        break
+                    block = pcm[offset:offset + block_bytes]
+                    with self._lock:
+                        if generation != self._generation:
+                            break
+                        self._write(block)
+                    play_until += len(block) / (self.bytes_per_ms * 1000)
+                    samples = np.frombuffer(block, dtype=np.int16).astype(np.float32)
+                    _output_level.value = float(np.sqrt(np.mean(samples * samples))) if len(samples) else 0.0
+                    _audible_pid.value = self._pid
+                    _audible_until.value = time.monotonic() + play_until - time.perf_counter()
+                    # Stay only LEAD_MS ahead so a flush has little left to cut
+                    ahead = play_until - time.perf_counter() - LEAD_MS / 1000
+                    if ahead > 0:
+                        time.sleep(ahead)
+                else:
+                    # Wait out the audio still in the device buffer
+                    remaining = play_until - time.perf_counter()
+                    if remaining > 0 and self._queue.empty():
+                        time.sleep(remaining)
+                    handle.completed = generation == self._generation
+            except Exception as e:
+                print(f"[Audio Play Error] {e}")
+                with self._lock:
+                    self._drop_output()
+                play_until = 0.0
+            finally:
+                self._current = None
+                handle.done.set()
+
+    # ---------- public API ----------
+
+    def enqueue_pcm(self, pcm):
+        """Queue raw s16le mono PCM at self.sample_rate; returns a PlaybackHandle"""
+        self._ensure_worker()
+        handle = PlaybackHandle(len(pcm) / (self.bytes_per_ms * 1000))
+        self._queue.put((self._generation, pcm, handle))
+        return handle
+
+    def enqueue_segment(self, segment):
+        """Queue a pydub AudioSegment"""
+        segment = segment.set_frame_rate(self.sample_rate).set_channels(CHANNELS).set_sample_width(SAMPLE_WIDTH)
+        return self.enqueue_pcm(segment.raw_data)
+
+    def play_file(self, path):
+        """Decode an audio file and play it; blocks until done. False if flushed."""
+        from pydub import AudioSegment
+        return self.enqueue_segment(AudioSegment.from_file(str(path))).wait()
+
+    def flush(self):
+        """Stop playback now and drop everything queued"""
+        if self._pid != os.getpid():
+            return
+        with self._lock:
+            self._generation += 1
+            self._drop_output()
+            # Only the playing process can say its audio stopped
+            if _audible_pid.value == self._pid:
+                _audible_until.value = min(_audible_until.value, time.monotonic())
+        while True:
+            try:
+                _, _, handle = self._queue.get_nowait()
+                handle.done.set()
+            except queue.Empty:
+                break
+
+    @property
+    def generation(self):
+        """Increments on every flush; lets callers notice they were cut off"""
+        return self._generation
+
+    def is_playing(self):
+        return self._current is not None or not self._queue.empty()
+
+
+# Shared player for this process
+player = AudioPlayer()
+
+# Ctrl+C interrupt (and later voice barge-in) cuts speech immediately
+register_interrupt_callback(player.flush)
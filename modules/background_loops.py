@@ -1,12 +1,15 @@
 from threading import Thread
 from modules.reminider_watcher import check_reminders_loop
 from modules.notification_watcher import watch_notifications_loop
+from modules.history_compactor import history_compaction_loop
 
 def start_background_threads():
     reminder_thread = Thread(target=check_reminders_loop, daemon=True)
     notification_thread = Thread(target=watch_notifications_loop, daemon=True)
+    compaction_thread = Thread(target=history_compaction_loop, daemon=True)
 
     reminder_thread.start()
     notification_thread.start()
+    compaction_thread.start()
 
-    print("✅ Background threads started: Reminder & Notification Watchers.")
+    print("✅ Background threads started: Reminder, Notification & History Compaction.")
@@ -0,0 +1,233 @@
+# modules/barge_in.py
+
+import os
+import time
+import threading
+import statistics
+from collections import deque
+import numpy as np
+from modules.audio_capture import audio_capture, FRAME_MS
+from modules.audio_player import audible_until, audible_pid, output_level
+from modules.interrupt_handler import set_interrupt_flag
+
+# User speech must be this many times louder than the echo expected from Lily's
+# own output (env LILY_BARGE_RATIO); raise it if her voice trips barge-in
+BARGE_RATIO = float(os.getenv("LILY_BARGE_RATIO", "2.0"))
+# This much speech above the echo gate cuts playback
+BARGE_MS = 60
+# Playback is still echoing for this long after the last block was played
+ECHO_TAIL = 0.3
+# Mic/output level ratio is learned from this much of Lily talking before barge-in arms
+ECHO_CALIBRATION_MS = 300
+ECHO_ALPHA = 0.05
+# The output level is published when a block is written, up to the player's lead ahead of the speaker
+ECHO_WINDOW_MS = 200
+# Speech that didn't clear the echo gate is checked for "stop" once it ends
+KEYWORD_END_MS = 300
+# Only the end of a longer run is kept for that check
+KEYWORD_RUN_MS = 3000
+# Transcripts that only asked Lily to stop (not passed on as commands)
+STOP_PHRASES = ("stop", "stop it", "lily stop", "stop lily", "okay stop", "please stop", "shut up")
+# Print every cut (env LILY_BARGE_TIMINGS=1)
+REPORT_BARGE_TIMINGS = os.getenv("LILY_BARGE_TIMINGS", "") not in ("", "0")
+
+
+def _frames(ms):
+    return max(1, ms // FRAME_MS)
+
+
+class Cut:
+    """One barge-in: from the first frame of the user's speech to silence"""
+
+    def __init__(self, via, onset, detected, pid):
+        self.via = via              # 'speech' or 'keyword'
+        self.onset = onset          # capture time of the first frame of the user's speech
+        self.detected = detected    # when the interrupt flag was set
+        self.pid = pid              # process whose audio was cut
+        self.cut = None             # when that audio stopped
+
+    def timings(self):
+        return {
+            "via": self.via,
+            "detect_ms": round((self.detected - self.onset) * 1000, 1),
+            "cut_ms": round((self.cut - self.onset) * 1000, 1) if self.cut is not None else None,
+        }
+
+
+class BargeIn:
+    """
+    Stop Lily when the user talks over her.
+
+    A thread follows the capture stream while she is audible. Frames the VAD
+    calls speech are compared with the echo expected from what the player is
+    sending to the speaker (its output level times the mic/speaker coupling,
+    learned while she talks); BARGE_MS of speech BARGE_RATIO above that echo
+    sets the interrupt flag, which flushes the speech queue and the player.
+    Speech too quiet to clear the gate is still checked for the keyword "stop"
+    when it ends, which is slower but works over loud playback.
+
+    Cut latency is measured from the first frame of the user's speech until
+    the audio stopped: at once for playback in this process, and when
+    cut_done() is called for a task worker's playback (after it is stopped).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reset_state()
+
+    def _reset_state(self):
+        self._pid = os.getpid()
+        self._thread = None
+        self.coupling = None
+        self._coupling_frames = 0
+        self._levels = deque()
+        self.pending = None
+        self.cuts = deque(maxlen=50)
+
+    def start(self):
+        """Start watching for barge-in; False if the capture stream is unavailable"""
+        if self._pid != os.getpid():
+            self._reset_state()
+        if self._thread is not None and self._thread.is_alive():
+            return True
+        if not audio_capture.start():
+            return False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return True
+
+    # ---------- echo gate ----------
+
+    def _expected_echo(self, now):
+        """Mic level Lily's own output should produce right now"""
+        self._levels.append((now, output_level()))
+        while self._levels and self._levels[0][0] < now - ECHO_WINDOW_MS / 1000:
+            self._levels.popleft()
+        level = max(l for _, l in self._levels)
+        return level, (self.coupling or 0.0) * level
+
+    def _learn(self, energy, level):
+        if level <= 0:
+            return
+        ratio = energy / level
+        if self.coupling is None:
+            self.coupling = ratio
+        elif ratio < self.coupling * BARGE_RATIO:
+            # Frames loud enough to be the user don't count as echo
+            self.coupling += ECHO_ALPHA * (ratio - self.coupling)
+        self._coupling_frames += 1
+
+    # ---------- watcher thread ----------
+
+    def _run(self):
+        barge_frames = _frames(BARGE_MS)
+        end_frames = _frames(KEYWORD_END_MS)
+        calibration = _frames(ECHO_CALIBRATION_MS)
+        pre_roll = deque(maxlen=_frames(150))
+        cursor = None
+        run = None          # (time, pcm) of the current speech run during playback
+        loud = silence = 0
+        triggered = False   # this run already cut playback
+
+        while True:
+            frames, cursor = audio_capture.read_frames(cursor)
+            for _, at, pcm, speech in frames:
+                audible = at < audible_until() + ECHO_TAIL
+                if not audible and not run:
+                    pre_roll.append(pcm)
+                    triggered = False
+                    continue
+                samples = np.frombuffer(pcm, dtype=np.int16).astype(np.float32)
+                energy = float(np.sqrt(np.mean(samples * samples)))
+                level, echo = self._expected_echo(at)
+                armed = self._coupling_frames >= calibration
+                gated = speech and armed and energy > max(audio_capture.threshold, echo * BARGE_RATIO)
+
+                if speech:
+                    if not run:
+                        run = deque(((at, p) for p in pre_roll), maxlen=_frames(KEYWORD_RUN_MS))
+                    run.append((at, pcm))
+                    silence = 0
+                    loud = loud + 1 if gated else 0
+                    if loud == 1:
+                        onset = at
+                    if not gated and not triggered:
+                        self._learn(energy, level)
+                    if loud >= barge_frames and not triggered:
+                        triggered = True
+                        self._cut("speech", onset)
+                    continue
+
+                if not triggered:
+                    self._learn(energy, level)
+                loud = 0
+                if run:
+                    run.append((at, pcm))
+                    silence += 1
+                    if silence >= end_frames:
+                        if not triggered:
+                            self._check_keyword(run)
+                        run = None
+                        triggered = False
+                pre_roll.append(pcm)
+
+    def _check_keyword(self, run):
+        from modules.keyword_spotter import keyword_spotter, pcm_to_samples
+        if not keyword_spotter.ready(("stop",)):
+            return
+        samples = pcm_to_samples(b"".join(pcm for _, pcm in run))
+        if keyword_spotter.spot(samples, audio_capture.sample_rate, ("stop",)) == "stop":
+            self._cut("keyword", run[0][0])
+
+    def _cut(self, via, onset):
+        pid = audible_pid()
+        with self._lock:
+            self.pending = Cut(via, onset, time.monotonic(), pid)
+        set_interrupt_flag()
+        if pid == os.getpid():
+            # Our own player was flushed by the interrupt callbacks just now
+            self.cut_done()
+
+    # ---------- results ----------
+
+    def cut_done(self):
+        """The interrupted audio has stopped; records the pending cut's latency"""
+        with self._lock:
+            cut, self.pending = self.pending, None
+        if cut is None:
+            return None
+        cut.cut = time.monotonic()
+        self.cuts.append(cut)
+        if REPORT_BARGE_TIMINGS:
+            t = cut.timings()
+            print(f"[Barge-in] {t['via']}: detected +{t['detect_ms']:.0f} ms, audio cut +{t['cut_ms']:.0f} ms")
+        return cut
+
+    def recent(self, seconds=3.0):
+        """True if the user cut Lily off by voice in the last few seconds"""
+        last = self.pending or (self.cuts[-1] if self.cuts else None)
+        return last is not None and time.monotonic() - last.detected < seconds
+
+    def overlaps(self, start, end):
+        """True if an utterance from start to end is the speech that cut Lily off"""
+        for cut in list(self.cuts) + ([self.pending] if self.pending else []):
+            if cut.via == "speech" and start - 0.2 <= cut.onset <= end:
+                return True
+        return False
+
+    def status(self):
+        """Cut latency over the recent barge-ins"""
+        cut_ms = sorted(c.timings()["cut_ms"] for c in self.cuts if c.cut is not None)
+        if not cut_ms:
+            return {"cuts": 0}
+        return {
+            "cuts": len(cut_ms),
+            "coupling": self.coupling,
+            "median_ms": statistics.median(cut_ms),
+            "p95_ms": cut_ms[int(0.95 * (len(cut_ms) - 1))],
+            "max_ms": cut_ms[-1],
+        }
+
+
+# Shared barge-in watcher for this process
+barge_in = BargeIn()
@@ -0,0 +1,221 @@
+# modules/command_listener.py
+
+import os
+import sys
+import time
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from modules.audio_capture import audio_capture
+from modules.audio_player import audible_until
+from modules.barge_in import barge_in, STOP_PHRASES
+from modules.stt_backends import get_stt_backend
+from modules.voice_input import capture_utterance, recognize, _clear_status
+
+# Utterances recognized at the same time (cloud requests overlap; Vosk streams are independent)
+RECOGNITION_WORKERS = 2
+# Speech starting this soon after Lily's audio stops is still treated as her echo
+ECHO_TAIL = 0.3
+# Results older than this (seconds since the end of speech) are dropped, not delivered
+MAX_RESULT_AGE = 10
+# Print per-stage timings for every delivered command (env LILY_STT_TIMINGS=1)
+REPORT_STT_TIMINGS = os.getenv("LILY_STT_TIMINGS", "") not in ("", "0")
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 1)
+
+
+class Recognition:
+    """One utterance on its way from the microphone to the main loop"""
+
+    def __init__(self, seq, speech_start, speech_end, captured):
+        self.seq = seq
+        self.speech_start = speech_start
+        self.speech_end = speech_end
+        self.captured = captured        # end of speech confirmed by the silence timeout
+        self.recognized = None          # text available
+        self.delivered = None           # handed to the main loop
+        self.text = None
+        self.barged = False             # this speech cut Lily off
+
+    def timings(self):
+        """Stage times in ms, measured from the end of speech"""
+        stages = {"speech": _ms(self.speech_end - self.speech_start)}
+        for stage in ("captured", "recognized", "delivered"):
+            at = getattr(self, stage)
+            stages[stage] = _ms(at - self.speech_end) if at is not None else None
+        return stages
+
+
+class CommandListener:
+    """
+    Capture and recognition overlapped.
+
+    A capture thread keeps cutting utterances out of the always-open stream
+    and hands each one to a small pool of recognition threads, then goes
+    straight back to the ring buffer, so the next utterance is captured while
+    the previous one is still being recognized. Finished results are put back
+    in the order they were spoken and queued for the main loop, which takes
+    them with next_command().
+
+    Utterances that start while Lily is audible are dropped as echo, unless
+    they are what cut her off (barge-in); a bare "stop" is not passed on. A
+    foreground read (audio_capture.exclusive(), e.g. a follow-up question or
+    the wake word) takes priority: the capture thread abandons what it was
+    cutting and waits until the microphone is free again.
+    """
+
+    def __init__(self, workers=RECOGNITION_WORKERS):
+        self.workers = workers
+        self._lock = threading.Lock()
+        self._reset_state()
+
+    def _reset_state(self):
+        self._pid = os.getpid()
+        self._thread = None
+        self._pool = None
+        self._backend = None
+        self._results = queue.Queue()
+        self._finished = {}     # seq -> Recognition, held back until earlier ones are out
+        self._next_seq = 0
+        self._next_out = 0
+        self._since = 0.0       # only speech that started after this is delivered
+        self._paused = threading.Event()
+        self._stop = threading.Event()
+        self.on_partial = None
+        self.waiting = False
+        self.last = None
+
+    def start(self, on_partial=None):
+        """Start listening ahead; returns False if the capture stream is unavailable"""
+        # Threads don't survive a fork: a task worker starts its own if it needs one
+        if self._pid != os.getpid():
+            self._reset_state()
+        self.on_partial = on_partial
+        if self._thread is not None and self._thread.is_alive():
+            return True
+        if not audio_capture.start():
+            return False
+        self._backend = get_stt_backend()
+        self._stop.clear()
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="stt")
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self):
+        self._stop.set()
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
+
+    def pause(self):
+        """Stop capturing commands (e.g. while a task worker owns the conversation)"""
+        self._paused.set()
+
+    def resume(self):
+        """Capture again; anything said before now is discarded"""
+        self.discard()
+        self._paused.clear()
+
+    def discard(self):
+        """Drop queued and in-flight results for speech before now"""
+        self._since = time.monotonic()
+        while True:
+            try:
+                self._results.get_nowait()
+            except queue.Empty:
+                break
+
+    # ---------- capture thread ----------
+
+    def _show_partials(self):
+        return self.waiting
+
+    def _partial(self, text):
+        return bool(self.on_partial and self.on_partial(text))
+
+    def _run(self):
+        while not self._stop.is_set():
+            if self._paused.is_set() or audio_capture.claimed():
+                time.sleep(0.05)
+                continue
+            epoch = audio_capture.epoch
+            times = {}
+            try:
+                pcm, rate, stream = capture_utterance(
+                    self._backend, self._partial, timeout=1, times=times, show_partials=self._show_partials,
+                    should_stop=lambda: (self._stop.is_set() or self._paused.is_set()
+                                         or audio_capture.epoch != epoch),
+                )
+            except Exception as e:
+                print(f"[Listener] Capture error: {e}")
+                time.sleep(1)
+                continue
+            if not pcm:
+                continue
+            barged = barge_in.overlaps(times["start"], times["end"])
+            if times["start"] < audible_until() + ECHO_TAIL and not barged:
+                # Lily's own voice coming back through the microphone
+                continue
+            with self._lock:
+                item = Recognition(self._next_seq, times["start"], times["end"], time.monotonic())
+                item.barged = barged
+                self._next_seq += 1
+            self._pool.submit(self._recognize, item, pcm, rate, stream)
+
+    # ---------- recognition threads ----------
+
+    def _recognize(self, item, pcm, rate, stream):
+        try:
+            item.text = recognize(self._backend, pcm, rate, stream, quiet=False)
+        except Exception as e:
+            print(f"[Listener] Recognition error: {e}")
+        if item.barged and item.text and item.text.strip(" .!") in STOP_PHRASES:
+            # Only told Lily to stop, and she has
+            item.text = None
+        item.recognized = time.monotonic()
+        with self._lock:
+            # Release in spoken order: a short phrase can finish before a long one said earlier
+            self._finished[item.seq] = item
+            while self._next_out in self._finished:
+                self._results.put(self._finished.pop(self._next_out))
+                self._next_out += 1
+
+    # ---------- main loop ----------
+
+    def next_command(self, timeout=5, should_stop=None):
+        """The next recognized command (lower-cased), or None after timeout seconds"""
+        deadline = time.monotonic() + timeout if timeout else None
+        self.waiting = True
+        sys.stdout.write("\r[~] Listening...")
+        sys.stdout.flush()
+        try:
+            while True:
+                if should_stop is not None and should_stop():
+                    return None
+                wait = 0.1 if deadline is None else min(0.1, deadline - time.monotonic())
+                if wait <= 0:
+                    return None
+                try:
+                    item = self._results.get(timeout=wait)
+                except queue.Empty:
+                    continue
+                if not item.text or item.speech_start < self._since:
+                    continue
+                if time.monotonic() - item.speech_end > MAX_RESULT_AGE:
+                    continue
+                item.delivered = time.monotonic()
+                self.last = item
+                _clear_status()
+                if REPORT_STT_TIMINGS:
+                    t = item.timings()
+                    print(f"[STT] speech {t['speech']:.0f} ms; after end of speech: captured +{t['captured']:.0f} ms, "
+                          f"text +{t['recognized']:.0f} ms, delivered +{t['delivered']:.0f} ms")
+                return item.text
+        finally:
+            self.waiting = False
+
+
+# Shared listener for this process
+command_listener = CommandListener()
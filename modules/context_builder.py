@@ -0,0 +1,95 @@
+# modules/context_builder.py
+
+import os
+from collections import deque
+from modules.history_compactor import SUMMARY_FILE, load_summaries, get_relevant_summaries
+from modules.history_store import chat_log
+
+
+def _file_signature(path):
+    """(mtime, size) of a file, or None when it does not exist"""
+    try:
+        st = os.stat(path)
+        return (st.st_mtime_ns, st.st_size)
+    except OSError:
+        return None
+
+
+class ConversationContext:
+    """
+    Conversation context that is kept up to date as turns are appended,
+    instead of re-reading and re-formatting the history files on every call.
+
+    Turns logged in this process are pushed in with append_turn(), which also picks
+    up anything other processes logged before them; sync() reads only the bytes
+    appended to the active chat log segment since the last sync.
+    """
+
+    def __init__(self, max_turns=5):
+        self.turns = deque(maxlen=max_turns)
+        self._cursor = None
+        self._summary_sig = None
+        self._summaries = None
+
+    # ---------- updating ----------
+
+    def append_turn(self, entry):
+        """
+        Add a freshly logged turn. Reads the log forward from our cursor rather
+        than jumping to its end, so turns other processes appended in between
+        aren't skipped; only the bytes since the last sync are read.
+        """
+        self.sync()
+        if entry not in self.turns:
+            # Not found in the log (e.g. the write failed): keep it in memory anyway
+            self.turns.append(entry)
+
+    def sync(self):
+        """Pick up turns written by other processes. Cheap when nothing changed."""
+        old_cursor = self._cursor
+        new_turns, self._cursor = chat_log.read_new(old_cursor, fallback_n=self.turns.maxlen)
+
+        # Segment rotated or log cleared: read_new fell back to a fresh tail
+        restarted = old_cursor is None or self._cursor is None \
+            or old_cursor[0] != self._cursor[0] or old_cursor[1] > self._cursor[1]
+        if not new_turns and not restarted:
+            return False
+
+        if restarted:
+            self.turns.clear()
+        self.turns.extend(new_turns)
+        return True
+
+    # ---------- rendering ----------
+
+    def recent_chat(self, last_n=5):
+        """Last turns as 'User:/Lily:' lines, same format as get_recent_chat_context"""
+        recent = list(self.turns)[-last_n:]
+        lines = []
+        for turn in recent:
+            lines.append(f"User: {turn.get('user_message') or turn.get('user')}")
+            reply = turn.get('ai_response') or turn.get('lily')
+            # A turn logged without a reply shows just the user's line
+            if reply:
+                lines.append(f"Lily: {reply}")
+        return "\n".join(lines)
+
+    def summaries_for(self, query):
+        """Relevant compacted summaries, re-read only when the summary file changed"""
+        sig = _file_signature(SUMMARY_FILE)
+        if self._summaries is None or sig != self._summary_sig:
+            self._summaries = load_summaries()
+            self._summary_sig = sig
+        return get_relevant_summaries(query, summaries=self._summaries)
+
+    def chat_context(self, user_query, last_n=5):
+        """Recent turns verbatim plus the compacted summaries relevant to this query"""
+        recent = self.recent_chat(last_n)
+        summaries = self.summaries_for(user_query)
+        if summaries:
+            return f"EARLIER CONVERSATION SUMMARIES:\n{summaries}\n\nRECENT TURNS:\n{recent}"
+        return recent
+
+
+# Shared instance for this process
+conversation_context = ConversationContext()
@@ -1,12 +1,36 @@
+import io
 import os
-import tempfile
-from gtts import gTTS
 from pydub import AudioSegment
-from pydub.effects import normalize, compress_dynamic_range
 import librosa
 from pathlib import Path
-import soundfile as sf
 import numpy as np
+from modules import audio_dsp
+from modules.tts_backends import backend_selector
+
+# Pitch-shift quality/latency ladder, cheapest first (see pitch_and_speed)
+PITCH_MODES = ('fast', 'wsola', 'librosa')
+
+# Default mode; speak(pitch_mode=...) overrides it per call
+PITCH_SHIFT_MODE = os.getenv("LILY_PITCH_MODE", "wsola")
+
+# Bump when the processing chain changes so cached emotion variants are re-rendered
+DSP_VERSION = 1
+
+
+def segment_to_array(sound):
+    """AudioSegment -> (mono float32 samples in [-1, 1], sample_rate)"""
+    samples = np.array(sound.get_array_of_samples(), dtype=np.float32)
+    if sound.channels > 1:
+        samples = samples.reshape(-1, sound.channels).mean(axis=1)
+    samples /= float(1 << (8 * sound.sample_width - 1))
+    return samples, sound.frame_rate
+
+
+def array_to_segment(samples, sr):
+    """Mono float32 samples -> 16-bit AudioSegment (clipped, like pydub's own gain)"""
+    pcm = (np.clip(samples, -1.0, 1.0) * 32767).astype(np.int16)
+    return AudioSegment(pcm.tobytes(), frame_rate=sr, sample_width=2, channels=1)
+
 
 class EmotionVoiceEngine:
     """Emotion-based voice processing engine with enhanced natural sound"""
@@ -38,112 +62,160 @@ class EmotionVoiceEngine:
             text: Text to convert
             slow: Whether to use slow speech (DISABLED by default for better sound)
             tld: Top-level domain for accent ('com'=US, 'co.uk'=British, 'com.au'=Australian)
-        """
-        # Always use fast speech for more natural sound
-        tts = gTTS(text=text, lang='en', slow=False, tld=tld)
-        temp_mp3 = tempfile.NamedTemporaryFile(suffix='.mp3', delete=False)
-        tts.save(temp_mp3.name)
-
-        sound = AudioSegment.from_mp3(temp_mp3.name)
-        wav_path = temp_mp3.name.replace(".mp3", ".wav")
-        sound.export(wav_path, format="wav")
-        os.unlink(temp_mp3.name)
-        return wav_path
-
-    def change_speed(self, sound, speed=1.0):
-        """Change playback speed without affecting pitch"""
-        if speed == 1.0:
-            return sound
         
-        altered = sound._spawn(sound.raw_data, overrides={
-            "frame_rate": int(sound.frame_rate * speed)
-        })
-        return altered.set_frame_rate(sound.frame_rate)
+        Returns:
+            (samples, sample_rate): mono float32 samples in [-1, 1]
+        """
+        _, data = self.fetch_base(text, tld)
+        return self.decode_audio(data)
+
+    def fetch_base(self, text, tld='com', lang='en', local=False):
+        """
+        Raw audio bytes for text, before any emotion processing, from the best
+        backend available right now (gTTS online, espeak-ng offline or when slow;
+        local=True prefers the local voice). Returns (backend, data);
+        backend.name and backend.format describe the bytes.
+        """
+        return backend_selector.synthesize(text, lang=lang, tld=tld, local=local)
+
+    @staticmethod
+    def decode_audio(data, format=None):
+        """Decode encoded audio bytes once into mono float32 samples (wav or mp3)"""
+        if format is None:
+            format = "wav" if data[:4] == b"RIFF" else "mp3"
+        sound = AudioSegment.from_file(io.BytesIO(data), format=format)
+        return segment_to_array(sound)
 
-    def pitch_shift(self, audio_segment, semitones):
+    def change_speed(self, samples, sr, speed=1.0):
         """
-        Shift pitch of audio by semitones using librosa
+        Speed up / slow down by resampling, the in-memory equivalent of the old
+        frame-rate override + set_frame_rate (tempo and pitch both scale by `speed`)
+        """
+        return audio_dsp.resample(samples, speed)
+
+    def pitch_shift(self, samples, sr, semitones, mode='librosa'):
+        """
+        Shift pitch of audio by semitones, keeping the duration
         Positive values = higher pitch (brighter)
         Negative values = lower pitch (deeper)
+
+        mode: 'librosa' (phase vocoder) or 'wsola'
         """
         if semitones == 0:
-            return audio_segment
-        
-        # Export to temporary wav for processing
-        temp_wav = tempfile.NamedTemporaryFile(suffix='.wav', delete=False)
-        audio_segment.export(temp_wav.name, format="wav")
-        
-        # Load with librosa
-        y, sr = librosa.load(temp_wav.name, sr=None)
-        
-        # Pitch shift
-        y_shifted = librosa.effects.pitch_shift(y, sr=sr, n_steps=semitones)
+            return samples
         
-        # Save shifted audio
-        shifted_wav = tempfile.NamedTemporaryFile(suffix='.wav', delete=False)
-        sf.write(shifted_wav.name, y_shifted, sr)
-        
-        # Load back as AudioSegment
-        result = AudioSegment.from_wav(shifted_wav.name)
-        
-        # Cleanup
-        os.unlink(temp_wav.name)
-        os.unlink(shifted_wav.name)
-        
-        return result
+        if mode == 'wsola':
+            factor = 2 ** (semitones / 12)
+            return audio_dsp.resample(audio_dsp.wsola_stretch(samples, sr, 1 / factor), factor)
+        return librosa.effects.pitch_shift(samples, sr=sr, n_steps=semitones).astype(np.float32)
+
+    def pitch_and_speed(self, samples, sr, semitones, speed, mode=None):
+        """
+        Apply a profile's pitch shift and speed change together.
+
+        Modes, cheapest first (cost per second of 24 kHz audio on a desktop CPU,
+        see benchmarks/bench_pitch.py):
+            'fast'    - one resample by pitch * speed (~0.3 ms). Pitch is exact but
+                        the tempo also rises by the pitch factor (+12% at +2 semitones).
+            'wsola'   - WSOLA time-stretch then one resample (~6 ms, no warm-up).
+                        Tempo is exact; slight roughness on large shifts.
+            'librosa' - phase-vocoder pitch shift, then the speed resample (~9 ms,
+                        plus ~1.5 s of JIT/FFT setup on the first call in a process
+                        and an extra STFT round trip). Smoothest; the original chain.
+        """
+        mode = mode or PITCH_SHIFT_MODE
+        if mode not in PITCH_MODES:
+            raise ValueError(f"Unknown pitch mode '{mode}' (choose from {', '.join(PITCH_MODES)})")
+        factor = 2 ** (semitones / 12)
+
+        if mode == 'fast':
+            return audio_dsp.resample(samples, factor * speed)
+        if mode == 'wsola':
+            # Lengthen by the pitch factor so the combined resample lands on 1/speed duration
+            if semitones != 0:
+                samples = audio_dsp.wsola_stretch(samples, sr, 1 / factor)
+            return audio_dsp.resample(samples, factor * speed)
+
+        if semitones != 0:
+            try:
+                samples = self.pitch_shift(samples, sr, semitones)
+            except Exception as e:
+                print(f"[Pitch shift warning: {e}]")
+        return self.change_speed(samples, sr, speed)
 
-    def enhance_audio(self, audio):
+    def change_volume(self, samples, gain_db):
+        """Apply a gain in dB"""
+        if gain_db == 0:
+            return samples
+        return samples * np.float32(10 ** (gain_db / 20))
+
+    def enhance_audio(self, samples, sr):
         """Apply audio enhancements for clearer, more natural sound"""
         # Normalize audio levels
-        audio = normalize(audio)
+        samples = audio_dsp.normalize(samples)
         
         # Apply gentle compression for consistent volume
-        audio = compress_dynamic_range(audio, threshold=-20.0, ratio=3.0)
+        samples = audio_dsp.compress(samples, sr, threshold=-20.0, ratio=3.0)
         
         # Boost high frequencies slightly for clarity (simple high-pass effect)
         # This makes voice sound brighter and clearer
-        audio = audio.high_pass_filter(100)
+        samples = audio_dsp.high_pass(samples, sr, 100)
         
-        return audio
+        return samples
+
+    def get_profile(self, emotion):
+        """Profile settings for an emotion (neutral if unknown)"""
+        return self.EMOTION_PROFILES.get(emotion, self.EMOTION_PROFILES['neutral'])
 
-    def apply_emotion(self, text, emotion='neutral', tld='com'):
+    def process(self, samples, sr, emotion='neutral', pitch_mode=None, pitch=True, enhance=True):
         """
-        Apply emotion-based voice modifications
+        Apply the emotion profile to base TTS samples
         
-        Args:
-            text: Text to speak
-            emotion: Emotion profile to use
-            tld: Accent ('com', 'co.uk', 'com.au', 'co.in')
+        pitch_mode: 'fast', 'wsola' or 'librosa' (default: PITCH_SHIFT_MODE)
+        pitch, enhance: False skips the pitch shift / the enhancement chain
+        (used when speech has to start sooner, see modules/tts_quality.py)
         """
-        profile = self.EMOTION_PROFILES.get(emotion, self.EMOTION_PROFILES['neutral'])
-
-        # Generate base audio (always fast for natural sound)
-        base_audio_path = self.generate_base_tts(text, slow=False, tld=tld)
-        audio = AudioSegment.from_wav(base_audio_path)
-
-        # Apply pitch shift FIRST (before speed changes)
-        if profile.get('pitch_shift', 0) != 0:
-            try:
-                audio = self.pitch_shift(audio, profile['pitch_shift'])
-            except Exception as e:
-                print(f"[Pitch shift warning: {e}]")
+        profile = self.get_profile(emotion)
 
-        # Apply speed changes
-        if profile['speed'] != 1.0:
-            audio = self.change_speed(audio, profile['speed'])
+        # Pitch shift and speed change (how depends on the pitch mode)
+        semitones = profile.get('pitch_shift', 0) if pitch else 0
+        samples = self.pitch_and_speed(samples, sr, semitones, profile['speed'], pitch_mode)
 
         # Apply volume changes
         if profile['volume'] != 1.0:
-            volume_change = (profile['volume'] - 1.0) * 10
-            audio += volume_change
+            samples = self.change_volume(samples, (profile['volume'] - 1.0) * 10)
 
         # Enhance audio quality
-        audio = self.enhance_audio(audio)
+        if not enhance:
+            return samples
+        return self.enhance_audio(samples, sr)
 
-        # Cleanup
-        os.unlink(base_audio_path)
+    def render(self, text, emotion='neutral', tld='com', pitch_mode=None):
+        """
+        Synthesize and apply the emotion profile entirely in memory
+        
+        Returns:
+            (samples, sample_rate): mono float32 samples
+        """
+        # Generate base audio (always fast for natural sound)
+        samples, sr = self.generate_base_tts(text, slow=False, tld=tld)
+        return self.process(samples, sr, emotion, pitch_mode), sr
 
-        return audio
+    def apply_emotion(self, text, emotion='neutral', tld='com', pitch_mode=None):
+        """
+        Apply emotion-based voice modifications
+        
+        Args:
+            text: Text to speak
+            emotion: Emotion profile to use
+            tld: Accent ('com', 'co.uk', 'com.au', 'co.in')
+            pitch_mode: 'fast', 'wsola' or 'librosa' (default: PITCH_SHIFT_MODE)
+        
+        Returns:
+            AudioSegment ready to play or export
+        """
+        samples, sr = self.render(text, emotion, tld, pitch_mode)
+        return array_to_segment(samples, sr)
 
     def set_voice_accent(self, accent='us'):
         """
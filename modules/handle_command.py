@@ -266,6 +266,22 @@ available_commands = {
 }
 
 
+# Commands that work with nothing after their phrase: once a partial transcript
+# is exactly one of their aliases, the user has finished saying the command.
+# "weather" and "news" may still go on ("weather in Pune tomorrow"), which is
+# why the whole transcript has to be the alias.
+COMPLETE_COMMANDS = {
+    "show timers", "view alarms", "show reminders", "show calendar", "show all calendar",
+    "location", "weather", "summarize file", "news", "notifications", "view tasks",
+}
+
+
+def is_complete_command(text):
+    """True if text is exactly a COMPLETE_COMMANDS alias, so listening can stop early"""
+    text = text.strip().lower().rstrip(".?!")
+    return any(text in available_commands[command] for command in COMPLETE_COMMANDS)
+
+
 def get_all_phrases():
     """Flatten command aliases into a searchable list"""
     all_phrases = []
@@ -0,0 +1,240 @@
+# modules/history_compactor.py
+
+import os
+import re
+import json
+import time
+import fcntl
+import shutil
+import threading
+import multiprocessing
+from contextlib import contextmanager
+from datetime import datetime
+from modules.ai_engine import ask_stateless
+from modules.error_logger import log_error
+
+SUMMARY_FILE = "data/chat_summaries.json"
+SUMMARY_LOCK_FILE = "data/.chat_summaries.lock"
+
+# Turns that always stay verbatim in the raw log / prompt
+RECENT_WINDOW = 20
+# Compact once this many un-summarised turns sit outside the recent window
+COMPACT_BATCH = 20
+
+os.makedirs("data", exist_ok=True)
+
+_compaction_lock = threading.Lock()
+
+STOPWORDS = {
+    "the", "a", "an", "and", "or", "but", "is", "are", "was", "were", "be", "to", "of",
+    "in", "on", "at", "for", "with", "about", "this", "that", "it", "i", "you", "me",
+    "my", "your", "we", "do", "did", "can", "could", "what", "how", "why", "when",
+    "lily", "please", "just", "so", "like", "have", "has", "had", "not", "no", "yes",
+}
+
+
+def load_summaries():
+    """Load compacted day/topic summaries"""
+    empty = {"compacted_until": "", "days": {}}
+    if not os.path.exists(SUMMARY_FILE):
+        return empty
+    try:
+        with open(SUMMARY_FILE, "r") as f:
+            data = json.load(f)
+        data.setdefault("compacted_until", "")
+        data.setdefault("days", {})
+        return data
+    except (json.JSONDecodeError, OSError):
+        return empty
+
+
+def save_summaries(data):
+    """Atomically write the summaries file so a killed writer never corrupts it"""
+    tmp_path = SUMMARY_FILE + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, SUMMARY_FILE)
+
+
+@contextmanager
+def _updating_summaries():
+    """Read-modify-write the summaries under a cross-process lock"""
+    with open(SUMMARY_LOCK_FILE, "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            data = load_summaries()
+            yield data
+            save_summaries(data)
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def clear_summaries(backup_dir=None):
+    """Forget every summary and the watermark (chat history cleared); copies the file to backup_dir first"""
+    with _updating_summaries() as data:
+        if backup_dir and os.path.exists(SUMMARY_FILE):
+            shutil.copy2(SUMMARY_FILE, os.path.join(backup_dir, os.path.basename(SUMMARY_FILE)))
+        data.clear()
+        data.update({"compacted_until": "", "days": {}})
+
+
+def keywords(text):
+    """Lowercase content words used for topic relevance matching"""
+    words = re.findall(r"[a-zA-Z\u0900-\u097F]{3,}", (text or "").lower())
+    return {w for w in words if w not in STOPWORDS}
+
+
+def pending_turns(chat_history, summaries=None):
+    """Turns outside the recent window that have not been summarised yet"""
+    if summaries is None:
+        summaries = load_summaries()
+    older = chat_history[:-RECENT_WINDOW] if len(chat_history) > RECENT_WINDOW else []
+    until = summaries.get("compacted_until", "")
+    return [t for t in older if t.get("timestamp", "") > until]
+
+
+def summarize_day(day, turns, previous=None):
+    """
+    Ask the model to condense one day's turns into a day summary plus topic summaries.
+    An existing summary for the same day is folded in so nothing already kept is lost.
+    """
+    transcript = "\n".join(
+        f"User: {t.get('user_message', '')}\nLily: {t.get('ai_response', '')}" for t in turns
+    )
+    earlier = ""
+    if previous:
+        earlier_topics = "\n".join(f"TOPIC {k}: {v}" for k, v in previous.get("topics", {}).items())
+        earlier = f"EXISTING SUMMARY FOR THIS DAY:\nDAY: {previous.get('summary', '')}\n{earlier_topics}\n"
+
+    prompt = f"""
+Condense these conversation turns from {day} into compact memory notes.
+
+{earlier}
+NEW TURNS:
+{transcript}
+
+Merge the existing summary (if any) with the new turns.
+Keep facts, preferences, names, decisions and open questions. Drop greetings and filler.
+
+Respond ONLY in this format:
+DAY: (one or two sentences covering the whole day)
+TOPIC <short topic name>: (one or two sentences)
+TOPIC <short topic name>: (one or two sentences)
+    """
+
+    # Stateless: summarization prompts must not end up in Lily's chat session
+    response = ask_stateless(prompt)
+
+    day_match = re.search(r"DAY:\s*(.+)", response)
+    topics = {}
+    for name, text in re.findall(r"TOPIC\s+([^:\n]+):\s*(.+)", response):
+        topics[name.strip().lower()] = text.strip()
+
+    if not day_match and not topics:
+        raise ValueError("Unparseable summary response")
+
+    return {
+        "summary": day_match.group(1).strip() if day_match else "",
+        "topics": topics,
+    }
+
+
+def compact_chat_history(chat_history=None):
+    """
+    Fold turns older than the recent window into per-day and per-topic summaries.
+    The raw log is left as it is; a watermark records how far compaction got.
+    Returns the number of turns compacted.
+    """
+    summaries = load_summaries()
+    if chat_history is None:
+        # Only segments newer than the watermark are opened
+        from modules.history_store import chat_log
+        chat_history = chat_log.range(start=summaries.get("compacted_until") or None)
+
+    turns = pending_turns(chat_history, summaries)
+    if not turns:
+        return 0
+
+    by_day = {}
+    for turn in turns:
+        by_day.setdefault(turn.get("timestamp", "")[:10] or "unknown", []).append(turn)
+
+    compacted = 0
+    for day, day_turns in sorted(by_day.items()):
+        previous = summaries["days"].get(day)
+        result = summarize_day(day, day_turns, previous)
+        result["turns"] = (previous or {}).get("turns", 0) + len(day_turns)
+        result["updated"] = datetime.now().isoformat()
+        until = day_turns[-1].get("timestamp", "")
+        with _updating_summaries() as summaries:
+            if summaries.get("compacted_until", "") >= until:
+                # Another process summarised these turns while we were asking the model
+                continue
+            summaries["days"][day] = result
+            # Advance the watermark day by day so a failure part-way keeps earlier progress
+            summaries["compacted_until"] = until
+        compacted += len(day_turns)
+
+    return compacted
+
+
+def _run_compaction():
+    try:
+        compact_chat_history()
+    except Exception as e:
+        log_error(e, context="History Compaction")
+    finally:
+        _compaction_lock.release()
+
+
+def maybe_compact_in_background(chat_history):
+    """Start a compaction thread when enough old turns have piled up"""
+    # Task workers are killed on interrupt and would kill the thread mid-way;
+    # the main loop calls this after each task instead
+    if multiprocessing.parent_process() is not None:
+        return False
+    if len(pending_turns(chat_history)) < COMPACT_BATCH:
+        return False
+    if not _compaction_lock.acquire(blocking=False):
+        return False
+    threading.Thread(target=_run_compaction, daemon=True).start()
+    return True
+
+
+def history_compaction_loop(interval=600):
+    """Background loop that periodically compacts old conversation turns"""
+    while True:
+        if _compaction_lock.acquire(blocking=False):
+            _run_compaction()
+        time.sleep(interval)
+
+
+def get_relevant_summaries(query, max_topics=3, summaries=None):
+    """
+    Pick the summaries worth putting in the prompt for this query:
+    topic summaries that share words with it, plus the latest day summary.
+    """
+    if summaries is None:
+        summaries = load_summaries()
+    days = summaries.get("days", {})
+    if not days:
+        return ""
+
+    query_words = keywords(query)
+    scored = []
+    for day, entry in days.items():
+        for topic, text in entry.get("topics", {}).items():
+            score = len(query_words & keywords(f"{topic} {text}"))
+            if score:
+                scored.append((score, day, topic, text))
+
+    scored.sort(key=lambda s: (s[0], s[1]), reverse=True)
+
+    lines = []
+    latest_day = max(days)
+    if days[latest_day].get("summary"):
+        lines.append(f"[{latest_day}] {days[latest_day]['summary']}")
+    for _, day, topic, text in scored[:max_topics]:
+        lines.append(f"[{day}] {topic}: {text}")
+
+    return "\n".join(lines)
@@ -2,6 +2,8 @@ import os
 import json
 from datetime import datetime
 from modules.emotion_analyser import get_sentiment
+from modules.history_store import chat_log, command_log
+from modules.history_stats import history_stats
 
 HISTORY_FILE = "data/chat_history.json"
 os.makedirs("data", exist_ok=True)
@@ -14,28 +16,14 @@ def save_to_history(user, assistant):
         "lily": assistant,
         "mood": mood
     }
-
-    if os.path.exists(HISTORY_FILE):
-        try:
-            with open(HISTORY_FILE, "r") as f:
-                history = json.load(f)
-        except json.JSONDecodeError:
-            history = []
-    else:
-        history = []
-
-    history.append(data)
-    with open(HISTORY_FILE, "w") as f:
-        json.dump(history[-50:], f, indent=2)  # Keep only last 50 for speed
+    chat_log.append(data)
+    history_stats.record_chat(data)
 
 def recall_context(last_n=5):
-    if not os.path.exists(HISTORY_FILE):
+    recent = chat_log.tail(last_n)
+    if not recent:
         return ""
 
-    with open(HISTORY_FILE, "r") as f:
-        history = json.load(f)
-
-    recent = history[-last_n:]
     safe_lines = []
 
     for h in recent:
@@ -57,24 +45,23 @@ def recall_context(last_n=5):
 
 
 def load_chat_history(date_filter=None, limit=10):
-    if not os.path.exists(HISTORY_FILE):
-        return []
-    with open(HISTORY_FILE, "r") as f:
-        history = json.load(f)
-    if date_filter:
-        history = [h for h in history if h["timestamp"].startswith(date_filter)]
+    if not date_filter:
+        return chat_log.tail(limit)
+    # Only segments overlapping that day are opened
+    history = chat_log.range(start=date_filter, end=date_filter + "\uffff")
+    history = [h for h in history if h["timestamp"].startswith(date_filter)]
     return history[-limit:]
 
 def clean_chat_history():
-    if not os.path.exists(HISTORY_FILE):
+    history = chat_log.read_all()
+    if not history:
         return
-    with open(HISTORY_FILE, "r") as f:
-        history = json.load(f)
     clean = []
     for h in history:
-        if all(k in h for k in ["timestamp", "user", "lily", "mood"]):
+        if all(k in h for k in ["timestamp", "user", "lily", "mood"]) or \
+                all(k in h for k in ["timestamp", "user_message", "ai_response", "mood"]):
             clean.append(h)
-    with open(HISTORY_FILE, "w") as f:
-        json.dump(clean, f, indent=2)
+    chat_log.replace(clean)
+    history_stats.rebuild(clean, command_log.read_all())
     print(f"🧹 Cleaned {len(history) - len(clean)} broken entries from chat history.")
 
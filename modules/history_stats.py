@@ -0,0 +1,225 @@
+# modules/history_stats.py
+
+import os
+import json
+import time
+import fcntl
+import atexit
+import threading
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+
+STATS_FILE = "data/history_stats.json"
+LOCK_FILE = "data/.history_stats.lock"
+
+# Rolling window for the recent command success rate
+COMMAND_WINDOW = 20
+# LLM latencies are counted in memory and added to the file at most this often (and at exit)
+LATENCY_FLUSH_INTERVAL = 30
+
+os.makedirs("data", exist_ok=True)
+
+
+class HistoryStats:
+    """
+    Materialized history statistics, updated in O(1) on every append instead of
+    rescanning the logs: turns per day, mood distribution, command success rate
+    (overall and over a rolling window) and average LLM latency.
+
+    The figures live in data/history_stats.json so the main loop, task workers
+    and the server all see the same numbers.
+    """
+
+    def __init__(self, path=STATS_FILE, window=COMMAND_WINDOW):
+        self.path = path
+        self.window = window
+        self._data = None
+        self._sig = None
+        self._pending_lock = threading.Lock()
+        self._reset_pending()
+
+    def _reset_pending(self):
+        self._pending_pid = os.getpid()
+        self._pending_calls = 0
+        self._pending_ms = 0.0
+        self._flusher = None
+
+    @staticmethod
+    def _empty():
+        return {
+            "chats_total": 0,
+            "turns_per_day": {},
+            "moods": {},
+            "commands_total": 0,
+            "commands_success": 0,
+            "recent_outcomes": [],
+            "recent_success": 0,
+            "llm_calls": 0,
+            "llm_total_ms": 0.0,
+            "backfilled": False,
+        }
+
+    def _signature(self):
+        try:
+            st = os.stat(self.path)
+            return (st.st_mtime_ns, st.st_size)
+        except OSError:
+            return None
+
+    def _load(self):
+        """Reload only if another process wrote the file since we last did"""
+        sig = self._signature()
+        if self._data is not None and sig == self._sig:
+            return self._data
+        data = self._empty()
+        if sig is not None:
+            try:
+                with open(self.path, "r") as f:
+                    data.update(json.load(f))
+            except (json.JSONDecodeError, OSError):
+                pass
+        self._data = data
+        self._sig = sig
+        return data
+
+    def _save(self):
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self._data, f, indent=2)
+        os.replace(tmp_path, self.path)
+        self._sig = self._signature()
+
+    @contextmanager
+    def _updating(self):
+        with open(LOCK_FILE, "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield self._load()
+                self._save()
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    # ---------- updates ----------
+
+    @staticmethod
+    def _apply_chat(data, entry):
+        day = (entry.get("timestamp") or datetime.now().isoformat())[:10]
+        mood = entry.get("mood") or "unknown"
+        data["chats_total"] += 1
+        data["turns_per_day"][day] = data["turns_per_day"].get(day, 0) + 1
+        data["moods"][mood] = data["moods"].get(mood, 0) + 1
+
+    def _apply_command(self, data, entry):
+        ok = 1 if entry.get("status") == "SUCCESS" else 0
+        data["commands_total"] += 1
+        data["commands_success"] += ok
+        recent = deque(data["recent_outcomes"], maxlen=self.window)
+        if len(recent) == self.window:
+            data["recent_success"] -= recent[0]
+        recent.append(ok)
+        data["recent_success"] += ok
+        data["recent_outcomes"] = list(recent)
+
+    def record_chat(self, entry):
+        """Count one logged chat turn"""
+        with self._updating() as data:
+            self._apply_chat(data, entry)
+
+    def record_command(self, entry):
+        """Count one logged command attempt"""
+        with self._updating() as data:
+            self._apply_command(data, entry)
+
+    def record_llm_latency(self, seconds):
+        """
+        Add one model round trip to the running latency average. Counted in
+        memory; flush_latency() adds it to the file every LATENCY_FLUSH_INTERVAL.
+        """
+        with self._pending_lock:
+            # A forked worker starts with nothing of its parent's to flush
+            if self._pending_pid != os.getpid():
+                self._reset_pending()
+            self._pending_calls += 1
+            self._pending_ms += seconds * 1000
+            if self._flusher is None:
+                self._flusher = threading.Thread(target=self._flush_loop, daemon=True)
+                self._flusher.start()
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(LATENCY_FLUSH_INTERVAL)
+            self.flush_latency()
+
+    def flush_latency(self):
+        """Write the latencies counted since the last flush"""
+        with self._pending_lock:
+            if self._pending_pid != os.getpid() or not self._pending_calls:
+                return
+            calls, total_ms = self._pending_calls, self._pending_ms
+            self._pending_calls, self._pending_ms = 0, 0.0
+        try:
+            with self._updating() as data:
+                data["llm_calls"] += calls
+                data["llm_total_ms"] += total_ms
+        except Exception as e:
+            # Keep them for the next flush
+            with self._pending_lock:
+                self._pending_calls += calls
+                self._pending_ms += total_ms
+            print(f"[Stats] Could not save LLM latency: {e}")
+
+    def rebuild(self, chat_entries, command_entries):
+        """Recompute everything from the full logs (only needed once, for pre-existing history)"""
+        with self._updating() as data:
+            llm_calls, llm_total_ms = data["llm_calls"], data["llm_total_ms"]
+            data.clear()
+            data.update(self._empty())
+            data["llm_calls"], data["llm_total_ms"] = llm_calls, llm_total_ms
+            for entry in chat_entries:
+                self._apply_chat(data, entry)
+            for entry in command_entries:
+                self._apply_command(data, entry)
+            data["backfilled"] = True
+
+    def is_backfilled(self):
+        return self._load()["backfilled"]
+
+    # ---------- reading ----------
+
+    def snapshot(self):
+        """Current figures, ready for printing or returning from the API"""
+        data = self._load()
+        with self._pending_lock:
+            pending = self._pending_pid == os.getpid()
+            llm_calls = data["llm_calls"] + (self._pending_calls if pending else 0)
+            llm_total_ms = data["llm_total_ms"] + (self._pending_ms if pending else 0.0)
+        today = datetime.now().strftime("%Y-%m-%d")
+        chats = data["chats_total"]
+        commands = data["commands_total"]
+        recent = len(data["recent_outcomes"])
+        return {
+            "chats_total": chats,
+            "turns_today": data["turns_per_day"].get(today, 0),
+            "turns_per_day": dict(sorted(data["turns_per_day"].items())),
+            "commands_total": commands,
+            "command_success_rate": round(data["commands_success"] / commands * 100, 1) if commands else None,
+            "command_success_rate_recent": round(data["recent_success"] / recent * 100, 1) if recent else None,
+            "command_window": recent,
+            "llm_calls": llm_calls,
+            "avg_llm_latency_ms": round(llm_total_ms / llm_calls, 1) if llm_calls else None,
+            "mood_distribution": {
+                mood: round(count / chats * 100, 1) for mood, count in data["moods"].items()
+            } if chats else {},
+        }
+
+
+# Shared instance
+history_stats = HistoryStats()
+atexit.register(history_stats.flush_latency)
+
+
+def ensure_stats(chat_log, command_log):
+    """Backfill the stats from the existing logs the first time they are needed"""
+    if not history_stats.is_backfilled():
+        history_stats.rebuild(chat_log.read_all(), command_log.read_all())
@@ -0,0 +1,308 @@
+# modules/history_store.py
+
+import os
+import io
+import json
+import gzip
+import fcntl
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+
+# Start a new segment when the active one passes this size (or the day changes)
+MAX_SEGMENT_BYTES = 512 * 1024
+
+MANIFEST_NAME = "manifest.json"
+
+
+class SegmentedLog:
+    """
+    Append-only history log split into time segments.
+
+    Entries are written as NDJSON to an active segment per day (or per size).
+    When a segment is closed it is gzip-compressed, and manifest.json keeps the
+    time range, entry count and a tally of `count_field` values for every
+    segment, so counts and "last N" never need to load the whole history.
+
+    Layout:
+        <directory>/manifest.json
+        <directory>/2026-10-18-000.ndjson.gz   (closed)
+        <directory>/2026-10-19-000.ndjson      (active)
+    """
+
+    def __init__(self, directory, legacy_file=None, count_field=None,
+                 max_segment_bytes=MAX_SEGMENT_BYTES):
+        self.directory = directory
+        self.legacy_file = legacy_file
+        self.count_field = count_field
+        self.max_segment_bytes = max_segment_bytes
+        self.manifest_path = os.path.join(directory, MANIFEST_NAME)
+        self.lock_path = os.path.join(directory, ".lock")
+        os.makedirs(directory, exist_ok=True)
+        self._migrate_legacy()
+
+    # ---------- manifest ----------
+
+    def load_manifest(self):
+        try:
+            with open(self.manifest_path, "r") as f:
+                manifest = json.load(f)
+            manifest.setdefault("segments", [])
+            return manifest
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {"segments": []}
+
+    def _save_manifest(self, manifest):
+        tmp_path = self.manifest_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_path, self.manifest_path)
+
+    @contextmanager
+    def _locked(self):
+        """Serialise writers across processes (main loop and task workers)"""
+        with open(self.lock_path, "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _path(self, segment):
+        return os.path.join(self.directory, segment["name"])
+
+    # ---------- writing ----------
+
+    def _new_segment(self, manifest, day):
+        seq = sum(1 for s in manifest["segments"] if s["name"].startswith(day))
+        segment = {
+            "name": f"{day}-{seq:03d}.ndjson",
+            "start": "",
+            "end": "",
+            "count": 0,
+            "bytes": 0,
+            "compressed": False,
+        }
+        if self.count_field:
+            segment["tally"] = {}
+        manifest["segments"].append(segment)
+        return segment
+
+    def _close_segment(self, segment):
+        """Compress a finished segment in place"""
+        if segment["compressed"]:
+            return
+        src = self._path(segment)
+        dst = src + ".gz"
+        if os.path.exists(src):
+            with open(src, "rb") as f_in, gzip.open(dst, "wb") as f_out:
+                f_out.write(f_in.read())
+            os.unlink(src)
+        segment["name"] = os.path.basename(dst)
+        segment["compressed"] = True
+
+    def _active_for(self, manifest, timestamp):
+        day = (timestamp or datetime.now().isoformat())[:10]
+        active = manifest["segments"][-1] if manifest["segments"] else None
+        if active is None or active["compressed"]:
+            return self._new_segment(manifest, day)
+        if active["start"][:10] not in ("", day) or active["bytes"] >= self.max_segment_bytes:
+            self._close_segment(active)
+            return self._new_segment(manifest, day)
+        return active
+
+    def _write(self, manifest, entries):
+        for entry in entries:
+            timestamp = entry.get("timestamp", "")
+            segment = self._active_for(manifest, timestamp)
+            line = json.dumps(entry, ensure_ascii=False) + "\n"
+            with open(self._path(segment), "a", encoding="utf-8") as f:
+                f.write(line)
+            segment["bytes"] += len(line.encode("utf-8"))
+            segment["count"] += 1
+            if not segment["start"]:
+                segment["start"] = timestamp
+            segment["end"] = max(segment["end"], timestamp)
+            if self.count_field:
+                value = str(entry.get(self.count_field, "UNKNOWN"))
+                segment["tally"][value] = segment["tally"].get(value, 0) + 1
+
+    def append(self, entry):
+        """Append one entry to the active segment"""
+        with self._locked():
+            manifest = self.load_manifest()
+            self._write(manifest, [entry])
+            self._save_manifest(manifest)
+
+    def replace(self, entries):
+        """Drop every segment and start over with `entries` (used to clear history)"""
+        with self._locked():
+            for segment in self.load_manifest()["segments"]:
+                try:
+                    os.unlink(self._path(segment))
+                except FileNotFoundError:
+                    pass
+            manifest = {"segments": []}
+            self._write(manifest, entries)
+            self._save_manifest(manifest)
+
+    def _migrate_legacy(self):
+        """Import an old single-JSON-array history file once"""
+        if not self.legacy_file or not os.path.exists(self.legacy_file):
+            return
+        if os.path.exists(self.manifest_path):
+            return
+        with self._locked():
+            # Another process (a task worker starting alongside) may have just migrated it
+            if os.path.exists(self.manifest_path) or not os.path.exists(self.legacy_file):
+                return
+            try:
+                with open(self.legacy_file, "r") as f:
+                    entries = json.load(f)
+            except (json.JSONDecodeError, OSError):
+                entries = []
+            manifest = {"segments": []}
+            self._write(manifest, entries if isinstance(entries, list) else [])
+            for segment in manifest["segments"][:-1]:
+                self._close_segment(segment)
+            self._save_manifest(manifest)
+            os.replace(self.legacy_file, self.legacy_file + ".migrated")
+
+    # ---------- reading ----------
+
+    def _read_segment(self, segment):
+        path = self._path(segment)
+        try:
+            if segment["compressed"]:
+                with gzip.open(path, "rt", encoding="utf-8") as f:
+                    lines = f.read().splitlines()
+            else:
+                with open(path, "r", encoding="utf-8") as f:
+                    lines = f.read().splitlines()
+        except FileNotFoundError:
+            return []
+        return self._parse_lines(lines)
+
+    @staticmethod
+    def _parse_lines(lines):
+        entries = []
+        for line in lines:
+            if not line.strip():
+                continue
+            try:
+                entries.append(json.loads(line))
+            except json.JSONDecodeError:
+                # A half-written last line from a concurrent append
+                continue
+        return entries
+
+    def _tail_lines(self, path, n, block_size=8192):
+        """Read the last n lines of a plain file by seeking backwards"""
+        with open(path, "rb") as f:
+            f.seek(0, io.SEEK_END)
+            pos = f.tell()
+            data = b""
+            while pos > 0 and data.count(b"\n") <= n:
+                step = min(block_size, pos)
+                pos -= step
+                f.seek(pos)
+                data = f.read(step) + data
+        return data.decode("utf-8", errors="ignore").splitlines()[-n:]
+
+    def tail(self, n):
+        """Last n entries. Touches only the active segment when it holds enough."""
+        if n <= 0:
+            return []
+        manifest = self.load_manifest()
+        result = []
+        for segment in reversed(manifest["segments"]):
+            needed = n - len(result)
+            if needed <= 0:
+                break
+            if segment["compressed"]:
+                entries = self._read_segment(segment)[-needed:]
+            else:
+                try:
+                    entries = self._parse_lines(self._tail_lines(self._path(segment), needed))
+                except FileNotFoundError:
+                    entries = []
+            result = entries + result
+        return result[-n:]
+
+    def range(self, start=None, end=None):
+        """Entries with start <= timestamp <= end; opens only overlapping segments"""
+        result = []
+        for segment in self.load_manifest()["segments"]:
+            if start and segment["end"] and segment["end"] < start:
+                continue
+            if end and segment["start"] and segment["start"] > end:
+                continue
+            for entry in self._read_segment(segment):
+                timestamp = entry.get("timestamp", "")
+                if start and timestamp < start:
+                    continue
+                if end and timestamp > end:
+                    continue
+                result.append(entry)
+        return result
+
+    def read_all(self):
+        """Every entry, oldest first"""
+        return self.range()
+
+    def read_new(self, cursor, fallback_n):
+        """
+        Entries appended since `cursor` (segment name, byte offset) and the new cursor.
+        When the active segment rotated or was cleared, falls back to the last fallback_n.
+        """
+        manifest = self.load_manifest()
+        if not manifest["segments"]:
+            return [], None
+        active = manifest["segments"][-1]
+        path = self._path(active)
+        size = os.path.getsize(path) if os.path.exists(path) else 0
+        new_cursor = (active["name"], size)
+
+        if cursor is None or cursor[0] != active["name"] or cursor[1] > size:
+            return self.tail(fallback_n), new_cursor
+        if cursor[1] == size:
+            return [], new_cursor
+
+        with open(path, "rb") as f:
+            f.seek(cursor[1])
+            data = f.read(size - cursor[1])
+        return self._parse_lines(data.decode("utf-8", errors="ignore").splitlines()), new_cursor
+
+    def cursor(self):
+        """Current end of the active segment, for read_new()"""
+        manifest = self.load_manifest()
+        if not manifest["segments"]:
+            return None
+        active = manifest["segments"][-1]
+        path = self._path(active)
+        return (active["name"], os.path.getsize(path) if os.path.exists(path) else 0)
+
+    # ---------- manifest-only statistics ----------
+
+    def count(self):
+        return sum(s["count"] for s in self.load_manifest()["segments"])
+
+    def last_timestamp(self):
+        segments = self.load_manifest()["segments"]
+        return segments[-1]["end"] if segments else None
+
+    def tally(self):
+        """Totals of count_field values across all segments"""
+        totals = Counter()
+        for segment in self.load_manifest()["segments"]:
+            totals.update(segment.get("tally", {}))
+        return dict(totals)
+
+
+CHAT_LOG_DIR = "data/chat_log"
+COMMAND_LOG_DIR = "data/command_log"
+
+os.makedirs("data", exist_ok=True)
+
+chat_log = SegmentedLog(CHAT_LOG_DIR, legacy_file="data/chat_history.json", count_field="mood")
+command_log = SegmentedLog(COMMAND_LOG_DIR, legacy_file="data/command_history.json", count_field="status")
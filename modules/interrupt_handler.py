@@ -6,12 +6,27 @@ import sys
 _interrupt_flag = False
 _interrupt_lock = threading.Lock()
 
-def set_interrupt_flag():
+# Called when the flag is set (e.g. to cut audio playback instantly)
+_interrupt_callbacks = []
+
+def register_interrupt_callback(callback):
+    """Run `callback()` every time the interrupt flag is set"""
+    if callback not in _interrupt_callbacks:
+        _interrupt_callbacks.append(callback)
+
+def set_interrupt_flag(announce=True):
     """Set the interrupt flag"""
     global _interrupt_flag
     with _interrupt_lock:
         _interrupt_flag = True
-        print("\n🛑 Interrupt signal received!")
+        if announce:
+            print("\n🛑 Interrupt signal received!")
+    
+    for callback in list(_interrupt_callbacks):
+        try:
+            callback()
+        except Exception as e:
+            print(f"⚠️ Interrupt callback error: {e}")
 
 def reset_interrupt_flag():
     """Reset the interrupt flag"""
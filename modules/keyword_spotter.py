@@ -0,0 +1,262 @@
+# modules/keyword_spotter.py
+
+import os
+import sys
+import time
+import wave
+import argparse
+from pathlib import Path
+import numpy as np
+from modules import audio_dsp
+from modules.audio_capture import audio_capture, SAMPLE_RATE, SAMPLE_WIDTH
+
+KEYWORDS = ("hey lily", "wake up lily", "stop")
+WAKE_KEYWORDS = ("hey lily", "wake up lily")
+
+# data/keywords/<keyword with underscores>/*.wav, 16-bit mono recordings of the keyword
+TEMPLATE_DIR = "data/keywords"
+ENROLL_COUNT = 3
+
+# A match is accepted when its DTW distance is within THRESHOLD_SCALE times the
+# keyword's own spread (how far its templates are from each other); with a single
+# template, DEFAULT_THRESHOLD is used. Tune with benchmarks/bench_keywords.py.
+THRESHOLD_SCALE = float(os.getenv("LILY_KWS_SCALE", "1.6"))
+DEFAULT_THRESHOLD = 9.0
+
+# Utterances longer than this aren't a lone keyword and are skipped without scoring
+MAX_KEYWORD_SECONDS = 2.5
+# Templates more than this many times longer or shorter than the utterance are skipped
+MAX_LENGTH_RATIO = 2.0
+# Frames quieter than this fraction of the loudest are trimmed from both ends
+TRIM_RATIO = 0.05
+
+
+def keyword_dir_name(keyword):
+    return keyword.replace(" ", "_")
+
+
+def pcm_to_samples(pcm):
+    """16-bit PCM bytes -> float32 samples in [-1, 1]"""
+    return np.frombuffer(pcm, dtype=np.int16).astype(np.float32) / 32768.0
+
+
+def read_wav(path):
+    """(float32 mono samples, sample_rate) from a 16-bit wav file"""
+    with wave.open(str(path), "rb") as f:
+        channels, width, rate = f.getnchannels(), f.getsampwidth(), f.getframerate()
+        data = f.readframes(f.getnframes())
+    if width != 2:
+        raise ValueError(f"{path}: expected 16-bit audio")
+    samples = pcm_to_samples(data)
+    if channels > 1:
+        samples = samples.reshape(-1, channels).mean(axis=1)
+    return samples, rate
+
+
+def write_wav(path, pcm, sample_rate=SAMPLE_RATE):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".tmp")
+    with wave.open(str(tmp_path), "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(SAMPLE_WIDTH)
+        f.setframerate(sample_rate)
+        f.writeframes(pcm)
+    os.replace(tmp_path, path)
+
+
+def trim_silence(samples, sr):
+    """Drop the quiet lead-in and tail (VAD pre-roll and end silence) around the speech"""
+    hop = max(1, sr // 100)
+    count = len(samples) // hop
+    if count == 0:
+        return samples
+    rms = np.sqrt(np.mean(samples[:count * hop].reshape(count, hop) ** 2, axis=1))
+    loud = np.nonzero(rms > rms.max() * TRIM_RATIO)[0]
+    if not len(loud):
+        return samples
+    return samples[loud[0] * hop:(loud[-1] + 1) * hop]
+
+
+def features(samples, sr):
+    """MFCC sequence of the speech in samples, at SAMPLE_RATE"""
+    if sr != SAMPLE_RATE:
+        samples = audio_dsp.resample(samples, sr / SAMPLE_RATE)
+    return audio_dsp.mfcc(trim_silence(samples, SAMPLE_RATE), SAMPLE_RATE)
+
+
+def _distance(a, b):
+    if max(len(a), len(b)) > MAX_LENGTH_RATIO * min(len(a), len(b)):
+        return float("inf")
+    band = max(10, max(len(a), len(b)) // 4)
+    return audio_dsp.dtw_distance(a, b, band=band)
+
+
+class KeywordSpotter:
+    """
+    Offline keyword spotting by template matching.
+
+    Each keyword has a few recordings in TEMPLATE_DIR (see `enroll`). An
+    utterance cut by the capture stream's VAD is turned into MFCCs and
+    compared with every template by dynamic time warping; the closest keyword
+    wins if it is within that keyword's threshold. Everything runs on the CPU
+    in a few milliseconds, so sleep mode needs no cloud request per phrase.
+
+    Templates are reloaded when files in TEMPLATE_DIR change.
+    """
+
+    def __init__(self, template_dir=TEMPLATE_DIR, scale=THRESHOLD_SCALE):
+        self.template_dir = Path(template_dir)
+        self.scale = scale
+        self.templates = {}
+        self.spread = {}
+        self._sig = None
+
+    def _signature(self):
+        try:
+            return tuple(sorted(
+                (str(p), p.stat().st_mtime_ns, p.stat().st_size) for p in self.template_dir.glob("*/*.wav")
+            ))
+        except OSError:
+            return ()
+
+    def _load(self):
+        sig = self._signature()
+        if sig == self._sig:
+            return
+        self._sig = sig
+        self.templates = {}
+        for keyword in KEYWORDS:
+            feats = []
+            for path in sorted((self.template_dir / keyword_dir_name(keyword)).glob("*.wav")):
+                try:
+                    feats.append(features(*read_wav(path)))
+                except (OSError, ValueError, EOFError, wave.Error) as e:
+                    print(f"[Keywords] Skipping {path}: {e}")
+            if feats:
+                self.templates[keyword] = feats
+        self.spread = {keyword: self._spread(feats) for keyword, feats in self.templates.items()}
+
+    @staticmethod
+    def _spread(feats):
+        """Mean distance from each template to its nearest sibling (None with one template)"""
+        if len(feats) < 2:
+            return None
+        nearest = []
+        for i, a in enumerate(feats):
+            nearest.append(min(_distance(a, b) for j, b in enumerate(feats) if j != i))
+        finite = [d for d in nearest if np.isfinite(d)]
+        return float(np.mean(finite)) if finite else None
+
+    def threshold(self, keyword, scale=None):
+        spread = self.spread.get(keyword)
+        if spread is None:
+            return DEFAULT_THRESHOLD
+        return spread * (self.scale if scale is None else scale)
+
+    def ready(self, keywords=KEYWORDS):
+        """True if at least one of keywords has templates"""
+        self._load()
+        return any(keyword in self.templates for keyword in keywords)
+
+    def score(self, samples, sr=SAMPLE_RATE, keywords=KEYWORDS):
+        """[(distance, keyword)] for each keyword with templates, closest first"""
+        self._load()
+        feats = features(samples, sr)
+        # 10 ms MFCC hop: skip anything longer than a lone keyword
+        if len(feats) > MAX_KEYWORD_SECONDS * 100:
+            return []
+        scores = []
+        for keyword in keywords:
+            if keyword in self.templates:
+                scores.append((min(_distance(feats, t) for t in self.templates[keyword]), keyword))
+        return sorted(scores)
+
+    def spot(self, samples, sr=SAMPLE_RATE, keywords=KEYWORDS, scale=None):
+        """The keyword spoken in samples, or None"""
+        for distance, keyword in self.score(samples, sr, keywords):
+            return keyword if distance <= self.threshold(keyword, scale) else None
+        return None
+
+    def listen(self, keywords=KEYWORDS, timeout=5, should_stop=None):
+        """Wait for the next utterance on the capture stream; the keyword in it, or None"""
+        pcm = audio_capture.read_utterance(timeout=timeout, phrase_time_limit=MAX_KEYWORD_SECONDS + 0.5,
+                                           should_stop=should_stop)
+        if not pcm:
+            return None
+        return self.spot(pcm_to_samples(pcm), audio_capture.sample_rate, keywords)
+
+    def enroll(self, keyword, count=ENROLL_COUNT):
+        """Record count samples of keyword from the microphone into TEMPLATE_DIR"""
+        if not audio_capture.start():
+            print("❌ Microphone stream unavailable (is pyaudio installed?)")
+            return 0
+        folder = self.template_dir / keyword_dir_name(keyword)
+        existing = len(list(folder.glob("*.wav")))
+        saved = 0
+        while saved < count:
+            print(f"🎙️  Say '{keyword}' ({saved + 1}/{count})...")
+            pcm = audio_capture.read_utterance(timeout=10, phrase_time_limit=MAX_KEYWORD_SECONDS)
+            if not pcm:
+                print("   Didn't catch that, try again")
+                continue
+            write_wav(folder / f"{existing + saved + 1:03d}.wav", pcm, audio_capture.sample_rate)
+            saved += 1
+        return saved
+
+
+# Shared spotter for this process
+keyword_spotter = KeywordSpotter()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m modules.keyword_spotter",
+                                     description="Offline keyword spotting for sleep mode and barge-in")
+    sub = parser.add_subparsers(dest="command", required=True)
+    enroll = sub.add_parser("enroll", help="record templates for a keyword")
+    enroll.add_argument("keyword", choices=KEYWORDS)
+    enroll.add_argument("--count", type=int, default=ENROLL_COUNT)
+    sub.add_parser("list", help="show enrolled keywords and their thresholds")
+    sub.add_parser("test", help="listen and print what is spotted (Ctrl+C to stop)")
+    args = parser.parse_args(argv)
+
+    if args.command == "enroll":
+        saved = keyword_spotter.enroll(args.keyword, args.count)
+        print(f"✅ Saved {saved} templates for '{args.keyword}'")
+        return 0 if saved else 1
+
+    keyword_spotter._load()
+    if args.command == "list":
+        for keyword in KEYWORDS:
+            feats = keyword_spotter.templates.get(keyword, [])
+            spread = keyword_spotter.spread.get(keyword)
+            if not feats:
+                detail = "not enrolled"
+            elif spread is None:
+                detail = f"spread n/a ({len(feats)} template{'s' if len(feats) != 1 else ''}), threshold {keyword_spotter.threshold(keyword):.2f}"
+            else:
+                detail = f"spread {spread:.2f}, threshold {keyword_spotter.threshold(keyword):.2f}"
+            print(f"  {keyword:<14} {len(feats)} templates   {detail}")
+        return 0
+
+    if not audio_capture.start():
+        print("❌ Microphone stream unavailable (is pyaudio installed?)")
+        return 1
+    try:
+        while True:
+            pcm = audio_capture.read_utterance(timeout=None, phrase_time_limit=MAX_KEYWORD_SECONDS + 0.5)
+            samples = pcm_to_samples(pcm)
+            started = time.perf_counter()
+            scores = keyword_spotter.score(samples, audio_capture.sample_rate)
+            spotted = None
+            if scores and scores[0][0] <= keyword_spotter.threshold(scores[0][1]):
+                spotted = scores[0][1]
+            elapsed = (time.perf_counter() - started) * 1000
+            detail = ", ".join(f"{k} {d:.2f}" for d, k in scores) or "too long"
+            print(f"  {spotted or '-':<14} ({detail}; {elapsed:.0f} ms)")
+    except KeyboardInterrupt:
+        return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
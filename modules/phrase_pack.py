@@ -0,0 +1,292 @@
+# modules/phrase_pack.py
+
+import io
+import os
+import ast
+import sys
+import json
+import mmap
+import struct
+import argparse
+from pathlib import Path
+from modules.audio_player import SAMPLE_RATE, CHANNELS, SAMPLE_WIDTH
+
+PACK_FILE = "data/phrase_pack.bin"
+# v2 stores raw PCM; a v1 (mp3) pack is ignored until it is rebuilt
+MAGIC = b"LILYPCK2"
+
+ACCENTS = ('us', 'uk', 'au', 'in')
+
+# Speaking helpers and the emotion each one implies (None: taken from the call)
+SPEAK_FUNCTIONS = {
+    "speak": None,
+    "speak_raw": "neutral",
+    "speak_happy": "happy",
+    "speak_excited": "excited",
+    "speak_energetic": "energetic",
+    "speak_playful": "playful",
+    "speak_calm": "calm",
+    "speak_hindi": "neutral",
+    "speak_async": None,
+}
+
+# Where fixed phrases are looked for, relative to the project root
+SCAN_PATHS = ("main.py", "server.py", "modules")
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+
+# ---------- scanning ----------
+
+def _call_name(node):
+    if isinstance(node.func, ast.Name):
+        return node.func.id
+    if isinstance(node.func, ast.Attribute):
+        return node.func.attr
+    return None
+
+
+def _call_emotion(node, default):
+    for keyword in node.keywords:
+        if keyword.arg == "emotion" and isinstance(keyword.value, ast.Constant):
+            return keyword.value.value
+    if len(node.args) > 1 and isinstance(node.args[1], ast.Constant) and isinstance(node.args[1].value, str):
+        return node.args[1].value
+    return default or "neutral"
+
+
+def scan_phrases(root=PROJECT_ROOT):
+    """
+    Find fixed speech in the source: string literals passed to speak() and
+    friends, and the literal prefix of f-strings like f"Reminder: {task}".
+    Returns (phrases, prefixes) as sets of (text, emotion).
+    """
+    phrases, prefixes = set(), set()
+    files = []
+    for name in SCAN_PATHS:
+        path = Path(root) / name
+        files.extend(sorted(path.rglob("*.py")) if path.is_dir() else [path])
+
+    for path in files:
+        try:
+            tree = ast.parse(path.read_text(encoding="utf-8"), filename=str(path))
+        except (OSError, SyntaxError):
+            continue
+        for node in ast.walk(tree):
+            if not isinstance(node, ast.Call) or not node.args:
+                continue
+            name = _call_name(node)
+            if name not in SPEAK_FUNCTIONS:
+                continue
+            emotion = _call_emotion(node, SPEAK_FUNCTIONS[name])
+            text = node.args[0]
+            if isinstance(text, ast.Constant) and isinstance(text.value, str):
+                phrases.add((text.value, emotion))
+            elif isinstance(text, ast.JoinedStr) and text.values and isinstance(text.values[0], ast.Constant):
+                prefixes.add((text.values[0].value, emotion))
+    return phrases, prefixes
+
+
+# ---------- reading ----------
+
+class PhrasePack:
+    """
+    Pre-rendered audio for fixed phrases, in one file:
+
+        MAGIC | index length (uint32 LE) | JSON index | PCM blobs
+
+    Clips are stored in the player's own format (s16le mono at its sample
+    rate, recorded in the index), so playing one needs no decoding. The
+    index maps TTS variant keys (the same keys tts_cache uses) to
+    (offset, length) in the blob area, so a lookup is a dict hit plus an
+    mmap slice. It also lists spoken prefixes ("Reminder:") that may be
+    split off the front of dynamic text and played from the pack.
+    """
+
+    def __init__(self, path=PACK_FILE):
+        self.path = path
+        self._sig = None
+        self._index = {"entries": {}, "prefixes": []}
+        self._data = None
+        self._base = 0
+
+    def _signature(self):
+        try:
+            st = os.stat(self.path)
+            return (st.st_mtime_ns, st.st_size)
+        except OSError:
+            return None
+
+    def _load(self):
+        """(Re)open the pack if it appeared or was rebuilt since the last lookup"""
+        sig = self._signature()
+        if sig == self._sig:
+            return
+        self._sig = sig
+        self._index = {"entries": {}, "prefixes": []}
+        self._data = None
+        if sig is None:
+            return
+        try:
+            with open(self.path, "rb") as f:
+                if f.read(len(MAGIC)) != MAGIC:
+                    print(f"[Phrase pack] {self.path} is not a current phrase pack, ignoring it "
+                          f"(rebuild: python -m modules.phrase_pack build)")
+                    return
+                (index_len,) = struct.unpack("<I", f.read(4))
+                self._index = json.loads(f.read(index_len).decode("utf-8"))
+                self._base = len(MAGIC) + 4 + index_len
+                self._data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError, struct.error) as e:
+            print(f"[Phrase pack] Could not load {self.path}: {e}")
+            self._index = {"entries": {}, "prefixes": []}
+
+    @property
+    def sample_rate(self):
+        self._load()
+        return self._index.get("sample_rate", SAMPLE_RATE)
+
+    def get(self, key):
+        """s16le mono PCM (at sample_rate) for a variant key, or None"""
+        self._load()
+        location = self._index["entries"].get(key)
+        if location is None or self._data is None:
+            return None
+        offset, length = location
+        start = self._base + offset
+        return self._data[start:start + length]
+
+    def split_prefixes(self, chunks, is_packed=None):
+        """
+        Split a packed prefix ("Reminder:") off the front of chunks that start with one.
+
+        is_packed(prefix) says whether the pack holds it in the voice being spoken
+        (emotion, accent); a prefix that isn't would be synthesized as an extra
+        request, so the chunk is left whole.
+        """
+        self._load()
+        prefixes = self._index.get("prefixes")
+        if not prefixes:
+            return chunks
+        result = []
+        for chunk in chunks:
+            for prefix in prefixes:
+                if (chunk.startswith(prefix) and len(chunk) > len(prefix) + 1
+                        and (is_packed is None or is_packed(prefix))):
+                    result.extend([prefix, chunk[len(prefix):].strip()])
+                    break
+            else:
+                result.append(chunk)
+        return result
+
+    def __len__(self):
+        self._load()
+        return len(self._index["entries"])
+
+
+# Shared pack for this process
+phrase_pack = PhrasePack()
+
+
+# ---------- building ----------
+
+def build_pack(path=PACK_FILE, accents=ACCENTS, emotions=None, pitch_mode=None):
+    """
+    Render every fixed phrase for each accent and write the pack.
+
+    emotions: extra emotions to render every phrase in; by default each phrase
+    is rendered in the emotion its call site uses plus neutral.
+    """
+    from modules import tts_output
+
+    pitch_mode = pitch_mode or tts_output.PITCH_MODE
+    phrases, prefixes = scan_phrases()
+
+    # Sanitize and chunk exactly as speak() will, so the keys line up at runtime
+    jobs = set()
+    clean_prefixes = set()
+    for text, emotion, is_prefix in [(t, e, False) for t, e in phrases] + [(t, e, True) for t, e in prefixes]:
+        clean, language = tts_output.sanitize_with_language(text)
+        if not clean or len(clean) < 2:
+            continue
+        if is_prefix:
+            # Only prefixes ending in a clause break make a natural split point
+            if not clean.endswith(":"):
+                continue
+            clean_prefixes.add(clean)
+            chunks = [clean]
+        else:
+            chunks = tts_output.plan_chunks(clean)
+        for chunk in chunks:
+            for emo in {emotion, "neutral"} | set(emotions or ()):
+                jobs.add((chunk, language, emo))
+
+    entries = {}
+    blobs = io.BytesIO()
+    total = len(jobs) * len(accents)
+    done = 0
+    for chunk, language, emotion in sorted(jobs):
+        for accent in accents:
+            done += 1
+            try:
+                clip, key, _ = tts_output.synthesize_chunk(chunk, language, emotion, pitch_mode, accent=accent)
+            except Exception as e:
+                print(f"[{done}/{total}] ❌ {accent}/{emotion}: {chunk!r}: {e}")
+                continue
+            if key in entries:
+                continue
+            # Kept out of the variant cache: the pack is where these are played from
+            data = clip.set_frame_rate(SAMPLE_RATE).set_channels(CHANNELS).set_sample_width(SAMPLE_WIDTH).raw_data
+            entries[key] = [blobs.tell(), len(data)]
+            blobs.write(data)
+            print(f"[{done}/{total}] {accent}/{emotion}: {chunk}")
+
+    index = {
+        "pitch_mode": pitch_mode,
+        "sample_rate": SAMPLE_RATE,
+        "accents": list(accents),
+        "prefixes": sorted(clean_prefixes, key=len, reverse=True),
+        "phrases": sorted({chunk for chunk, _, _ in jobs}),
+        "entries": entries,
+    }
+    index_bytes = json.dumps(index, ensure_ascii=False).encode("utf-8")
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<I", len(index_bytes)))
+        f.write(index_bytes)
+        f.write(blobs.getvalue())
+    os.replace(tmp_path, path)
+    return len(entries), os.path.getsize(path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m modules.phrase_pack",
+                                     description="Pre-render Lily's fixed phrases")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="scan the source and render the pack")
+    build.add_argument("--accents", default=",".join(ACCENTS), help="comma-separated accents")
+    build.add_argument("--emotions", default="", help="extra emotions to render every phrase in")
+    build.add_argument("--pitch-mode", help="pitch mode to render with (default: the current one)")
+    sub.add_parser("scan", help="list the fixed phrases that would be packed")
+    args = parser.parse_args(argv)
+
+    if args.command == "scan":
+        phrases, prefixes = scan_phrases()
+        for text, emotion in sorted(phrases):
+            print(f"  [{emotion}] {text!r}")
+        for text, emotion in sorted(prefixes):
+            print(f"  [{emotion}] prefix {text!r}")
+        print(f"{len(phrases)} phrases, {len(prefixes)} prefixes")
+        return 0
+
+    accents = [a.strip() for a in args.accents.split(",") if a.strip()]
+    emotions = [e.strip() for e in args.emotions.split(",") if e.strip()]
+    count, size = build_pack(accents=accents, emotions=emotions, pitch_mode=args.pitch_mode)
+    print(f"📦 Wrote {count} clips to {PACK_FILE} ({size / 1024:.0f} KB)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -6,6 +6,7 @@ from datetime import datetime, timedelta
 from typing import List, Dict, Optional
 import re
 from modules.tts_output import speak
+from modules.speech_service import ALARM, STATUS
 from modules.voice_input import listen_for_command
 import dateparser
 
@@ -64,11 +65,11 @@ def set_timer(duration_str):
         print("❌ Timer duration must be greater than 0.")
         return
 
-    speak(f"⏳ Timer set for {duration_str} ({total_seconds} seconds)...")
+    speak(f"⏳ Timer set for {duration_str} ({total_seconds} seconds)...", priority=STATUS)
 
     def countdown():
         time.sleep(total_seconds)
-        speak("\n⏰ Time's up!")
+        speak("\n⏰ Time's up!", priority=ALARM)
         play_sound()
         clean_expired_timers()
 
@@ -89,11 +90,11 @@ def set_alarm(time_str):
         speak(f"⏰ That time ({alarm_time.strftime('%Y-%m-%d %H:%M:%S')}) is already in the past.")
         return
 
-    speak(f"🔔 Alarm set for {alarm_time.strftime('%Y-%m-%d %I:%M %p')} ({int(seconds_until_alarm)} seconds from now)")
+    speak(f"🔔 Alarm set for {alarm_time.strftime('%Y-%m-%d %I:%M %p')} ({int(seconds_until_alarm)} seconds from now)", priority=STATUS)
 
     def wait_and_alert():
         time.sleep(seconds_until_alarm)
-        speak("\n⏰ Alarm! It's now", alarm_time.strftime('%I:%M %p'))
+        speak(f"\n⏰ Alarm! It's now {alarm_time.strftime('%I:%M %p')}", priority=ALARM)
         play_sound()
         clean_expired_alarms()
 
@@ -138,11 +139,11 @@ def set_reminder(reminder_str):
         speak("❌ Reminder time is in the past.")
         return
 
-    speak(f"✅ Reminder set: '{task}' in {int(seconds_until)} seconds")
+    speak(f"✅ Reminder set: '{task}' in {int(seconds_until)} seconds", priority=STATUS)
 
     def remind():
         time.sleep(seconds_until)
-        speak(f"\n🔔 Reminder: {task}")
+        speak(f"\n🔔 Reminder: {task}", priority=ALARM)
         play_sound()
         clean_expired_reminders()
 
@@ -1,6 +1,6 @@
 import time
 from datetime import datetime
-from modules.tts_output import speak
+from modules.speech_service import speak_async, ALARM
 from modules.reminder_tasks import (
     load_reminders, load_alarms, load_events, clean_expired_reminders,
     clean_expired_alarms, clean_expired_timers
@@ -47,7 +47,7 @@ def check_reminders_loop():
                 if r_time and format_time(safe_parse_datetime(r_time)) == current_time_str:
                     uid = f"{task}_{r_time}"
                     if uid not in reminder_shown:
-                        speak(f"⏰ Reminder: {task}")
+                        speak_async(f"⏰ Reminder: {task}", priority=ALARM)
                         reminder_shown.add(uid)
 
             # ✅ Check Tasks
@@ -63,7 +63,7 @@ def check_reminders_loop():
                     if format_time(due_dt) == current_time_str:
                         uid = f"{t_desc}_{t_due}"
                         if uid not in task_shown:
-                            speak(f"📝 Task Due: {t_desc}")
+                            speak_async(f"📝 Task Due: {t_desc}", priority=ALARM)
                             task_shown.add(uid)
 
 
@@ -74,7 +74,7 @@ def check_reminders_loop():
                 if a_time and format_time(safe_parse_datetime(a_time)) == current_time_str:
                     uid = f"alarm_{a_time}"
                     if uid not in alarm_shown:
-                        speak(f"🔔 Alarm ringing for {a_time}")
+                        speak_async(f"🔔 Alarm ringing for {a_time}", priority=ALARM)
                         alarm_shown.add(uid)
 
             # ✅ Check Timers
@@ -87,7 +87,7 @@ def check_reminders_loop():
                     if end_time and format_time(safe_parse_datetime(end_time)) == current_time_str:
                         uid = f"timer_{end_time}"
                         if uid not in timer_shown:
-                            speak(f"⏳ Timer done for {timer['duration']}")
+                            speak_async(f"⏳ Timer done for {timer['duration']}", priority=ALARM)
                             timer_shown.add(uid)
 
             # ✅ Check Calendar Events
@@ -98,7 +98,7 @@ def check_reminders_loop():
                 if e_time and format_time(safe_parse_datetime(e_time)) == current_time_str:
                     uid = f"{e_desc}_{e_time}"
                     if uid not in event_shown:
-                        speak(f"📅 Upcoming event: {e_desc}")
+                        speak_async(f"📅 Upcoming event: {e_desc}", priority=ALARM)
                         event_shown.add(uid)
 
             # Clean expired
@@ -0,0 +1,275 @@
+# modules/speech_service.py
+
+import os
+import heapq
+import itertools
+import threading
+from modules.interrupt_handler import register_interrupt_callback
+from modules.audio_player import player
+
+# Priorities, most urgent first
+ALARM = 0    # alarms, timers, reminders
+CHAT = 1     # replies to the user
+STATUS = 2   # confirmations and progress messages
+
+PRIORITY_NAMES = {ALARM: "alarm", CHAT: "chat", STATUS: "status"}
+
+
+class SpeechHandle:
+    """Handle for one queued utterance"""
+
+    def __init__(self, text, emotion, priority, options):
+        self.text = text
+        self.emotion = emotion
+        self.priority = priority
+        self.options = options
+        self.key = None          # coalescing key while queued
+        self.done = threading.Event()
+        self.result = None       # speak()'s return value once finished
+        self.cancelled = False
+        self.started = False
+        self._callbacks = []
+        self._callback_lock = threading.Lock()
+
+    def wait(self, timeout=None):
+        """Block until spoken (or dropped); returns True if it was spoken successfully"""
+        self.done.wait(timeout)
+        return bool(self.result)
+
+    def cancel(self):
+        """Drop the utterance if it hasn't started yet"""
+        self.cancelled = True
+
+    def add_done_callback(self, fn):
+        """Call fn(handle) once finished (right away if it already is)"""
+        with self._callback_lock:
+            if not self.done.is_set():
+                self._callbacks.append(fn)
+                return
+        fn(self)
+
+    def _finish(self):
+        with self._callback_lock:
+            self.done.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for fn in callbacks:
+            fn(self)
+
+
+class _RemoteSpeech:
+    """Task worker side: utterances go to the main process's service over a pipe"""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._handles = {}
+        threading.Thread(target=self._read, daemon=True).start()
+
+    def speak_async(self, text, emotion, priority, options):
+        handle = SpeechHandle(text, emotion, priority, options)
+        with self._lock:
+            request_id = next(self._ids)
+            self._handles[request_id] = handle
+            try:
+                self.conn.send((request_id, text, emotion, priority, options))
+            except (OSError, ValueError):
+                self._handles.pop(request_id)
+                handle.result = False
+                handle._finish()
+        return handle
+
+    def _read(self):
+        while True:
+            try:
+                request_id, result = self.conn.recv()
+            except (EOFError, OSError):
+                break
+            with self._lock:
+                handle = self._handles.pop(request_id, None)
+            if handle is not None:
+                handle.result = result
+                handle._finish()
+        # The main process is gone: nobody will speak what's still waiting
+        with self._lock:
+            handles, self._handles = list(self._handles.values()), {}
+        for handle in handles:
+            handle.result = False
+            handle._finish()
+
+
+class SpeechService:
+    """
+    Single owner of the speaker.
+
+    The main loop and the timer/alarm/reminder threads all queue utterances
+    here instead of calling the synthesizer directly, so speech never overlaps
+    and callers that don't need to wait aren't blocked. A task worker's service
+    forwards its utterances to the main process's (forward_to / serve_worker),
+    so its replies share the one queue and player too:
+
+    - a priority queue: alarms before chat before status, FIFO within a priority
+    - speak_async() returns a SpeechHandle; speak() waits on it
+    - an utterance identical to one still queued (same text, emotion, priority
+      and options) joins it instead of repeating
+    - an alarm cuts off lower-priority speech that is playing
+    - the interrupt flag flushes everything queued (the player cuts the audio)
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._reset_state()
+
+    def _reset_state(self):
+        self._pid = os.getpid()
+        self._heap = []
+        self._seq = itertools.count()
+        self._pending = {}
+        self._current = None
+        self._thread = None
+        self._remote = None
+
+    def forward_to(self, conn):
+        """In a task worker: speak through the main process, which serves conn"""
+        self._reset_state()
+        self._remote = _RemoteSpeech(conn)
+
+    def _ensure_worker(self):
+        # A forked task worker must not reuse the parent's queue or thread
+        if self._pid != os.getpid():
+            self._reset_state()
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        from modules.tts_output import speak_now
+
+        while True:
+            with self._cond:
+                while not self._heap:
+                    self._cond.wait()
+                _, _, handle = heapq.heappop(self._heap)
+                self._pending.pop(handle.key, None)
+                if handle.cancelled:
+                    handle._finish()
+                    continue
+                handle.started = True
+                self._current = handle
+            try:
+                handle.result = speak_now(handle.text, handle.emotion, **handle.options)
+            except Exception as e:
+                print(f"[Speech Error] {e}")
+                handle.result = False
+            finally:
+                with self._cond:
+                    self._current = None
+                handle._finish()
+
+    def speak_async(self, text, emotion="neutral", priority=CHAT, **options):
+        """
+        Queue text and return immediately with a SpeechHandle.
+        options are passed to tts_output.speak_now (verbose, pitch_mode).
+        """
+        if self._remote is not None and self._pid == os.getpid():
+            return self._remote.speak_async(text, emotion, priority, options)
+        with self._cond:
+            self._ensure_worker()
+            # Only a request that would sound the same joins a queued one
+            key = (text, emotion, priority, tuple(sorted(options.items())))
+            handle = self._pending.get(key)
+            if handle is not None and not handle.cancelled:
+                return handle
+
+            handle = SpeechHandle(text, emotion, priority, options)
+            handle.key = key
+            self._pending[key] = handle
+            heapq.heappush(self._heap, (priority, next(self._seq), handle))
+            self._cond.notify()
+
+            # An alarm doesn't wait behind chat or status speech. Cut it while
+            # holding the lock so the worker can't have started the alarm yet.
+            current = self._current
+            if priority == ALARM and current is not None and current.priority > ALARM:
+                player.flush()
+        return handle
+
+    def speak(self, text, emotion="neutral", priority=CHAT, **options):
+        """Queue text and wait until it has been spoken; returns speak()'s result"""
+        if threading.current_thread() is self._thread:
+            # Already on the speech thread (nested call): speak inline
+            from modules.tts_output import speak_now
+            return speak_now(text, emotion, **options)
+        return self.speak_async(text, emotion, priority, **options).wait()
+
+    def flush(self):
+        """Drop everything queued (waiting callers get False)"""
+        if self._pid != os.getpid():
+            return
+        with self._cond:
+            dropped = [handle for _, _, handle in self._heap if not handle.started]
+            self._heap.clear()
+            self._pending.clear()
+        for handle in dropped:
+            handle.cancelled = True
+            handle.result = False
+            handle._finish()
+
+    def pending(self):
+        """Queued utterances, most urgent first, as (priority name, text)"""
+        with self._cond:
+            queued = sorted(self._heap)
+        seen = set()
+        result = []
+        for _, _, handle in queued:
+            if id(handle) in seen or handle.cancelled or handle.started:
+                continue
+            seen.add(id(handle))
+            result.append((PRIORITY_NAMES[handle.priority], handle.text))
+        return result
+
+    def is_speaking(self):
+        return self._current is not None
+
+
+# Shared service for this process
+speech_service = SpeechService()
+
+# Ctrl+C interrupt (and later voice barge-in) drops queued speech too
+register_interrupt_callback(speech_service.flush)
+
+
+def serve_worker(conn):
+    """Main process: speak what a task worker sends over conn, until it exits"""
+    threading.Thread(target=_serve_worker, args=(conn,), daemon=True).start()
+
+
+def _serve_worker(conn):
+    send_lock = threading.Lock()
+    queued = []
+
+    def reply(request_id, handle):
+        with send_lock:
+            try:
+                conn.send((request_id, bool(handle.result)))
+            except (OSError, ValueError):
+                pass
+
+    while True:
+        try:
+            request_id, text, emotion, priority, options = conn.recv()
+        except (EOFError, OSError):
+            break
+        handle = speech_service.speak_async(text, emotion, priority, **options)
+        queued = [h for h in queued if not h.done.is_set()] + [handle]
+        handle.add_done_callback(lambda h, request_id=request_id: reply(request_id, h))
+    # The worker was killed or replaced: what it queued isn't wanted any more
+    for handle in queued:
+        handle.cancel()
+    with send_lock:
+        conn.close()
+
+
+def speak_async(text, emotion="neutral", priority=CHAT, **options):
+    """Queue text without waiting; returns a SpeechHandle"""
+    return speech_service.speak_async(text, emotion, priority, **options)
@@ -0,0 +1,164 @@
+# modules/stt_backends.py
+
+import os
+import json
+import threading
+import speech_recognition as sr
+
+try:
+    import vosk
+    vosk.SetLogLevel(-1)
+except Exception:  # optional local recognizer
+    vosk = None
+
+# 'auto' uses the local recognizer when its model is installed, else Google
+# (env LILY_STT_BACKEND: auto, google, vosk)
+STT_BACKEND = os.getenv("LILY_STT_BACKEND", "auto")
+
+# Unpacked Vosk model directory, e.g. vosk-model-small-en-us-0.15 (env LILY_VOSK_MODEL)
+VOSK_MODEL_PATH = os.getenv("LILY_VOSK_MODEL", "models/vosk-model-small-en-us")
+
+SAMPLE_WIDTH = 2  # 16-bit PCM in, like the capture stream
+
+
+class STTStream:
+    """
+    Recognition of one utterance, fed while it is being spoken.
+    accept() returns the best partial transcript so far ('' if none);
+    finish() returns the final text or None.
+    """
+
+    def accept(self, pcm):
+        raise NotImplementedError
+
+    def finish(self):
+        raise NotImplementedError
+
+
+class STTBackend:
+    """A speech-to-text engine"""
+
+    name = "base"
+    streaming = False   # True if partial transcripts arrive while the user speaks
+
+    def available(self):
+        return True
+
+    def warm(self):
+        """Load anything slow ahead of the first utterance"""
+
+    def transcribe(self, pcm, sample_rate):
+        """Text for a whole utterance of 16-bit mono PCM, or None"""
+        raise NotImplementedError
+
+    def start_stream(self, sample_rate):
+        return _BufferedStream(self, sample_rate)
+
+
+class _BufferedStream(STTStream):
+    """For non-streaming backends: collect the audio, transcribe at the end"""
+
+    def __init__(self, backend, sample_rate):
+        self.backend = backend
+        self.sample_rate = sample_rate
+        self.chunks = []
+
+    def accept(self, pcm):
+        self.chunks.append(pcm)
+        return ""
+
+    def finish(self):
+        return self.backend.transcribe(b"".join(self.chunks), self.sample_rate)
+
+
+class GoogleSTT(STTBackend):
+    """Google Web Speech via SpeechRecognition: one upload after the phrase ends"""
+
+    name = "google"
+
+    def __init__(self):
+        self.recognizer = sr.Recognizer()
+
+    def transcribe(self, pcm, sample_rate):
+        try:
+            return self.recognizer.recognize_google(sr.AudioData(pcm, sample_rate, SAMPLE_WIDTH))
+        except sr.UnknownValueError:
+            return None
+        except sr.RequestError as e:
+            print(f"[!] API error: {e}")
+            return None
+
+
+class _VoskStream(STTStream):
+    def __init__(self, model, sample_rate):
+        self.recognizer = vosk.KaldiRecognizer(model, sample_rate)
+        self.segments = []
+
+    def _text(self, partial=""):
+        return " ".join(s for s in self.segments + [partial] if s)
+
+    def accept(self, pcm):
+        if self.recognizer.AcceptWaveform(pcm):
+            # Vosk closed a segment at a pause inside the utterance
+            self.segments.append(json.loads(self.recognizer.Result()).get("text", ""))
+            return self._text()
+        return self._text(json.loads(self.recognizer.PartialResult()).get("partial", ""))
+
+    def finish(self):
+        self.segments.append(json.loads(self.recognizer.FinalResult()).get("text", ""))
+        return self._text() or None
+
+
+class VoskSTT(STTBackend):
+    """
+    Vosk (Kaldi) running locally on the CPU: partial transcripts while the
+    user speaks, final text as soon as the audio ends, no network.
+    """
+
+    name = "vosk"
+    streaming = True
+
+    def __init__(self, model_path=VOSK_MODEL_PATH):
+        self.model_path = model_path
+        self._model = None
+        self._lock = threading.Lock()
+
+    def available(self):
+        return vosk is not None and os.path.isdir(self.model_path)
+
+    def warm(self):
+        self._get_model()
+
+    def _get_model(self):
+        with self._lock:
+            if self._model is None:
+                self._model = vosk.Model(self.model_path)
+            return self._model
+
+    def start_stream(self, sample_rate):
+        return _VoskStream(self._get_model(), sample_rate)
+
+    def transcribe(self, pcm, sample_rate):
+        stream = self.start_stream(sample_rate)
+        stream.accept(pcm)
+        return stream.finish()
+
+
+BACKENDS = {"google": GoogleSTT, "vosk": VoskSTT}
+_backend = None
+
+
+def get_stt_backend():
+    """The configured backend, created on first use"""
+    global _backend
+    if _backend is None:
+        if STT_BACKEND in BACKENDS:
+            backend = BACKENDS[STT_BACKEND]()
+            if not backend.available():
+                print(f"[STT] {STT_BACKEND} is not available, using Google")
+                backend = GoogleSTT()
+        else:
+            local = VoskSTT()
+            backend = local if local.available() else GoogleSTT()
+        _backend = backend
+    return _backend
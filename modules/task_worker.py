@@ -0,0 +1,296 @@
+# modules/task_worker.py
+
+import os
+import time
+import signal
+import itertools
+import threading
+import statistics
+import multiprocessing
+from collections import deque
+from modules.audio_player import playback_state
+from modules.speech_service import serve_worker
+
+# Worker processes kept warm for LLM-routed queries (env LILY_TASK_WORKERS)
+TASK_WORKERS = max(1, int(os.getenv("LILY_TASK_WORKERS", "1")))
+# After a cancel, a task gets this long to stop on its own before its worker is killed
+CANCEL_GRACE = 0.5
+# terminate() -> kill() after this long
+KILL_GRACE = 0.5
+# Workers are never forked from the main process: by the time one is replaced, the
+# capture, listener, speech and player threads are running, and a lock one of them
+# held at fork time would stay held in the child. forkserver forks from a clean
+# single-threaded server (spawn where that isn't available).
+START_METHOD = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+# Print dispatch overhead for every task (env LILY_TASK_TIMINGS=1)
+REPORT_TASK_TIMINGS = os.getenv("LILY_TASK_TIMINGS", "") not in ("", "0")
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 1)
+
+
+# ---------- worker process ----------
+
+def _watch_cancel(cancel):
+    """Worker side: turn the parent's cancel into this process's interrupt flag"""
+    from modules.interrupt_handler import set_interrupt_flag
+    while True:
+        cancel.wait()
+        # Flushes this process's speech queue and player, and tells loops to stop
+        set_interrupt_flag(announce=False)
+        while cancel.is_set():
+            time.sleep(0.02)
+
+
+def _worker_main(conn, speech_conn, cancel, shared_playback):
+    """Runs in the worker: import and warm up once, then serve tasks until killed"""
+    # Ctrl+C is the main loop's to handle; it cancels us through the pipe
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    from modules import audio_player
+    audio_player.use_playback_state(shared_playback)
+    # Replies are spoken by the main process, in turn with its alarms and reminders
+    from modules.speech_service import speech_service
+    speech_service.forward_to(speech_conn)
+    from modules.ai_agent import handle_user_input
+    from modules.context_builder import conversation_context
+    from modules.interrupt_handler import reset_interrupt_flag
+    from modules.error_logger import log_error
+    try:
+        conversation_context.sync()
+    except Exception as e:
+        log_error(e, context="Task Worker", extra="Context warm-up failed")
+    threading.Thread(target=_watch_cancel, args=(cancel,), daemon=True).start()
+    conn.send(("ready", os.getpid(), time.monotonic()))
+
+    while True:
+        try:
+            task_id, query, user_mood = conn.recv()
+        except (EOFError, OSError):
+            return
+        started = time.monotonic()
+        reset_interrupt_flag()
+        status = "done"
+        try:
+            # No context passed: the worker's own context syncs only what's new on disk
+            handle_user_input(query, user_mood)
+        except Exception as e:
+            status = "error"
+            log_error(e, context="Task Worker", extra=f"Query: {query}")
+        if cancel.is_set():
+            status = "cancelled"
+        finished = time.monotonic()
+        cancel.clear()
+        reset_interrupt_flag()
+        conn.send((task_id, status, started, finished))
+
+
+# ---------- main process ----------
+
+class Task:
+    """One query sent to a worker"""
+
+    def __init__(self, task_id, query, worker):
+        self.id = task_id
+        self.query = query
+        self.worker = worker
+        self.status = "queued"
+        self.submitted = time.monotonic()
+        self.started = None        # worker picked it up
+        self.finished = None       # worker done with it
+        self.received = None       # result back in this process
+
+    def timings(self):
+        """Dispatch overhead: time spent getting the task to a worker and the result back"""
+        if self.started is None or self.received is None:
+            return None
+        return {
+            "dispatch_ms": _ms(self.started - self.submitted),
+            "return_ms": _ms(self.received - self.finished),
+            "overhead_ms": _ms((self.started - self.submitted) + (self.received - self.finished)),
+            "run_ms": _ms(self.finished - self.started),
+        }
+
+
+class _Worker:
+    def __init__(self, ctx):
+        self.conn, child_conn = ctx.Pipe()
+        speech_conn, child_speech_conn = ctx.Pipe()
+        self.cancel = ctx.Event()
+        self.process = ctx.Process(target=_worker_main,
+                                   args=(child_conn, child_speech_conn, self.cancel, playback_state()),
+                                   name="lily-task", daemon=True)
+        self.spawned = time.monotonic()
+        self.process.start()
+        child_conn.close()
+        child_speech_conn.close()
+        serve_worker(speech_conn)
+        self.ready = None
+        self.task = None
+
+    def poll(self, timeout=0):
+        """Handle at most one message from the worker; False if it has died"""
+        try:
+            if not self.conn.poll(timeout):
+                return self.process.is_alive()
+            message = self.conn.recv()
+        except (EOFError, OSError):
+            return False
+        if message[0] == "ready":
+            self.ready = message[2]
+            if REPORT_TASK_TIMINGS:
+                print(f"[Tasks] Worker {message[1]} ready in {_ms(self.ready - self.spawned):.0f} ms")
+        elif self.task is not None and message[0] == self.task.id:
+            _, self.task.status, self.task.started, self.task.finished = message
+            self.task.received = time.monotonic()
+            self.task = None
+        return True
+
+    def kill(self):
+        try:
+            self.process.terminate()
+            self.process.join(KILL_GRACE)
+            if self.process.is_alive():
+                self.process.kill()
+                self.process.join(KILL_GRACE)
+        except Exception:
+            pass
+        self.conn.close()
+
+
+class TaskPool:
+    """
+    Persistent task workers for LLM-routed queries.
+
+    Starting a process per query paid for the imports (under spawn) and threw
+    away every in-memory cache and LLM session when it exited. The workers
+    here start once, import and warm up ahead of the first query, and take
+    queries over a pipe. Their replies are spoken by the main process's speech
+    service, so an alarm there can cut them off. Cancelling sets a worker's
+    interrupt flag (loops that check the flag return); a task that hasn't stopped
+    after CANCEL_GRACE is killed with its worker, and a fresh one is started
+    in its place.
+
+    Each task records when it was submitted, picked up, finished and
+    received, so the dispatch overhead is measured separately from the work.
+    """
+
+    def __init__(self, size=TASK_WORKERS):
+        self.size = size
+        self._lock = threading.Lock()
+        self._reset_state()
+
+    def _reset_state(self):
+        self._pid = os.getpid()
+        self._ctx = multiprocessing.get_context(START_METHOD)
+        self._workers = []
+        self._ids = itertools.count(1)
+        self.history = deque(maxlen=100)
+        self.respawns = 0
+
+    def start(self):
+        """Start the workers that aren't running; they warm up in the background"""
+        if self._pid != os.getpid():
+            self._reset_state()
+        with self._lock:
+            self._workers = [w for w in self._workers if w.process.is_alive()]
+            while len(self._workers) < self.size:
+                self._workers.append(_Worker(self._ctx))
+
+    def _replace(self, worker):
+        worker.kill()
+        with self._lock:
+            if worker in self._workers:
+                self._workers.remove(worker)
+            self.respawns += 1
+        self.start()
+
+    def submit(self, query, user_mood=None):
+        """Hand query to an idle worker; returns its Task"""
+        self.start()
+        with self._lock:
+            workers = list(self._workers)
+        for worker in workers:
+            if not worker.poll():
+                self._replace(worker)
+        with self._lock:
+            worker = next((w for w in self._workers if w.task is None), None)
+            busy = self._workers[0] if worker is None else None
+        if busy is not None:
+            # Every worker busy (a task outlived its caller): make room
+            self._kill_task(busy)
+            with self._lock:
+                worker = next(w for w in self._workers if w.task is None)
+        task = Task(next(self._ids), query, worker)
+        worker.task = task
+        worker.conn.send((task.id, query, user_mood))
+        task.status = "running"
+        return task
+
+    def wait(self, task, timeout=None):
+        """True once task has finished (within timeout seconds)"""
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        worker = task.worker
+        while worker.task is task:
+            remaining = 0.1 if deadline is None else min(0.1, deadline - time.monotonic())
+            if remaining <= 0:
+                return False
+            if not worker.poll(remaining):
+                task.status = "died"
+                task.received = time.monotonic()
+                worker.task = None
+                self._replace(worker)
+        self._record(task)
+        return True
+
+    def cancel(self, task, grace=CANCEL_GRACE):
+        """Stop task: cooperatively if it listens, else by killing its worker"""
+        worker = task.worker
+        if worker.task is not task:
+            return task.status
+        worker.cancel.set()
+        if self.wait(task, grace):
+            return task.status
+        self._kill_task(worker)
+        return task.status
+
+    def _kill_task(self, worker):
+        """Kill worker with the task it's running, and start a fresh one"""
+        task, worker.task = worker.task, None
+        if task is not None:
+            task.status = "killed"
+            task.received = time.monotonic()
+        self._replace(worker)
+        if task is not None:
+            self._record(task)
+
+    def _record(self, task):
+        if task in self.history:
+            return
+        self.history.append(task)
+        timings = task.timings()
+        if REPORT_TASK_TIMINGS and timings:
+            print(f"[Tasks] #{task.id} {task.status}: dispatch {timings['dispatch_ms']:.1f} ms, "
+                  f"return {timings['return_ms']:.1f} ms, run {timings['run_ms']:.0f} ms")
+
+    def status(self):
+        """Dispatch overhead over recent tasks, and how often workers were replaced"""
+        overhead = sorted(t.timings()["overhead_ms"] for t in self.history if t.timings())
+        summary = {"workers": len(self._workers), "tasks": len(self.history), "respawns": self.respawns}
+        if overhead:
+            summary.update({
+                "overhead_median_ms": statistics.median(overhead),
+                "overhead_p95_ms": overhead[int(0.95 * (len(overhead) - 1))],
+                "overhead_max_ms": overhead[-1],
+            })
+        return summary
+
+    def shutdown(self):
+        with self._lock:
+            workers, self._workers = self._workers, []
+        for worker in workers:
+            worker.kill()
+
+
+# Shared pool for the main process
+task_pool = TaskPool()
@@ -0,0 +1,223 @@
+# modules/tts_backends.py
+
+import io
+import os
+import time
+import shutil
+import socket
+import threading
+import subprocess
+
+# 'auto' picks per request; 'gtts' or 'espeak' pins one backend (env LILY_TTS_BACKEND)
+TTS_BACKEND = os.getenv("LILY_TTS_BACKEND", "auto")
+
+# A network backend slower than this per request (smoothed) is set aside for a while
+LATENCY_BUDGET = float(os.getenv("LILY_TTS_LATENCY_BUDGET", "1.5"))
+EWMA_ALPHA = 0.3
+# How long a slow or failing backend is skipped before it is tried again
+RETRY_AFTER = 60
+
+# Network reachability is probed at most this often
+NETWORK_CHECK_INTERVAL = 30
+NETWORK_PROBE = ("translate.google.com", 443)
+
+
+class TTSBackend:
+    """
+    A text-to-speech engine producing base (unprocessed) audio.
+    The emotion DSP in EmotionVoiceEngine runs on top of whichever backend is used.
+    """
+
+    name = "base"
+    format = "wav"          # container of the bytes synthesize() returns
+    needs_network = False
+
+    def available(self):
+        return True
+
+    def synthesize(self, text, lang='en', tld='com'):
+        """Return encoded audio bytes (in self.format) for text"""
+        raise NotImplementedError
+
+
+class GTTSBackend(TTSBackend):
+    """Google Translate TTS: natural voice, one network round trip per request"""
+
+    name = "gtts"
+    format = "mp3"
+    needs_network = True
+
+    def available(self):
+        try:
+            import gtts  # noqa: F401
+            return True
+        except ImportError:
+            return False
+
+    def synthesize(self, text, lang='en', tld='com'):
+        from gtts import gTTS
+        # Always use fast speech for more natural sound
+        tts = gTTS(text=text, lang=lang, slow=False, tld=tld)
+        mp3_buffer = io.BytesIO()
+        tts.write_to_fp(mp3_buffer)
+        return mp3_buffer.getvalue()
+
+
+class EspeakBackend(TTSBackend):
+    """espeak-ng (or espeak) run locally: robotic but instant and offline"""
+
+    name = "espeak"
+    format = "wav"
+
+    # gTTS accent TLD -> closest espeak-ng English voice
+    VOICES = {
+        'com': 'en-us',
+        'co.uk': 'en-gb',
+        'com.au': 'en-gb',
+        'co.in': 'en-gb',
+    }
+    WORDS_PER_MINUTE = 165
+
+    def __init__(self):
+        self.binary = shutil.which("espeak-ng") or shutil.which("espeak")
+
+    def available(self):
+        return self.binary is not None
+
+    def synthesize(self, text, lang='en', tld='com'):
+        voice = lang if lang != 'en' else self.VOICES.get(tld, 'en-us')
+        result = subprocess.run(
+            [self.binary, "--stdout", "-v", voice, "-s", str(self.WORDS_PER_MINUTE), text],
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, timeout=30, check=True,
+        )
+        return result.stdout
+
+
+class BackendSelector:
+    """
+    Chooses a backend per request.
+
+    Backends are listed best voice first. A network backend is used while the
+    network is reachable and its smoothed latency stays within LATENCY_BUDGET;
+    when it is slow or fails it is skipped for RETRY_AFTER seconds and the next
+    (local) backend takes over. A failed request falls through to the next
+    backend straight away. Reachability is re-probed on a background thread
+    every NETWORK_CHECK_INTERVAL; requests only read the last result.
+    """
+
+    def __init__(self, backends, mode=TTS_BACKEND, budget=LATENCY_BUDGET):
+        self.backends = [b for b in backends if b.available()]
+        self.mode = mode
+        self.budget = budget
+        self.latency = {}
+        self.skip_until = {}
+        self._network = (0.0, True)
+        self._prober = None
+        self._lock = threading.Lock()
+
+    def get(self, name):
+        return next((b for b in self.backends if b.name == name), None)
+
+    def names(self):
+        """Available backend names, best voice first"""
+        return [b.name for b in self.backends]
+
+    def network_available(self):
+        """Last probe result; a stale one is refreshed on a background thread, never here"""
+        checked_at, ok = self._network
+        if time.monotonic() - checked_at >= NETWORK_CHECK_INTERVAL:
+            with self._lock:
+                # A forked child's copy of the thread reports not alive
+                if self._prober is None or not self._prober.is_alive():
+                    self._prober = threading.Thread(target=self._probe_network, daemon=True)
+                    self._prober.start()
+        return ok
+
+    def _probe_network(self):
+        try:
+            socket.create_connection(NETWORK_PROBE, timeout=0.5).close()
+            ok = True
+        except OSError:
+            ok = False
+        self._network = (time.monotonic(), ok)
+
+    def candidates(self, local=False):
+        """Backends to try for the next request, in order (local=True: local ones first)"""
+        if local:
+            return sorted(self.candidates(), key=lambda b: b.needs_network)
+        if self.mode != "auto":
+            pinned = self.get(self.mode)
+            if pinned is not None:
+                return [pinned]
+        now = time.monotonic()
+        usable = []
+        for backend in self.backends:
+            if self.skip_until.get(backend.name, 0) > now:
+                continue
+            if backend.needs_network and not self.network_available():
+                continue
+            usable.append(backend)
+        # Everything set aside: still try them rather than stay silent
+        return usable or list(self.backends)
+
+    def reusable_names(self):
+        """
+        Backends whose cached audio may stand in for a fresh request: the one
+        that would be used now and any better ones. While gTTS is usable, audio
+        espeak-ng rendered during an outage isn't replayed.
+        """
+        names = self.names()
+        candidates = self.candidates()
+        if not candidates:
+            return names
+        return names[:names.index(candidates[0].name) + 1]
+
+    def _record(self, backend, seconds):
+        with self._lock:
+            previous = self.latency.get(backend.name)
+            smoothed = seconds if previous is None else EWMA_ALPHA * seconds + (1 - EWMA_ALPHA) * previous
+            self.latency[backend.name] = smoothed
+            if backend.needs_network and smoothed > self.budget and len(self.backends) > 1:
+                self.skip_until[backend.name] = time.monotonic() + RETRY_AFTER
+                # Start fresh when it is retried
+                self.latency.pop(backend.name)
+                print(f"[TTS] {backend.name} averaging {smoothed:.2f}s (budget {self.budget:.2f}s), "
+                      f"using local voice for {RETRY_AFTER}s")
+
+    def _record_failure(self, backend, error):
+        with self._lock:
+            self.skip_until[backend.name] = time.monotonic() + RETRY_AFTER
+            self.latency.pop(backend.name, None)
+        if backend.needs_network:
+            self._network = (time.monotonic(), False)
+        print(f"[TTS] {backend.name} failed ({error}), skipping it for {RETRY_AFTER}s")
+
+    def synthesize(self, text, lang='en', tld='com', local=False):
+        """Synthesize with the best usable backend; returns (backend, audio bytes)"""
+        error = None
+        for backend in self.candidates(local):
+            started = time.perf_counter()
+            try:
+                data = backend.synthesize(text, lang=lang, tld=tld)
+            except Exception as e:
+                self._record_failure(backend, e)
+                error = e
+                continue
+            self._record(backend, time.perf_counter() - started)
+            return backend, data
+        raise error or RuntimeError("No TTS backend available")
+
+    def status(self):
+        """Current latency estimates and which backends are set aside"""
+        now = time.monotonic()
+        return {
+            b.name: {
+                "avg_latency_s": round(self.latency[b.name], 3) if b.name in self.latency else None,
+                "skipped_for_s": max(0, round(self.skip_until.get(b.name, 0) - now)),
+            }
+            for b in self.backends
+        }
+
+
+# Best voice first
+backend_selector = BackendSelector([GTTSBackend(), EspeakBackend()])
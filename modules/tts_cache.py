@@ -0,0 +1,386 @@
+# modules/tts_cache.py
+
+import os
+import sys
+import json
+import time
+import fcntl
+import atexit
+import argparse
+import threading
+from pathlib import Path
+from hashlib import sha256
+from contextlib import contextmanager
+
+CACHE_DIR = Path("tts_cache")
+
+# Level one: raw TTS audio, independent of emotion
+BASE_DIR = CACHE_DIR / "base"
+# Level two: emotion-processed audio derived from a base entry
+VARIANT_DIR = CACHE_DIR / "variants"
+
+INDEX_FILE = CACHE_DIR / "index.json"
+LOCK_FILE = CACHE_DIR / ".lock"
+
+# Byte budget for both levels together (env LILY_TTS_CACHE_MB)
+MAX_CACHE_BYTES = int(os.getenv("LILY_TTS_CACHE_MB", "200")) * 1024 * 1024
+# Evict down to this fraction of the budget so eviction isn't needed on every put
+LOW_WATER = 0.9
+
+LEVELS = ("base", "variants")
+
+# Hits, misses and new files are counted in memory and written to the index
+# after this many lookups/puts or this many seconds, whichever comes first (and at exit)
+INDEX_FLUSH_EVERY = 32
+INDEX_FLUSH_INTERVAL = 10
+# prune() leaves temp files younger than this alone: a writer may still be writing them
+TMP_MAX_AGE = 600
+
+
+def base_key(text, tld, lang='en', backend='gtts'):
+    """Key for raw TTS audio: depends only on which backend is asked for what"""
+    # gTTS keys predate pluggable backends; unchanged so existing caches and packs stay valid
+    prefix = "" if backend == "gtts" else f"{backend}|"
+    return sha256(f"{prefix}{lang}|{tld}|{text}".encode()).hexdigest()
+
+
+def variant_key(base, profile, pitch_mode, dsp_version):
+    """
+    Key for a processed variant: the base audio plus every number that shapes
+    the processing, so editing EMOTION_PROFILES only misses level two
+    """
+    params = json.dumps(profile, sort_keys=True)
+    return sha256(f"{base}|{params}|{pitch_mode}|{dsp_version}".encode()).hexdigest()
+
+
+class TTSCache:
+    """
+    Two-level TTS cache with a byte budget.
+
+    base/<key>.mp3      what a TTS backend returned for (text, tld, lang); the
+                        bytes are the backend's own format (wav from espeak-ng)
+    variants/<key>.mp3  that audio after an emotion profile was applied
+    index.json          size, last access and hit count per file, plus hit/miss
+                        and bytes-served counters; updated in memory and written
+                        in batches (INDEX_FLUSH_EVERY / INDEX_FLUSH_INTERVAL)
+
+    A new emotion for text already heard needs only local DSP on the base
+    entry, not another network fetch. When the files outgrow max_bytes the
+    least recently used ones are evicted. The accent is part of every key,
+    so nothing has to be thrown away when it changes.
+    """
+
+    def __init__(self, root=CACHE_DIR, max_bytes=MAX_CACHE_BYTES):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.index_path = self.root / INDEX_FILE.name
+        self.lock_path = self.root / LOCK_FILE.name
+        self.base_dir = self.root / "base"
+        self.variant_dir = self.root / "variants"
+        self.base_dir.mkdir(parents=True, exist_ok=True)
+        self.variant_dir.mkdir(parents=True, exist_ok=True)
+        self._index = None
+        self._sig = None
+        self._known_bytes = 0     # size of the indexed files as of the last flush
+        self._lock = threading.Lock()
+        self._reset_pending()
+
+    def _reset_pending(self):
+        self._pending_pid = os.getpid()
+        self._pending = {
+            "hits": {level: 0 for level in LEVELS},
+            "misses": {level: 0 for level in LEVELS},
+            "bytes_served": 0,
+            "touched": {},      # name -> (last_access, hits, size)
+            "added": {},        # name -> entry
+            "removed": set(),
+        }
+        self._pending_ops = 0
+        self._pending_bytes = 0
+        self._last_flush = time.monotonic()
+
+    # ---------- index ----------
+
+    @staticmethod
+    def _empty():
+        return {
+            "entries": {},
+            "hits": {level: 0 for level in LEVELS},
+            "misses": {level: 0 for level in LEVELS},
+            "bytes_served": 0,
+            "evicted": 0,
+        }
+
+    def _signature(self):
+        try:
+            st = os.stat(self.index_path)
+            return (st.st_mtime_ns, st.st_size)
+        except OSError:
+            return None
+
+    def _load(self):
+        """Reload only if another process wrote the index since we last did"""
+        sig = self._signature()
+        if self._index is not None and sig == self._sig:
+            return self._index
+        index = self._empty()
+        if sig is None:
+            self._scan(index)
+        else:
+            try:
+                with open(self.index_path, "r") as f:
+                    index.update(json.load(f))
+            except (json.JSONDecodeError, OSError):
+                self._scan(index)
+        self._index = index
+        self._sig = sig
+        return index
+
+    def _save(self):
+        tmp_path = self.index_path.with_suffix(".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(self._index, f)
+        os.replace(tmp_path, self.index_path)
+        self._sig = self._signature()
+
+    @contextmanager
+    def _updating(self):
+        with open(self.lock_path, "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield self._load()
+                self._save()
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _scan(self, index):
+        """Index files on disk that the index doesn't know about (first run, lost index)"""
+        entries = index["entries"]
+        for level in LEVELS:
+            for path in (self.root / level).glob("*.mp3"):
+                name = f"{level}/{path.name}"
+                if name not in entries:
+                    st = path.stat()
+                    entries[name] = {"size": st.st_size, "last_access": st.st_mtime, "hits": 0}
+
+    # ---------- files ----------
+
+    def _path(self, name):
+        return self.root / name
+
+    def _get(self, level, key):
+        name = f"{level}/{key}.mp3"
+        try:
+            data = self._path(name).read_bytes()
+        except FileNotFoundError:
+            data = None
+        with self._lock:
+            pending = self._pending_for_process()
+            if data is None:
+                pending["misses"][level] += 1
+                pending["touched"].pop(name, None)
+                pending["added"].pop(name, None)
+                pending["removed"].add(name)
+            else:
+                pending["hits"][level] += 1
+                pending["bytes_served"] += len(data)
+                _, hits, _ = pending["touched"].get(name, (0, 0, 0))
+                pending["touched"][name] = (time.time(), hits + 1, len(data))
+        self._maybe_flush()
+        return data
+
+    def _put(self, level, key, data):
+        name = f"{level}/{key}.mp3"
+        path = self._path(name)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Unique per writer: span threads and other processes may write the same key
+        tmp_path = path.with_name(f"{path.stem}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, path)
+        with self._lock:
+            pending = self._pending_for_process()
+            pending["removed"].discard(name)
+            pending["touched"].pop(name, None)
+            pending["added"][name] = {"size": len(data), "last_access": time.time(), "hits": 0}
+            self._pending_bytes += len(data)
+        self._maybe_flush()
+
+    # ---------- batched index updates ----------
+
+    def _pending_for_process(self):
+        """Caller holds self._lock. A forked worker doesn't flush its parent's counts."""
+        if self._pending_pid != os.getpid():
+            self._reset_pending()
+        self._pending_ops += 1
+        return self._pending
+
+    def _maybe_flush(self):
+        with self._lock:
+            over_budget = self._pending_bytes and self._known_bytes + self._pending_bytes > self.max_bytes
+            due = (self._pending_ops >= INDEX_FLUSH_EVERY or over_budget
+                   or time.monotonic() - self._last_flush >= INDEX_FLUSH_INTERVAL)
+        if due:
+            self.flush()
+
+    def flush(self):
+        """Write the counts and files recorded since the last flush to the index, evicting if over budget"""
+        with self._lock:
+            if self._pending_pid != os.getpid():
+                self._reset_pending()
+            pending = self._pending
+            self._reset_pending()
+        if not any([any(pending["hits"].values()), any(pending["misses"].values()),
+                    pending["touched"], pending["added"], pending["removed"]]):
+            return
+        with self._updating() as index:
+            entries = index["entries"]
+            for level in LEVELS:
+                index["hits"][level] += pending["hits"][level]
+                index["misses"][level] += pending["misses"][level]
+            index["bytes_served"] += pending["bytes_served"]
+            for name in pending["removed"]:
+                entries.pop(name, None)
+            entries.update(pending["added"])
+            for name, (last_access, hits, size) in pending["touched"].items():
+                entry = entries.setdefault(name, {"size": size, "hits": 0})
+                entry["hits"] = entry.get("hits", 0) + hits
+                entry["last_access"] = max(entry.get("last_access", 0), last_access)
+            self._evict(index, self.max_bytes)
+            self._known_bytes = sum(e["size"] for e in entries.values())
+
+    def _evict(self, index, max_bytes):
+        """Drop least recently used files until the total fits the budget"""
+        entries = index["entries"]
+        total = sum(e["size"] for e in entries.values())
+        if total <= max_bytes:
+            return 0, 0
+        target = max_bytes * LOW_WATER
+        freed = removed = 0
+        for name, entry in sorted(entries.items(), key=lambda item: item[1].get("last_access", 0)):
+            if total - freed <= target:
+                break
+            try:
+                self._path(name).unlink()
+            except FileNotFoundError:
+                pass
+            del entries[name]
+            freed += entry["size"]
+            removed += 1
+        index["evicted"] += removed
+        return removed, freed
+
+    # ---------- public API ----------
+
+    def has_base(self, key):
+        """Cheap existence check that doesn't count as a hit or miss"""
+        return (self.base_dir / f"{key}.mp3").exists()
+
+    def has_variant(self, key):
+        return (self.variant_dir / f"{key}.mp3").exists()
+
+    def get_base(self, key):
+        return self._get("base", key)
+
+    def put_base(self, key, data):
+        self._put("base", key, data)
+
+    def get_variant(self, key):
+        return self._get("variants", key)
+
+    def put_variant(self, key, data):
+        self._put("variants", key, data)
+
+    def prune(self, max_bytes=None):
+        """
+        Reconcile the index with the disk (forget missing files, index unknown
+        ones, delete files from the old flat layout) and evict down to the budget.
+        Returns (files_removed, bytes_freed).
+        """
+        self.flush()
+        removed = freed = 0
+        stale_tmp = time.time() - TMP_MAX_AGE
+        with self._updating() as index:
+            entries = index["entries"]
+            for name in [n for n in entries if not self._path(n).exists()]:
+                del entries[name]
+            self._scan(index)
+            for path in list(self.root.glob("*.mp3")) + list(self.root.glob("*/*.tmp")):
+                try:
+                    st = path.stat()
+                    if path.suffix == ".tmp" and st.st_mtime > stale_tmp:
+                        continue
+                    path.unlink()
+                except FileNotFoundError:
+                    continue
+                freed += st.st_size
+                removed += 1
+            evicted, evicted_bytes = self._evict(index, self.max_bytes if max_bytes is None else max_bytes)
+        return removed + evicted, freed + evicted_bytes
+
+    def stats(self):
+        """Hit rate, bytes served and current size, per level and overall"""
+        self.flush()
+        index = self._load()
+        result = {"levels": {}}
+        for level in LEVELS:
+            files = [e for n, e in index["entries"].items() if n.startswith(level + "/")]
+            hits, misses = index["hits"][level], index["misses"][level]
+            result["levels"][level] = {
+                "files": len(files),
+                "bytes": sum(e["size"] for e in files),
+                "hits": hits,
+                "misses": misses,
+                "hit_rate": round(hits / (hits + misses) * 100, 1) if hits + misses else None,
+            }
+        hits = sum(index["hits"].values())
+        lookups = hits + sum(index["misses"].values())
+        result.update({
+            "files": sum(level["files"] for level in result["levels"].values()),
+            "bytes": sum(level["bytes"] for level in result["levels"].values()),
+            "max_bytes": self.max_bytes,
+            "hit_rate": round(hits / lookups * 100, 1) if lookups else None,
+            "bytes_served": index["bytes_served"],
+            "evicted": index["evicted"],
+        })
+        return result
+
+
+# Shared cache for this process
+tts_cache = TTSCache()
+atexit.register(tts_cache.flush)
+
+
+def _mb(n):
+    return f"{n / (1024 * 1024):.1f} MB"
+
+
+def _print_stats(stats):
+    def rate(value):
+        return f"{value}%" if value is not None else "-"
+
+    print(f"📦 TTS cache: {stats['files']} files, {_mb(stats['bytes'])} of {_mb(stats['max_bytes'])}")
+    for level, s in stats["levels"].items():
+        print(f"   {level:<9} {s['files']:>6} files {_mb(s['bytes']):>10}   "
+              f"hits {s['hits']} / misses {s['misses']} ({rate(s['hit_rate'])})")
+    print(f"   hit rate: {rate(stats['hit_rate'])}, served {_mb(stats['bytes_served'])}, "
+          f"evicted {stats['evicted']} files so far")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m modules.tts_cache", description="Manage the TTS audio cache")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("stats", help="show size, hit rate and bytes served")
+    prune = sub.add_parser("prune", help="drop stale files and evict down to the byte budget")
+    prune.add_argument("--max-mb", type=float, help="budget to prune to (default: LILY_TTS_CACHE_MB)")
+    args = parser.parse_args(argv)
+
+    if args.command == "prune":
+        max_bytes = int(args.max_mb * 1024 * 1024) if args.max_mb is not None else None
+        removed, freed = tts_cache.prune(max_bytes)
+        print(f"🧹 Removed {removed} files, freed {_mb(freed)}")
+    _print_stats(tts_cache.stats())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
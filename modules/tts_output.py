@@ -1,20 +1,56 @@
 import os
-import subprocess
-from pathlib import Path
+from modules.emotion_voice_engine import (
+    EmotionVoiceEngine, PITCH_MODES, PITCH_SHIFT_MODE, DSP_VERSION, array_to_segment
+)
+from modules.tts_cache import tts_cache, base_key, variant_key
+from modules.tts_backends import backend_selector
+from modules.tts_quality import quality_governor
+from modules.phrase_pack import phrase_pack
+from modules.audio_player import player
+from modules.speech_service import speech_service, CHAT
+from modules import audio_dsp
+from pydub import AudioSegment
 from hashlib import sha256
-from modules.emotion_voice_engine import EmotionVoiceEngine
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 import re 
 import io
 import sys
-
-CACHE_DIR = Path("tts_cache")
-CACHE_DIR.mkdir(exist_ok=True)
+import time
+import queue
+import threading
 
 engine = EmotionVoiceEngine()
 
 # Set preferred accent (options: 'us', 'uk', 'au', 'in')
 VOICE_ACCENT = 'us'
 
+# Pitch-shift mode: 'fast', 'wsola' or 'librosa' (env LILY_PITCH_MODE, set_pitch_mode())
+PITCH_MODE = PITCH_SHIFT_MODE
+
+# How many synthesized chunks may wait ahead of playback
+PIPELINE_DEPTH = 2
+
+# Adaptive chunking: the first chunk is kept short so audio starts quickly, then
+# each chunk may be CHUNK_GROWTH times longer, up to the throughput-friendly size
+FIRST_CHUNK_CHARS = 80
+MAX_CHUNK_CHARS = 500
+CHUNK_GROWTH = 2
+
+# Mixed Hindi/English chunks: script spans synthesized at once
+SPAN_WORKERS = 4
+_span_pool = None
+_span_pool_pid = None
+
+# synthesize_chunk's default: the complete emotion chain
+FULL_QUALITY = {"pitch": True, "enhance": True, "local": False}
+
+# Print time-to-first-audio and inter-chunk gaps after every speak() call
+REPORT_TTS_TIMINGS = os.getenv("LILY_TTS_TIMINGS") == "1"
+
+# Timings of the most recent speak() call
+last_speak_timings = {}
+
 def extract_emotion(text):
     """Extract emotion markers from text like (happy) or (sad)"""
     match = re.match(r"\((.*?)\)", text)
@@ -24,130 +60,110 @@ def extract_emotion(text):
         return emotion, clean_text
     return "neutral", text
 
-def remove_emojis(text):
-    """Remove all emojis from text"""
-    # Comprehensive emoji pattern covering most Unicode emoji ranges
-    emoji_pattern = re.compile(
-        "["
-        "\U0001F600-\U0001F64F"  # emoticons
-        "\U0001F300-\U0001F5FF"  # symbols & pictographs
-        "\U0001F680-\U0001F6FF"  # transport & map symbols
-        "\U0001F1E0-\U0001F1FF"  # flags (iOS)
-        "\U00002500-\U00002BEF"  # chinese char
-        "\U00002702-\U000027B0"  # dingbats
-        "\U000024C2-\U0001F251"  # enclosed characters
-        "\U0001F900-\U0001F9FF"  # supplemental symbols and pictographs
-        "\U0001FA00-\U0001FA6F"  # chess symbols
-        "\U0001FA70-\U0001FAFF"  # symbols and pictographs extended-a
-        "\U00002600-\U000026FF"  # miscellaneous symbols
-        "\U00002B50"              # star
-        "\U0001F004"              # mahjong tile
-        "\U0001F0CF"              # playing card
-        "\U0001F170-\U0001F251"  # enclosed characters supplement
-        "]+",
-        flags=re.UNICODE
-    )
-    return emoji_pattern.sub('', text)
+# ---------- text sanitization ----------
+# Everything is compiled once at import; sanitize_text makes a few linear passes:
+#   1. one alternation drops HTML/XML tags, [n] citations, URLs and ``` code blocks
+#   2. one alternation unwraps markdown (** __ ~~ ` * _), recursing into nested spans
+#   3. one alternation drops leftover emote actions (*blushes* across lines, ~nervous~)
+#   4. str.translate deletes emojis and every character TTS shouldn't read
+#   5. whitespace and repeated .!? are collapsed
+# Language detection reuses the cleaned text instead of rescanning with regexes.
 
-def remove_markdown_formatting(text):
-    """Remove markdown formatting like **bold**, *italic*, `code`, etc."""
-    # Remove bold (**text** or __text__)
-    text = re.sub(r'\*\*(.+?)\*\*', r'\1', text)
-    text = re.sub(r'__(.+?)__', r'\1', text)
-    
-    # Remove italic (*text* or _text_)
-    text = re.sub(r'\*(.+?)\*', r'\1', text)
-    text = re.sub(r'_(.+?)_', r'\1', text)
-    
-    # Remove code blocks (```code```)
-    text = re.sub(r'```.*?```', '', text, flags=re.DOTALL)
-    
-    # Remove inline code (`code`)
-    text = re.sub(r'`(.+?)`', r'\1', text)
-    
-    # Remove strikethrough (~~text~~)
-    text = re.sub(r'~~(.+?)~~', r'\1', text)
-    
-    return text
+_STRIP_RE = re.compile(r"</?[A-Za-z][^<>]*>|\[\d+\]|https?://\S+|www\.\S+|```.*?```", re.DOTALL)
+_MARKDOWN_RE = re.compile(r"\*\*(.+?)\*\*|__(.+?)__|~~(.+?)~~|`(.+?)`|\*(.+?)\*|_(.+?)_")
+_EMOTE_RE = re.compile(r"\*[^*]+\*|~[^~]+~")
+_PUNCT_RUN_RE = re.compile(r"([.!?]){2,}")
+_DEVANAGARI_RE = re.compile(r"[\u0900-\u097F]")
+_LATIN_RE = re.compile(r"[a-zA-Z]")
 
-def remove_special_symbols(text):
-    """Remove special symbols and emote actions like *blushes* or ~nervous~"""
-    # Remove action emotes like *action* or ~action~
-    text = re.sub(r'\*[^*]+\*', '', text)
-    text = re.sub(r'~[^~]+~', '', text)
-    
-    # Remove other special symbols but keep basic punctuation and Unicode characters (for Hindi)
-    # Modified to preserve Devanagari script (Hindi): \u0900-\u097F
-    text = re.sub(r'[^\u0900-\u097Fa-zA-Z0-9\s.,!?;:\'-]', '', text)
-    
-    return text
+# Emoji / pictograph / CJK ranges that are always dropped
+_EMOJI_RANGES = (
+    (0x1F600, 0x1F64F),  # emoticons
+    (0x1F300, 0x1F5FF),  # symbols & pictographs
+    (0x1F680, 0x1F6FF),  # transport & map symbols
+    (0x1F1E0, 0x1F1FF),  # flags (iOS)
+    (0x02500, 0x02BEF),  # box drawing, arrows, misc symbols
+    (0x02702, 0x027B0),  # dingbats
+    (0x024C2, 0x1F251),  # enclosed characters and everything up to them
+    (0x1F900, 0x1F9FF),  # supplemental symbols and pictographs
+    (0x1FA00, 0x1FAFF),  # chess symbols, symbols and pictographs extended-a
+)
+# Besides letters, digits, whitespace and Devanagari (Hindi), keep basic punctuation
+_SPEAKABLE_PUNCTUATION = frozenset(".,!?;:'-")
 
-def remove_urls(text):
-    """Remove URLs from text"""
-    # Remove http/https URLs
-    text = re.sub(r'https?://\S+', '', text)
-    # Remove www URLs
-    text = re.sub(r'www\.\S+', '', text)
-    return text
+# Every byte except ASCII letters, for counting Latin letters with bytes.translate
+_NON_LATIN_BYTES = bytes(b for b in range(256) if not chr(b).isascii() or not chr(b).isalpha())
 
-def remove_citations(text):
-    """Remove citation tags and references"""
-    # Remove XML-style citation tags
-    text = re.sub(r']*>.*?', '', text, flags=re.DOTALL)
-    text = re.sub(r'<[^>]+>', '', text)  # Remove any remaining HTML/XML tags
-    
-    # Remove citation references like [1], [2], etc.
-    text = re.sub(r'\[\d+\]', '', text)
-    
-    return text
 
-def detect_language(text):
-    """Detect if text contains Hindi (Devanagari script)"""
-    # Check if text contains Devanagari characters
-    devanagari_pattern = re.compile(r'[\u0900-\u097F]')
-    has_hindi = bool(devanagari_pattern.search(text))
-    
-    # Count Hindi vs English characters
-    hindi_chars = len(devanagari_pattern.findall(text))
-    english_chars = len(re.findall(r'[a-zA-Z]', text))
-    
+class _SpeakableChars(dict):
+    """str.translate table that keeps speakable characters and deletes the rest, filled in lazily"""
+
+    def __missing__(self, codepoint):
+        char = chr(codepoint)
+        if any(lo <= codepoint <= hi for lo, hi in _EMOJI_RANGES):
+            keep = False
+        else:
+            keep = (
+                (char.isascii() and char.isalnum())
+                or char in _SPEAKABLE_PUNCTUATION
+                or char.isspace()
+                or 0x0900 <= codepoint <= 0x097F
+            )
+        value = codepoint if keep else None
+        self[codepoint] = value
+        return value
+
+
+_SPEAKABLE = _SpeakableChars()
+
+
+def _unwrap_markdown(match):
+    inner = next(group for group in match.groups() if group is not None)
+    return _MARKDOWN_RE.sub(_unwrap_markdown, inner)
+
+
+def _language_of_clean(clean):
+    """
+    detect_language for sanitized text, which holds only ASCII and Devanagari:
+    each Devanagari character is 3 UTF-8 bytes, so the counts come from byte lengths
+    """
+    encoded = clean.encode("utf-8")
+    hindi_chars = (len(encoded) - len(clean)) // 2
+    english_chars = len(encoded.translate(None, _NON_LATIN_BYTES))
+    return _classify_language(hindi_chars, english_chars)
+
+
+def _classify_language(hindi_chars, english_chars):
     # If more than 30% Hindi characters, consider it Hindi
     total_chars = hindi_chars + english_chars
     if total_chars > 0 and (hindi_chars / total_chars) > 0.3:
         return 'hi'  # Hindi
-    elif has_hindi:
+    elif hindi_chars:
         return 'mixed'  # Mixed Hindi-English
     else:
         return 'en'  # English
 
+def detect_language(text):
+    """Detect if text contains Hindi (Devanagari script)"""
+    return _classify_language(len(_DEVANAGARI_RE.findall(text)), len(_LATIN_RE.findall(text)))
+
+def sanitize_with_language(text):
+    """
+    Comprehensive text sanitization for TTS, plus the language of the result
+    
+    Returns:
+        (clean_text, language): language is 'en', 'hi' or 'mixed'
+    """
+    text = _STRIP_RE.sub('', text)
+    text = _MARKDOWN_RE.sub(_unwrap_markdown, text)
+    text = _EMOTE_RE.sub('', text)
+    text = text.translate(_SPEAKABLE)
+    text = _PUNCT_RUN_RE.sub(r'\1', ' '.join(text.split()))
+    return text, _language_of_clean(text)
+
 def sanitize_text(text):
     """Comprehensive text sanitization for TTS"""
-    # First, remove citations and tags
-    text = remove_citations(text)
-    
-    # Remove URLs
-    text = remove_urls(text)
-    
-    # Remove emojis
-    text = remove_emojis(text)
-    
-    # Remove markdown formatting
-    text = remove_markdown_formatting(text)
-    
-    # Remove special symbols and emote actions (preserves Hindi)
-    text = remove_special_symbols(text)
-    
-    # Remove fancy quotes and replace with standard ones
-    text = text.replace('"', '"').replace('"', '"')
-    text = text.replace(''', "'").replace(''', "'")
-    
-    # Remove multiple spaces
-    text = re.sub(r'\s+', ' ', text)
-    
-    # Clean up multiple punctuation marks
-    text = re.sub(r'([.!?]){2,}', r'\1', text)
-    
-    return text.strip()
+    return sanitize_with_language(text)[0]
 
 def split_long_text(text, max_length=500):
     """Split long text into smaller chunks for better TTS processing"""
@@ -176,15 +192,125 @@ def split_long_text(text, max_length=500):
     
     return chunks if chunks else [text]
 
-def speak(text, emotion="neutral", verbose=True):
+_SENTENCE_END_RE = re.compile(r'(?<=[.!?।])\s+')
+_CLAUSE_END_RE = re.compile(r'(?<=[,;:])\s+')
+# A space where the script switches between Latin and Devanagari
+_SCRIPT_SWITCH_RE = re.compile(r'(?<=[\u0900-\u097F])\s+(?=[A-Za-z])|(?<=[A-Za-z])\s+(?=[\u0900-\u097F])')
+_SPACE_RE = re.compile(r'\s+')
+_SCRIPT_RUN_RE = re.compile(r'[\u0900-\u097F]+|[A-Za-z]+')
+
+def split_script_spans(text):
+    """
+    Split text into runs of one script, as [(span, lang)] with lang 'hi' for
+    Devanagari and 'en' for Latin. Spaces, digits and punctuation between runs
+    stay with the run before them, so "Hello, आप कैसे हो?" gives
+    [("Hello,", 'en'), ("आप कैसे हो?", 'hi')].
+    """
+    spans = []
+    for match in _SCRIPT_RUN_RE.finditer(text):
+        lang = 'hi' if match.group() >= '\u0900' else 'en'
+        if spans and spans[-1][1] == lang:
+            continue
+        if spans:
+            spans[-1][2] = match.start()
+        spans.append([match.start() if spans else 0, lang, len(text)])
+    if not spans:
+        return [(text, 'en')] if text.strip() else []
+    return [(text[start:end].strip(), lang) for start, lang, end in spans]
+
+def _split_at_boundary(text, limit):
+    """Cut text to at most `limit` chars at the best break: clause, script switch, then word"""
+    window = text[:limit + 1]
+    for pattern in (_CLAUSE_END_RE, _SCRIPT_SWITCH_RE, _SPACE_RE):
+        # Ignore breaks so early they'd leave a uselessly tiny head
+        cuts = [m for m in pattern.finditer(window) if m.start() >= limit // 3]
+        if cuts:
+            return text[:cuts[-1].start()], text[cuts[-1].end():]
+    return text[:limit], text[limit:].lstrip()
+
+def plan_chunks(text, first_chars=FIRST_CHUNK_CHARS, max_chars=MAX_CHUNK_CHARS, is_cached=None):
+    """
+    Split text for pipelined synthesis, optimised for time-to-first-audio.
+    
+    The first chunk is at most first_chars (the first sentence or clause), and
+    each following chunk may be CHUNK_GROWTH times longer, up to max_chars.
+    Chunks are built from whole sentences (ending in . ! ? or the Hindi ।) so
+    the same sentence produces the same chunk in different replies; a sentence
+    is only cut when it alone exceeds the limit, preferring clause breaks and
+    Latin/Devanagari switches. Sentences for which is_cached(sentence) is true
+    are kept as chunks of their own so they are served from the cache.
+    """
+    text = text.strip()
+    if not text:
+        return []
+    if is_cached is not None and is_cached(text):
+        return [text]
+    
+    chunks = []
+    limit = first_chars
+    current = ""
+    
+    def close(piece):
+        nonlocal limit
+        chunks.append(piece)
+        limit = min(limit * CHUNK_GROWTH, max_chars)
+    
+    for sentence in _SENTENCE_END_RE.split(text):
+        if not sentence:
+            continue
+        if is_cached is not None and is_cached(sentence):
+            if current:
+                close(current)
+                current = ""
+            close(sentence)
+            continue
+        candidate = f"{current} {sentence}" if current else sentence
+        if len(candidate) <= limit:
+            current = candidate
+            continue
+        if current:
+            close(current)
+            current = ""
+        while len(sentence) > limit:
+            head, sentence = _split_at_boundary(sentence, limit)
+            close(head)
+        current = sentence
+    
+    if current:
+        chunks.append(current)
+    return chunks
+
+def speak(text, emotion="neutral", verbose=True, pitch_mode=None, priority=CHAT):
     """
-    Convert text to speech with emotion and comprehensive sanitization
+    Speak through the shared speech queue and wait until done, so speech from
+    the main loop and from timer/alarm/reminder threads never overlaps.
+    Use speech_service.speak_async to queue without waiting.
+    
+    Args:
+        text: Text to speak (English or Hindi)
+        emotion: Emotion to apply (default: neutral)
+        verbose: Whether to print the text being spoken (default: True)
+        pitch_mode: 'fast', 'wsola' or 'librosa' for this call (default: PITCH_MODE)
+        priority: ALARM, CHAT or STATUS from modules.speech_service (default: CHAT)
+    
+    Returns:
+        bool: True if successful, False otherwise (including when flushed)
+    """
+    if not text or len(text.strip()) < 2:
+        return False
+    return speech_service.speak(text, emotion, priority, verbose=verbose, pitch_mode=pitch_mode)
+
+def speak_now(text, emotion="neutral", verbose=True, pitch_mode=None):
+    """
+    Convert text to speech with emotion and comprehensive sanitization,
+    right now on the calling thread (the speech service's worker calls this)
     Supports both English and Hindi text
     
     Args:
         text: Text to speak (English or Hindi)
         emotion: Emotion to apply (default: neutral)
         verbose: Whether to print the text being spoken (default: True)
+        pitch_mode: 'fast', 'wsola' or 'librosa' for this call (default: PITCH_MODE)
     
     Returns:
         bool: True if successful, False otherwise
@@ -192,8 +318,8 @@ def speak(text, emotion="neutral", verbose=True):
     if not text or len(text.strip()) < 2:
         return False
 
-    # Sanitize the text completely
-    clean_text = sanitize_text(text)
+    # Sanitize the text completely (and detect the language in the same pass)
+    clean_text, language = sanitize_with_language(text)
     
     # Check if there's anything left to speak after sanitization
     if not clean_text or len(clean_text.strip()) < 2:
@@ -208,61 +334,261 @@ def speak(text, emotion="neutral", verbose=True):
         print()
 
 
-    # Split long text into chunks
-    text_chunks = split_long_text(clean_text)
+    pitch_mode = pitch_mode or PITCH_MODE
     
-    # Detect language
-    language = detect_language(clean_text)
+    # Short first chunk, growing after that; already-heard sentences stand alone
+    text_chunks = plan_chunks(
+        clean_text, is_cached=lambda sentence: is_cached(sentence, language, emotion, pitch_mode)
+    )
+    
+    # Fixed openers like "Reminder:" play straight from the phrase pack
+    text_chunks = phrase_pack.split_prefixes(
+        text_chunks, is_packed=lambda prefix: is_packed(prefix, language, emotion, pitch_mode)
+    )
     
     # Suppress engine initialization messages AFTER printing
     old_stderr = sys.stderr
     sys.stderr = io.StringIO()
     
-    success = True
+    # Plainer voice while synthesis is missing the time-to-first-audio SLO
+    quality = quality_governor.settings()
+    quality_name = quality_governor.name
+    
     try:
-        for i, chunk in enumerate(text_chunks):
-            if not chunk.strip():
+        success, timings = _run_pipeline(text_chunks, language, emotion, pitch_mode, quality)
+    finally:
+        # Restore stderr
+        sys.stderr = old_stderr
+    
+    timings["quality"] = quality_name
+    # Cache hits say nothing about synthesis speed; only synthesized replies count
+    if timings["first_chunk_fresh"] and timings["time_to_first_audio"] is not None:
+        quality_governor.record(timings["time_to_first_audio"])
+    
+    global last_speak_timings
+    last_speak_timings = timings
+    if REPORT_TTS_TIMINGS:
+        _report_timings(timings)
+    
+    return success
+
+def _tld_for(language, accent=None):
+    """gTTS TLD for the detected language and accent"""
+    # Determine TLD based on language
+    if language == 'hi' or language == 'mixed':
+        return 'co.in'  # Use Indian English/Hindi TLD
+    return engine.set_voice_accent(accent or VOICE_ACCENT)
+
+def _span_tld(lang, tld):
+    """Hindi spans always use the Indian voice; English spans keep the utterance's accent"""
+    return 'co.in' if lang == 'hi' else tld
+
+def _span_bases(span, lang, tld):
+    """Base keys whose audio may be used for a span right now, best backend first"""
+    return [base_key(span, _span_tld(lang, tld), lang, backend=name) for name in backend_selector.reusable_names()]
+
+def _chunk_base(span_bases):
+    """Base key for a whole chunk; a single-script chunk keeps its span's key"""
+    if len(span_bases) == 1:
+        return span_bases[0]
+    return sha256("+".join(span_bases).encode()).hexdigest()
+
+def _chunk_variants(spans, tld, profile, pitch_mode):
+    """Variant keys a chunk may already be stored under, best backend first"""
+    keys = []
+    for name in backend_selector.reusable_names():
+        bases = [base_key(span, _span_tld(lang, tld), lang, backend=name) for span, lang in spans]
+        keys.append(variant_key(_chunk_base(bases), profile, pitch_mode, DSP_VERSION))
+    return keys
+
+def is_cached(chunk, language, emotion, pitch_mode, accent=None):
+    """True if chunk needs no synthesis request: packed, or the base audio of every span is cached"""
+    tld = _tld_for(language, accent)
+    spans = split_script_spans(chunk)
+    if all(any(tts_cache.has_base(b) for b in _span_bases(span, lang, tld)) for span, lang in spans):
+        return True
+    return is_packed(chunk, language, emotion, pitch_mode, accent)
+
+def is_packed(chunk, language, emotion, pitch_mode, accent=None):
+    """True if the phrase pack holds chunk in this emotion and accent"""
+    tld = _tld_for(language, accent)
+    profile = engine.get_profile(emotion)
+    return any(phrase_pack.get(v) is not None for v in _chunk_variants(split_script_spans(chunk), tld, profile, pitch_mode))
+
+def _span_executor():
+    """Thread pool for synthesizing the spans of a chunk; recreated in a forked child"""
+    global _span_pool, _span_pool_pid
+    if _span_pool is None or _span_pool_pid != os.getpid():
+        _span_pool = ThreadPoolExecutor(max_workers=SPAN_WORKERS, thread_name_prefix="tts-span")
+        _span_pool_pid = os.getpid()
+    return _span_pool
+
+def _span_audio(span, lang, tld, local=False):
+    """(samples, sr, base_key) for one single-script span, from the base cache or a backend"""
+    tld = _span_tld(lang, tld)
+    base = next((b for b in _span_bases(span, lang, tld) if tts_cache.has_base(b)), None)
+    data = tts_cache.get_base(base) if base is not None else None
+    if data is None:
+        backend, data = engine.fetch_base(span, tld=tld, lang=lang, local=local)
+        base = base_key(span, tld, lang, backend=backend.name)
+        tts_cache.put_base(base, data)
+    samples, sr = engine.decode_audio(data)
+    return samples, sr, base
+
+def synthesize_chunk(chunk, language, emotion, pitch_mode, accent=None, quality=None):
+    """
+    Return (clip, variant_key, fresh) for one chunk. Packed phrases and cached
+    variants are decoded as they are; fresh ones are rendered in memory (from the
+    cached base audio when this text was heard before) and still need storing
+    under variant_key.
+    
+    quality: tts_quality settings for a degraded render; such clips get a
+    variant_key of None so they are never cached as the full-quality variant.
+    
+    A chunk mixing Hindi and English is synthesized per script span, each span
+    in its own language and cached on its own, in parallel; the spans are
+    joined before the emotion is applied so it shapes the chunk as a whole.
+    """
+    tld = _tld_for(language, accent)
+    profile = engine.get_profile(emotion)
+    spans = split_script_spans(chunk)
+    
+    # Fixed phrases ship pre-rendered; check them before the dynamic cache
+    for variant in _chunk_variants(spans, tld, profile, pitch_mode):
+        packed = phrase_pack.get(variant)
+        if packed is not None:
+            # Already PCM in the player's format: no decode
+            clip = AudioSegment(data=packed, sample_width=2, frame_rate=phrase_pack.sample_rate, channels=1)
+            return clip, variant, False
+        cached = tts_cache.get_variant(variant) if tts_cache.has_variant(variant) else None
+        if cached is not None:
+            return AudioSegment.from_file(io.BytesIO(cached), format="mp3"), variant, False
+    
+    # Only spans never heard before need a backend request
+    quality = quality or FULL_QUALITY
+    local = quality["local"]
+    if len(spans) == 1:
+        rendered = [_span_audio(spans[0][0], spans[0][1], tld, local)]
+    else:
+        rendered = list(_span_executor().map(lambda span: _span_audio(span[0], span[1], tld, local), spans))
+    
+    # Join at the first span's rate (backends may differ in sample rate)
+    sr = rendered[0][1]
+    samples = np.concatenate([
+        audio_dsp.resample(span_samples, span_sr / sr) for span_samples, span_sr, _ in rendered
+    ])
+    
+    # The same emotion chain runs whichever backend produced the audio
+    samples = engine.process(samples, sr, emotion, pitch_mode,
+                             pitch=quality["pitch"], enhance=quality["enhance"])
+    if quality["pitch"] and quality["enhance"]:
+        variant = variant_key(_chunk_base([b for _, _, b in rendered]), profile, pitch_mode, DSP_VERSION)
+    else:
+        variant = None
+    return array_to_segment(samples, sr), variant, True
+
+def _run_pipeline(text_chunks, language, emotion, pitch_mode, quality=None):
+    """
+    Synthesize ahead of playback: a worker renders chunks into a small bounded
+    queue while this thread plays them, so chunk N+1 is being prepared while
+    chunk N is heard. Returns (success, timings).
+    """
+    started = time.perf_counter()
+    ready = queue.Queue(maxsize=PIPELINE_DEPTH)
+    stop = threading.Event()
+    failures = []
+    fresh_flags = []
+    
+    def put(item):
+        # Don't block forever if playback gave up
+        while not stop.is_set():
+            try:
+                ready.put(item, timeout=0.1)
+                return
+            except queue.Full:
                 continue
-            
-            # Determine TLD based on language
-            if language == 'hi' or language == 'mixed':
-                tld = 'co.in'  # Use Indian English/Hindi TLD
-                accent = 'in'
-            else:
-                tld = engine.set_voice_accent(VOICE_ACCENT)
-                accent = VOICE_ACCENT
-            
-            # Create hash for cache
-            hash_name = sha256(f"{accent}_{language}_{emotion}_{chunk}".encode()).hexdigest()
-            filename = CACHE_DIR / f"{hash_name}.mp3"
-
-            if filename.exists():
-                if not play_audio(filename):
-                    success = False
-            else:
+    
+    def producer():
+        try:
+            for chunk in text_chunks:
+                if stop.is_set():
+                    return
                 try:
-                    # Apply emotion with appropriate language settings
-                    audio = engine.apply_emotion(chunk, emotion, tld=tld)
-                    audio.export(filename, format="mp3", bitrate="192k")
-                    if not play_audio(filename):
-                        success = False
-
+                    clip, variant, fresh = synthesize_chunk(chunk, language, emotion, pitch_mode,
+                                                            quality=quality)
+                    if not fresh_flags:
+                        fresh_flags.append(fresh)
+                    put(clip)
+                    # Encode once, for the cache only, after the clip is already queued
+                    if fresh and variant is not None:
+                        encoded = io.BytesIO()
+                        clip.export(encoded, format="mp3", bitrate="192k")
+                        tts_cache.put_variant(variant, encoded.getvalue())
                 except Exception as e:
                     print(f"[TTS ERROR] {e}")
-                    success = False
-
+                    failures.append(chunk)
+        finally:
+            put(None)
+    
+    worker = threading.Thread(target=producer, daemon=True)
+    worker.start()
+    
+    success = True
+    first_audio = None
+    gaps = []
+    audio_end = None
+    handles = []
+    # A flush (interrupt) bumps the player generation; stop speaking if that happens
+    generation = player.generation
+    try:
+        while True:
+            clip = ready.get()
+            if clip is None or player.generation != generation:
+                break
+            
+            # Keep at most one clip queued behind the one playing: gapless but bounded
+            if len(handles) >= 2 and not handles[-2].wait():
+                success = False
+                break
+            
+            queued_at = time.perf_counter()
+            if first_audio is None:
+                first_audio = queued_at - started
+            elif audio_end is not None:
+                gaps.append(max(0.0, queued_at - audio_end))
+            handles.append(player.enqueue_segment(clip))
+            audio_end = max(audio_end or queued_at, queued_at) + handles[-1].duration
+        
+        for handle in handles[-2:]:
+            if not handle.wait():
+                success = False
     finally:
-        # Restore stderr
-        sys.stderr = old_stderr
+        stop.set()
+        worker.join(timeout=1)
     
-    return success
+    timings = {
+        "chunks": len(text_chunks),
+        "chunk_chars": [len(chunk) for chunk in text_chunks],
+        "time_to_first_audio": first_audio,
+        "first_chunk_fresh": bool(fresh_flags and fresh_flags[0]),
+        "inter_chunk_gaps": gaps,
+        "max_gap": max(gaps) if gaps else 0.0,
+        "total": time.perf_counter() - started,
+    }
+    return success and not failures, timings
+
+def _report_timings(timings):
+    ttfa = timings["time_to_first_audio"]
+    first_audio = f"{ttfa * 1000:.0f}ms" if ttfa is not None else "-"
+    gaps = ", ".join(f"{g * 1000:.0f}" for g in timings["inter_chunk_gaps"]) or "-"
+    sizes = "/".join(str(n) for n in timings["chunk_chars"])
+    print(f"[TTS] chunks={timings['chunks']} ({sizes} chars) first_audio={first_audio} "
+          f"gaps_ms=[{gaps}] total={timings['total']:.2f}s quality={timings.get('quality', '-')}")
 
 def play_audio(path):
-    """Play audio file using ffplay"""
+    """Play an audio file through the shared persistent player; blocks until done"""
     try:
-        subprocess.run(["ffplay", "-nodisp", "-autoexit", str(path)],
-                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-        return True
+        return player.play_file(path)
     except Exception as e:
         print(f"[Audio Play Error] {e}")
         return False
@@ -300,6 +626,40 @@ def speak_hindi(text):
     VOICE_ACCENT = original_accent
     return result
 
+def set_pitch_mode(mode='wsola'):
+    """
+    Choose how pitch shifting is done (cheapest first)
+    
+    Options:
+        'fast'    - single resample; pitch exact, tempo slightly faster
+        'wsola'   - time-domain stretch + resample (default)
+        'librosa' - phase vocoder; smoothest, slowest
+    """
+    global PITCH_MODE
+    if mode not in PITCH_MODES:
+        print(f"❌ Unknown pitch mode '{mode}' (choose from {', '.join(PITCH_MODES)})")
+        return False
+    PITCH_MODE = mode
+    print(f"🎵 Pitch mode changed to: {mode}")
+    return True
+
+def set_tts_backend(name='auto'):
+    """
+    Choose where base speech comes from
+    
+    Options:
+        'auto'   - gTTS while online and fast enough, else the local voice (default)
+        'gtts'   - always gTTS
+        'espeak' - always the local espeak-ng voice (works offline)
+    """
+    if name != 'auto' and backend_selector.get(name) is None:
+        available = ", ".join(['auto'] + backend_selector.names())
+        print(f"❌ TTS backend '{name}' is not available (choose from {available})")
+        return False
+    backend_selector.mode = name
+    print(f"🎵 TTS backend changed to: {name}")
+    return True
+
 def set_voice_accent(accent='us'):
     """
     Change Lily's accent
@@ -313,9 +673,5 @@ def set_voice_accent(accent='us'):
     global VOICE_ACCENT
     VOICE_ACCENT = accent
     print(f"🎵 Voice accent changed to: {accent}")
-    # Clear cache to regenerate with new accent
-    import shutil
-    if CACHE_DIR.exists():
-        shutil.rmtree(CACHE_DIR)
-        CACHE_DIR.mkdir(exist_ok=True)
-        print("🔄 Cache cleared for new accent")
\ No newline at end of file
+    # The accent's TLD is part of every cache key, so audio cached for the
+    # other accents stays valid; the byte budget keeps the cache bounded.
\ No newline at end of file
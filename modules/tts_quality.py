@@ -0,0 +1,104 @@
+# modules/tts_quality.py
+
+import os
+import time
+import threading
+import statistics
+from collections import deque
+
+# Quality ladder, best first; each step also keeps the savings of the ones before it
+QUALITY_LEVELS = ("full", "no_pitch", "no_enhance", "local")
+
+# Time-to-first-audio target for speak() (env LILY_TTFA_SLO_MS)
+TTFA_SLO_MS = float(os.getenv("LILY_TTFA_SLO_MS", "1000"))
+
+# Decisions use the median of the last WINDOW synthesized replies
+WINDOW = 5
+# Replies to observe at a level before it may change again
+HOLD = 3
+# Step back up once the median is below this fraction of the SLO
+RECOVERY = 0.6
+
+QUALITY_LOG = "logs/tts_quality.log"
+
+
+class QualityGovernor:
+    """
+    Trades voice polish for latency when synthesis is slow.
+
+    speak() reports the time to first audio of every reply whose first chunk
+    had to be synthesized (cache hits say nothing about synthesis speed). When
+    the recent median misses the SLO, the next replies drop one more step:
+
+        full        the complete emotion chain
+        no_pitch    speed and volume only (no pitch shift)
+        no_enhance  also no normalize / compress / high-pass
+        local       also the local voice instead of the network backend
+
+    When the median is comfortably under the SLO again it climbs back one step
+    at a time. Every change is printed and appended to QUALITY_LOG.
+    """
+
+    def __init__(self, slo_ms=TTFA_SLO_MS, log_path=QUALITY_LOG):
+        self.slo = slo_ms / 1000
+        self.log_path = log_path
+        self.level = 0
+        self.recent = deque(maxlen=WINDOW)
+        self.since_change = 0
+        self._lock = threading.Lock()
+
+    @property
+    def name(self):
+        return QUALITY_LEVELS[self.level]
+
+    def settings(self):
+        """What the next reply should do: {'pitch', 'enhance', 'local'} flags"""
+        level = self.level
+        return {"pitch": level < 1, "enhance": level < 2, "local": level >= 3}
+
+    @staticmethod
+    def _lowest_level():
+        from modules.tts_backends import backend_selector
+        has_local = any(not b.needs_network for b in backend_selector.backends)
+        return len(QUALITY_LEVELS) - 1 if has_local else len(QUALITY_LEVELS) - 2
+
+    def record(self, ttfa):
+        """Report one reply's time to first audio (seconds); may change the level"""
+        with self._lock:
+            self.recent.append(ttfa)
+            self.since_change += 1
+            if self.since_change < HOLD:
+                return
+            typical = statistics.median(self.recent)
+            if typical > self.slo and self.level < self._lowest_level():
+                self._change(self.level + 1, typical)
+            elif typical < self.slo * RECOVERY and self.level > 0:
+                self._change(self.level - 1, typical)
+
+    def _change(self, level, typical):
+        old = self.name
+        window = ",".join(f"{t * 1000:.0f}" for t in self.recent)
+        self.level = level
+        self.recent.clear()
+        self.since_change = 0
+        direction = "down" if QUALITY_LEVELS.index(old) < level else "up"
+        message = (f"quality {direction}: {old} -> {self.name} "
+                   f"(median first audio {typical * 1000:.0f}ms, SLO {self.slo * 1000:.0f}ms, recent [{window}])")
+        print(f"[TTS] {message}")
+        try:
+            os.makedirs(os.path.dirname(self.log_path), exist_ok=True)
+            with open(self.log_path, "a") as f:
+                f.write(f"{time.strftime('%Y-%m-%d %H:%M:%S')} {message}\n")
+        except OSError:
+            pass
+
+    def reset(self):
+        """Back to full quality, forgetting recent observations"""
+        with self._lock:
+            self.level = 0
+            self.recent.clear()
+            self.since_change = 0
+
+
+# Shared governor for this process
+quality_governor = QualityGovernor()
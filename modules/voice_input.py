@@ -1,7 +1,9 @@
 import os
 import sys
 import speech_recognition as sr
-from contextlib import contextmanager
+from contextlib import contextmanager, nullcontext
+from modules.audio_capture import audio_capture, DEVICE_INDEX, SAMPLE_WIDTH
+from modules.stt_backends import get_stt_backend
 
 # ==============================
 # SYSTEM UTILS
@@ -29,8 +31,6 @@ def suppress_stderr():
             pass
 
 
-DEVICE_INDEX = 1
-
 # ==============================
 # VOICE RECOGNITION
 # ==============================
@@ -38,22 +38,20 @@ DEVICE_INDEX = 1
 recognizer = sr.Recognizer()
 
 
-def listen_for_command():
-    """Listen for voice command with clean output - shows only ONE status line"""
-    try:
-        from modules.interrupt_handler import get_interrupt_flag
-    except:
-        get_interrupt_flag = lambda: False
-    
-    audio = None
-    
+def _clear_status():
+    sys.stdout.write("\r" + " " * 60 + "\r")
+    sys.stdout.flush()
+
+
+def _listen_with_microphone(get_interrupt_flag):
+    """Fallback capture when the persistent stream can't be opened: sr.Microphone per call"""
     # Suppress ALL audio library warnings and errors
     with suppress_stderr():
         try:
             with sr.Microphone(device_index=DEVICE_INDEX) as source:
                 # Check for interrupt flag
                 if get_interrupt_flag():
-                    return ""
+                    return None
 
                 # Adjust for ambient noise silently
                 recognizer.adjust_for_ambient_noise(source, duration=0.2)
@@ -72,54 +70,142 @@ def listen_for_command():
             with sr.Microphone(device_index=DEVICE_INDEX) as source:
                 # Listen for audio with timeout
                 try:
-                    audio = recognizer.listen(source, timeout=5, phrase_time_limit=7)
+                    return recognizer.listen(source, timeout=5, phrase_time_limit=7)
                 except sr.WaitTimeoutError:
-                    # Clear the listening message
-                    sys.stdout.write("\r" + " " * 60 + "\r")
-                    sys.stdout.flush()
+                    _clear_status()
                     return None
 
         except KeyboardInterrupt:
-            # Clear the listening message
-            sys.stdout.write("\r" + " " * 60 + "\r")
-            sys.stdout.flush()
+            _clear_status()
             raise
         except Exception:
-            # Clear the listening message
-            sys.stdout.write("\r" + " " * 60 + "\r")
-            sys.stdout.flush()
+            _clear_status()
             return None
 
-    # If no audio captured, return None
-    if audio is None:
-        sys.stdout.write("\r" + " " * 60 + "\r")
+
+def capture_utterance(backend, on_partial=None, timeout=5, should_stop=None, show_partials=True, times=None):
+    """
+    Cut the next utterance from the capture stream, feeding a streaming
+    backend while the user speaks. Returns (pcm, sample_rate, stream); stream
+    is the backend's STTStream (None for non-streaming backends) and pcm is
+    None if nobody spoke. show_partials may be a callable, checked per partial;
+    times is passed on to read_utterance.
+    """
+    rate = audio_capture.sample_rate
+    stream = backend.start_stream(rate) if backend.streaming else None
+    if stream is None:
+        on_audio = None
+    else:
+        state = {"partial": "", "complete": False}
+
+        def on_audio(chunk):
+            # Recognize while capturing; show and route partials as they change
+            partial = stream.accept(chunk)
+            if partial and partial != state["partial"]:
+                state["partial"] = partial
+                if show_partials() if callable(show_partials) else show_partials:
+                    sys.stdout.write("\r[~] " + partial[-54:].ljust(56))
+                    sys.stdout.flush()
+                state["complete"] = bool(on_partial and on_partial(partial))
+            return state["complete"]
+
+    pcm = audio_capture.read_utterance(timeout=timeout, phrase_time_limit=7,
+                                       should_stop=should_stop, on_audio=on_audio, times=times)
+    return pcm, rate, stream
+
+
+def recognize(backend, pcm, rate, stream=None, quiet=True):
+    """
+    Final lower-cased text for a captured utterance, or None. quiet silences
+    library noise on stderr; it swaps the process-wide fd, so pass False when
+    recognizing from more than one thread.
+    """
+    # A streaming backend has already heard it all
+    with suppress_stderr() if quiet else nullcontext():
+        text = stream.finish() if stream is not None else backend.transcribe(pcm, rate)
+    return text.lower() if text else None
+
+
+def listen_for_command(on_partial=None):
+    """
+    Listen for voice command with clean output - shows only ONE status line
+    
+    on_partial(text): called with the partial transcript while the user is
+    still speaking (streaming STT backends only). Returning True means the
+    text is already a complete command, so the utterance may end on a
+    shorter pause.
+    """
+    try:
+        from modules.interrupt_handler import get_interrupt_flag
+    except:
+        get_interrupt_flag = lambda: False
+    
+    if get_interrupt_flag():
+        return ""
+
+    backend = get_stt_backend()
+    pcm = stream = None
+    rate = audio_capture.sample_rate
+
+    if audio_capture.start():
+        # The stream is already open and calibrated: no setup before listening.
+        # This answer is ours: the background command listener stands down meanwhile.
+        sys.stdout.write("[~] Listening...")
         sys.stdout.flush()
+        try:
+            with audio_capture.exclusive():
+                pcm, rate, stream = capture_utterance(backend, on_partial, should_stop=get_interrupt_flag)
+        except KeyboardInterrupt:
+            _clear_status()
+            raise
+    else:
+        audio = _listen_with_microphone(get_interrupt_flag)
+        if audio is not None:
+            pcm, rate = audio.get_raw_data(convert_width=SAMPLE_WIDTH), audio.sample_rate
+
+    # If no audio captured, return None
+    if not pcm:
+        _clear_status()
         return None
 
     # Change status to recognizing
     sys.stdout.write("\r[*] Recognizing..." + " " * 40)
     sys.stdout.flush()
 
-    # Recognition phase
-    with suppress_stderr():
-        try:
-            text = recognizer.recognize_google(audio)
-            # Clear the status line completely
-            sys.stdout.write("\r" + " " * 60 + "\r")
-            sys.stdout.flush()
-            return text.lower()
-        except sr.UnknownValueError:
-            # Clear the status line
-            sys.stdout.write("\r" + " " * 60 + "\r")
-            sys.stdout.flush()
-            return None
-        except sr.RequestError as e:
-            # Clear the status line
-            sys.stdout.write("\r" + " " * 60 + "\r")
-            sys.stdout.flush()
-            print(f"[!] API error: {e}")
-            return None
-        except KeyboardInterrupt:
-            sys.stdout.write("\r" + " " * 60 + "\r")
-            sys.stdout.flush()
-            raise
\ No newline at end of file
+    try:
+        text = recognize(backend, pcm, rate, stream)
+    finally:
+        # Clear the status line completely
+        _clear_status()
+    return text
+
+
+# Said to wake Lily when no keyword templates are enrolled (matched in cloud text)
+CLOUD_WAKE_PHRASES = ["wake up lily", "hey lily", "lily come back"]
+_wake_fallback_noted = False
+
+
+def wait_for_wake_word():
+    """
+    Sleep mode: listen for one phrase and return True if it was a wake phrase.
+    With enrolled templates this is matched offline by the keyword spotter, so
+    nothing is sent to the cloud recognizer until Lily is awake; otherwise each
+    phrase is transcribed and searched for CLOUD_WAKE_PHRASES.
+    """
+    global _wake_fallback_noted
+    try:
+        from modules.interrupt_handler import get_interrupt_flag
+    except:
+        get_interrupt_flag = lambda: False
+    from modules.keyword_spotter import keyword_spotter, WAKE_KEYWORDS
+
+    if keyword_spotter.ready(WAKE_KEYWORDS) and audio_capture.start():
+        with audio_capture.exclusive():
+            return keyword_spotter.listen(WAKE_KEYWORDS, timeout=5, should_stop=get_interrupt_flag) is not None
+
+    if not _wake_fallback_noted:
+        _wake_fallback_noted = True
+        print("[i] No wake word templates; using the cloud recognizer while asleep.")
+        print("    Enroll them with: python -m modules.keyword_spotter enroll 'hey lily'")
+    query = listen_for_command()
+    return bool(query) and any(kw in query.lower() for kw in CLOUD_WAKE_PHRASES)
@@ -21,6 +21,8 @@ from modules.ai_agent import (
     log_execution_attempt,
 )
 from modules.lily_memory import load_memory, save_important_point, show_memory
+from modules.history_store import chat_log, command_log
+from modules.history_stats import history_stats, ensure_stats
 import modules.tts_output as tts_output
 
 
@@ -75,7 +77,7 @@ def health() -> dict:
 
 @app.get("/")
 def root() -> dict:
-    return {"service": "lily", "status": "ok", "endpoints": ["/health", "/lily", "/chat", "/memory", "/history"]}
+    return {"service": "lily", "status": "ok", "endpoints": ["/health", "/lily", "/chat", "/memory", "/history", "/stats"]}
 
 
 @app.get("/favicon.ico")
@@ -211,9 +213,23 @@ def history_chat(limit: int = 20) -> List[dict]:
 
 
 @app.get("/history/commands")
-def history_commands() -> List[dict]:
+def history_commands(limit: int = 50, since: Optional[str] = None, until: Optional[str] = None) -> List[dict]:
+    """Last `limit` command entries, optionally within [since, until] (ISO timestamps)"""
     try:
-        return load_command_history() or []
+        limit = max(1, min(limit, 1000))
+        if since or until:
+            # Only the segments overlapping the range are opened
+            return command_log.range(start=since, end=until)[-limit:]
+        return load_command_history(limit=limit) or []
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/stats")
+def stats() -> dict:
+    try:
+        ensure_stats(chat_log, command_log)
+        return history_stats.snapshot()
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -0,0 +1,21 @@
+import numpy as np
+
+from modules import keyword_spotter as ks
+
+
+def _tone(seconds=0.6, sr=ks.SAMPLE_RATE):
+    t = np.arange(int(seconds * sr)) / sr
+    return (np.sin(2 * np.pi * 440 * t) * 8000).astype(np.int16).tobytes()
+
+
+def test_list_with_single_template(tmp_path, monkeypatch, capsys):
+    ks.write_wav(tmp_path / "stop" / "001.wav", _tone())
+    spotter = ks.KeywordSpotter(tmp_path)
+    monkeypatch.setattr(ks, "keyword_spotter", spotter)
+
+    assert ks.main(["list"]) == 0
+
+    out = capsys.readouterr().out
+    assert "spread n/a (1 template)" in out
+    assert f"threshold {ks.DEFAULT_THRESHOLD:.2f}" in out
+    assert spotter.spread["stop"] is None